@@ -0,0 +1,160 @@
+"""
+Backends للـ inference على CPU: PyTorch (.pt) أو ONNX Runtime (fp32 / INT8)
+
+تصدير الموديلات مرة واحدة:
+  python backends.py                 # حسب INFERENCE_BACKEND في config
+  python backends.py --int8          # ONNX + INT8 بـ CALIBRATION_DIR
+"""
+import argparse
+from pathlib import Path
+import cv2
+import numpy as np
+from config import SystemConfig
+
+BACKENDS = ("torch", "onnx", "onnx-int8")
+
+
+def select_device():
+    """GPU لو USE_GPU ومتاح، غير كده CPU"""
+    if SystemConfig.USE_GPU:
+        try:
+            import torch
+            if torch.cuda.is_available():
+                return 0
+        except ImportError:
+            pass
+    return "cpu"
+
+
+def export_onnx(pt_path, imgsz):
+    """تصدير .pt لـ ONNX بمقاس input ثابت (لو مش متصدّر قبل كده)"""
+    pt_path = Path(pt_path)
+    out = pt_path.with_name(f"{pt_path.stem}_{imgsz}.onnx")
+    if out.exists():
+        return out
+
+    from ultralytics import YOLO
+    exported = Path(YOLO(str(pt_path)).export(format="onnx", imgsz=imgsz, dynamic=False, simplify=True))
+    exported.replace(out)
+    return out
+
+
+class _CalibrationReader:
+    """صور المعايرة بنفس الـ letterbox بتاع YOLO"""
+    def __init__(self, input_name, calib_dir, imgsz, limit):
+        exts = (".jpg", ".jpeg", ".png", ".bmp")
+        self.files = sorted(p for p in Path(calib_dir).iterdir() if p.suffix.lower() in exts)[:limit]
+        if not self.files:
+            raise FileNotFoundError(f"no calibration images in {calib_dir}")
+        self.input_name = input_name
+        self.imgsz = imgsz
+        self._it = iter(self.files)
+
+    def _prepare(self, path):
+        img = cv2.imread(str(path))
+        h, w = img.shape[:2]
+        r = self.imgsz / max(h, w)
+        nh, nw = int(round(h * r)), int(round(w * r))
+        canvas = np.full((self.imgsz, self.imgsz, 3), 114, dtype=np.uint8)
+        top, left = (self.imgsz - nh) // 2, (self.imgsz - nw) // 2
+        canvas[top:top + nh, left:left + nw] = cv2.resize(img, (nw, nh), interpolation=cv2.INTER_LINEAR)
+        x = canvas[:, :, ::-1].transpose(2, 0, 1)[None].astype(np.float32) / 255.0
+        return np.ascontiguousarray(x)
+
+    def get_next(self):
+        path = next(self._it, None)
+        if path is None:
+            return None
+        return {self.input_name: self._prepare(path)}
+
+    def rewind(self):
+        self._it = iter(self.files)
+
+
+def quantize_int8(onnx_path, calib_dir, imgsz, limit=None):
+    """INT8 static quantization بصور معايرة محلية"""
+    import onnx
+    import onnxruntime as ort
+    from onnxruntime.quantization import CalibrationDataReader, QuantFormat, QuantType, quantize_static
+
+    onnx_path = Path(onnx_path)
+    out = onnx_path.with_name(f"{onnx_path.stem}_int8.onnx")
+    if out.exists():
+        return out
+
+    input_name = ort.InferenceSession(str(onnx_path), providers=["CPUExecutionProvider"]).get_inputs()[0].name
+    reader = _CalibrationReader(input_name, calib_dir, imgsz, limit or SystemConfig.CALIBRATION_MAX_IMAGES)
+
+    class Reader(CalibrationDataReader):
+        def get_next(self):
+            return reader.get_next()
+
+        def rewind(self):
+            reader.rewind()
+
+    quantize_static(
+        str(onnx_path), str(out), Reader(),
+        quant_format=QuantFormat.QDQ,
+        per_channel=True,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+    )
+
+    # ultralytics بيقرا names / stride / imgsz من الـ metadata
+    src = onnx.load(str(onnx_path))
+    dst = onnx.load(str(out))
+    existing = {p.key for p in dst.metadata_props}
+    for p in src.metadata_props:
+        if p.key not in existing:
+            dst.metadata_props.add(key=p.key, value=p.value)
+    onnx.save(dst, str(out))
+    return out
+
+
+def resolve_model(pt_path, backend=None, imgsz=None):
+    """إرجاع مسار الموديل اللي هيتحمل حسب الـ backend (مع التصدير لو لازم)"""
+    backend = backend or SystemConfig.INFERENCE_BACKEND
+    imgsz = imgsz or SystemConfig.INFERENCE_IMGSZ
+    if backend not in BACKENDS:
+        raise ValueError(f"unknown inference backend: {backend}")
+
+    if backend == "torch":
+        return Path(pt_path)
+
+    onnx_path = export_onnx(pt_path, imgsz)
+    if backend == "onnx-int8":
+        return quantize_int8(onnx_path, SystemConfig.CALIBRATION_DIR, imgsz)
+    return onnx_path
+
+
+def load_yolo(pt_path, backend=None, imgsz=None):
+    from ultralytics import YOLO
+    return YOLO(str(resolve_model(pt_path, backend, imgsz)), task="detect")
+
+
+def predict_batch(model, images, backend=None, **kwargs):
+    """
+    predict على list صور في call واحدة
+    الـ ONNX متصدّر بـ batch ثابت = 1 فبيتعمل صورة صورة
+    """
+    backend = backend or SystemConfig.INFERENCE_BACKEND
+    if not images:
+        return []
+    if backend == "torch":
+        return list(model.predict(list(images), verbose=False, **kwargs))
+    results = []
+    for img in images:
+        results.extend(model.predict(img, verbose=False, **kwargs))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export detector models for CPU inference")
+    parser.add_argument("--backend", choices=BACKENDS, default=SystemConfig.INFERENCE_BACKEND)
+    parser.add_argument("--int8", action="store_true", help="shortcut for --backend onnx-int8")
+    parser.add_argument("--imgsz", type=int, default=SystemConfig.INFERENCE_IMGSZ)
+    args = parser.parse_args()
+
+    backend = "onnx-int8" if args.int8 else args.backend
+    for pt in (SystemConfig.VEHICLE_MODEL, SystemConfig.PLATE_MODEL):
+        print(f"{pt.name} -> {resolve_model(pt, backend, args.imgsz)}")
@@ -0,0 +1,5 @@
+"""
+Benchmark offline لكل مراحل الـ pipeline على فيديوهات صناعية
+
+  python -m benchmark --frames 300 --out bench.json
+"""
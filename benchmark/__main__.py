@@ -0,0 +1,37 @@
+import argparse
+import json
+from benchmark.runner import run
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-stage pipeline benchmark on synthetic traffic video")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--cars", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--video", help="use an existing video instead of a synthetic one")
+    parser.add_argument("--stub", action="store_true", help="force stub models even if real ones exist")
+    parser.add_argument("--trace-alloc", action="store_true", help="record per-stage allocations with tracemalloc")
+    parser.add_argument("--out", help="write JSON result to this file")
+    args = parser.parse_args()
+
+    result = run(
+        frames=args.frames,
+        size=(args.width, args.height),
+        cars=args.cars,
+        seed=args.seed,
+        video=args.video,
+        force_stub=args.stub,
+        trace_alloc=args.trace_alloc,
+    )
+
+    text = json.dumps(result, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+مقارنة دقة وسرعة الـ backends (torch / onnx / onnx-int8) للكاشفين على نفس الإطارات
+المرجع هو مخرجات torch
+
+  python -m benchmark.backends --video clip.mp4 --frames 100 --out backends.json
+"""
+import argparse
+import json
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+import cv2
+import numpy as np
+from config import SystemConfig
+from core.frames import resize_frame
+from detection.backends import BACKENDS, load_yolo, select_device
+from detection.vehicle_detector import VehicleDetector
+from benchmark.synthetic import make_video
+
+
+class StageTimer:
+    """زمن كل كاشف لوحده (مش الـ pipeline - ده في benchmark.runner)"""
+    def __init__(self):
+        self.samples = {}
+
+    @contextmanager
+    def measure(self, name):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.samples.setdefault(name, []).append(time.perf_counter() - t0)
+
+    def report(self):
+        out = {}
+        for name, values in self.samples.items():
+            ms = np.asarray(values) * 1000
+            out[name] = {
+                "calls": len(values),
+                "total_ms": round(float(ms.sum()), 3),
+                "mean_ms": round(float(ms.mean()), 4),
+                "p50_ms": round(float(np.percentile(ms, 50)), 4),
+                "p95_ms": round(float(np.percentile(ms, 95)), 4),
+            }
+        return out
+
+
+def read_frames(video, limit):
+    cap = cv2.VideoCapture(str(video))
+    frames = []
+    while cap.isOpened() and len(frames) < limit:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(resize_frame(frame))
+    cap.release()
+    return frames
+
+
+def iou_matrix(a, b):
+    a = np.asarray(a, dtype=np.float32).reshape(-1, 4)[:, None]
+    b = np.asarray(b, dtype=np.float32).reshape(-1, 4)[None]
+    iw = np.clip(np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0]), 0, None)
+    ih = np.clip(np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1]), 0, None)
+    inter = iw * ih
+    area_a = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1])
+    area_b = (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+    return inter / np.maximum(area_a + area_b - inter, 1e-6)
+
+
+def match(reference, candidate, thr=0.5):
+    """عدد الصناديق المتطابقة (greedy بالـ IoU)"""
+    if len(reference) == 0 or len(candidate) == 0:
+        return 0
+    iou = iou_matrix(reference, candidate)
+    hits = 0
+    while True:
+        i, j = np.unravel_index(iou.argmax(), iou.shape)
+        if iou[i, j] < thr:
+            return hits
+        hits += 1
+        iou[i, :] = -1
+        iou[:, j] = -1
+
+
+def predict(model, img, conf, imgsz, device, classes=None):
+    r = model(img, conf=conf, imgsz=imgsz, device=device, classes=classes, verbose=False)
+    if not r or not r[0].boxes:
+        return np.zeros((0, 4), dtype=np.float32)
+    return r[0].boxes.xyxy.cpu().numpy()
+
+
+def run(video=None, frames=100, backends=BACKENDS, imgsz=None):
+    imgsz = imgsz or SystemConfig.INFERENCE_IMGSZ
+    device = select_device()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if video is None:
+            video = Path(tmp) / "synthetic.mp4"
+            make_video(video, frames=frames)
+        images = read_frames(video, frames)
+
+    results = {}
+    reference = {}
+    for backend in backends:
+        vmodel = load_yolo(SystemConfig.VEHICLE_MODEL, backend, imgsz)
+        pmodel = load_yolo(SystemConfig.PLATE_MODEL, backend, imgsz)
+        timer = StageTimer()
+        vboxes, pboxes = [], []
+
+        # warmup
+        if images:
+            predict(vmodel, images[0], SystemConfig.VEHICLE_CONF, imgsz, device, VehicleDetector.CLASSES)
+
+        for i, img in enumerate(images):
+            with timer.measure("vehicle_detect"):
+                boxes = predict(vmodel, img, SystemConfig.VEHICLE_CONF, imgsz, device, VehicleDetector.CLASSES)
+            vboxes.append(boxes)
+
+            # الـ plate model على crops السيارات المرجعية عشان المقارنة تبقى على نفس المدخلات
+            crops_from = reference["vehicle"][i] if reference else boxes
+            plates = []
+            for x1, y1, x2, y2 in crops_from.astype(int):
+                crop = img[max(y1, 0):y2, max(x1, 0):x2]
+                if crop.size == 0:
+                    plates.append(np.zeros((0, 4), dtype=np.float32))
+                    continue
+                with timer.measure("plate_detect"):
+                    plates.append(predict(pmodel, crop, SystemConfig.PLATE_CONF, imgsz, device))
+            pboxes.append(plates)
+
+        if not reference:
+            reference = {"vehicle": vboxes, "plate": pboxes}
+
+        stats = timer.report()
+        entry = {"timing": stats}
+        for kind, got in (("vehicle", vboxes), ("plate", pboxes)):
+            ref = reference[kind]
+            if kind == "plate":
+                ref = [b for per_frame in ref for b in per_frame]
+                got = [b for per_frame in got for b in per_frame]
+            ref_n = sum(len(r) for r in ref)
+            got_n = sum(len(g) for g in got)
+            hits = sum(match(r, g) for r, g in zip(ref, got))
+            entry[kind] = {
+                "boxes": got_n,
+                "recall_vs_torch": round(hits / ref_n, 4) if ref_n else None,
+                "precision_vs_torch": round(hits / got_n, 4) if got_n else None,
+            }
+        results[backend] = entry
+
+    base = results.get(backends[0], {}).get("timing", {})
+    for backend, entry in results.items():
+        entry["speedup_vs_" + backends[0]] = {
+            stage: round(base[stage]["mean_ms"] / t["mean_ms"], 2)
+            for stage, t in entry["timing"].items()
+            if stage in base and t["mean_ms"] > 0
+        }
+
+    return {
+        "video": "synthetic" if not isinstance(video, str) else video,
+        "frames": len(images),
+        "imgsz": imgsz,
+        "device": str(device),
+        "backends": results,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare detector backends (accuracy and latency)")
+    parser.add_argument("--video")
+    parser.add_argument("--frames", type=int, default=100)
+    parser.add_argument("--imgsz", type=int, default=SystemConfig.INFERENCE_IMGSZ)
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument("--out")
+    args = parser.parse_args()
+
+    if "torch" in args.backends:
+        # torch أول واحد عشان يبقى المرجع
+        args.backends = ["torch"] + [b for b in args.backends if b != "torch"]
+
+    text = json.dumps(run(args.video, args.frames, tuple(args.backends), args.imgsz), indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text)
+    print(text)
@@ -0,0 +1,199 @@
+"""
+الـ benchmark بيشغّل نفس مسار الـ API (VideoProcessor) بالموديلات الحقيقية أو الـ stubs،
+وزمن كل مرحلة بيتقري من histograms الـ core.metrics (الفرق قبل/بعد التشغيل)
+"""
+import platform
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+import cv2
+import numpy as np
+from config import SystemConfig
+from database import DatabaseManager
+from core import metrics
+from benchmark.synthetic import make_video
+from benchmark.stubs import StubVehicleDetector, StubPlateDetector, StubOCREngine
+
+# ثابتة أثناء القياس: الكاش بيلغي الكشف في التشغيل التاني، والأدلة كتابة على الديسك
+FIXED = {
+    "DETECTION_CACHE": False,
+    "SAVE_EVIDENCE": False,
+}
+
+
+@contextmanager
+def overrides(values):
+    """تغيير SystemConfig مؤقتاً ورجوعه زي ما كان"""
+    old = {k: getattr(SystemConfig, k) for k in values}
+    for k, v in values.items():
+        setattr(SystemConfig, k, v)
+    try:
+        yield
+    finally:
+        for k, v in old.items():
+            setattr(SystemConfig, k, v)
+
+
+def load_models(force_stub=False):
+    """الموديلات الحقيقية لو موجودة، وإلا stubs"""
+    kinds = {}
+    vdet = pdet = ocr = None
+
+    if not force_stub and SystemConfig.VEHICLE_MODEL.exists() and SystemConfig.PLATE_MODEL.exists():
+        try:
+            from detection.vehicle_detector import VehicleDetector
+            from detection.plate_detector import PlateDetector
+            vdet = VehicleDetector(SystemConfig.VEHICLE_MODEL, SystemConfig.VEHICLE_CONF)
+            pdet = PlateDetector(SystemConfig.PLATE_MODEL, SystemConfig.PLATE_CONF)
+        except Exception:
+            vdet = pdet = None
+
+    if not force_stub:
+        try:
+            from ocr.reader import OCREngine
+            ocr = OCREngine()
+        except Exception:
+            ocr = None
+
+    kinds["detectors"] = "stub" if vdet is None else "real"
+    kinds["ocr"] = "stub" if ocr is None else "real"
+    return (
+        vdet or StubVehicleDetector(),
+        pdet or StubPlateDetector(),
+        ocr or StubOCREngine(),
+        kinds,
+    )
+
+
+def process(video, models, camera_id=None):
+    """
+    تشغيل VideoProcessor على فيديو بـ DB في الذاكرة
+    بيرجع العدّ + الزمن + الـ DB (مفتوحة - اللي نادى يقفلها)
+    """
+    from core.video_processor import VideoProcessor
+
+    db = DatabaseManager(":memory:")
+    processed_before = metrics.FRAMES.series.get(("processed",), 0)
+    with overrides(FIXED):
+        vp = VideoProcessor(db, camera_id, task_id="benchmark", models=models)
+        t0 = time.perf_counter()
+        vp.process_video(str(video))
+        wall = time.perf_counter() - t0
+
+    counts = {
+        "frames": vp.proc.frame_counter,
+        "processed_frames": metrics.FRAMES.series.get(("processed",), 0) - processed_before,
+        "vehicles": vp.proc.total_vehicles,
+        "plates_final": db.c.execute("SELECT COUNT(*) FROM vehicles WHERE plate IS NOT NULL").fetchone()[0],
+    }
+    return counts, wall, db
+
+
+def _bucket_quantile(buckets, counts, q):
+    """الحد الأعلى للـ bucket اللي فيه الـ quantile (تقريب من الـ histogram)"""
+    n = sum(counts)
+    cumulative = 0
+    for bound, c in zip(tuple(buckets) + (float("inf"),), counts):
+        cumulative += c
+        if cumulative >= q * n:
+            return bound
+    return float("inf")
+
+
+def _delta(before, after):
+    out = {}
+    for key, (counts, total, n) in after.items():
+        b_counts, b_total, b_n = before.get(key, ([0] * len(counts), 0.0, 0))
+        if n - b_n > 0:
+            out[key] = ([c - bc for c, bc in zip(counts, b_counts)], total - b_total, n - b_n)
+    return out
+
+
+def snapshot():
+    return {
+        "stages": metrics.STAGE_SECONDS.snapshot(),
+        "alloc": metrics.STAGE_ALLOC_BYTES.snapshot(),
+        "commit": metrics.DB_FLUSH_SECONDS.snapshot(),
+    }
+
+
+def stage_report(before, after):
+    """
+    زمن كل مرحلة بين snapshot والتاني
+    p50 / p95 تقريبية: الحد الأعلى للـ bucket في الـ histogram
+    """
+    stages = _delta(before["stages"], after["stages"])
+    commit = _delta(before["commit"], after["commit"])
+    if () in commit:
+        stages[("db_commit",)] = commit[()]
+
+    buckets = metrics.STAGE_SECONDS.buckets
+    out = {}
+    for (name,), (counts, total, n) in sorted(stages.items()):
+        out[name] = {
+            "calls": n,
+            "total_ms": round(total * 1000, 3),
+            "mean_ms": round(total / n * 1000, 4),
+            "p50_ms": round(_bucket_quantile(buckets, counts, 0.5) * 1000, 4),
+            "p95_ms": round(_bucket_quantile(buckets, counts, 0.95) * 1000, 4),
+        }
+
+    alloc = _delta(before["alloc"], after["alloc"])
+    for (name,), (counts, total, n) in alloc.items():
+        if name in out:
+            out[name]["alloc_mean_kb"] = round(total / n / 1024, 2)
+            out[name]["alloc_p95_kb"] = round(_bucket_quantile(metrics.STAGE_ALLOC_BYTES.buckets, counts, 0.95) / 1024, 2)
+    return out
+
+
+def run(frames=300, size=(1280, 720), cars=4, seed=0, video=None, force_stub=False, trace_alloc=False):
+    """
+    تشغيل الـ benchmark كامل وإرجاع نتيجة JSON-serializable
+    frames: طول الفيديو الصناعي (الفيديو الموجود بيتعالج كله)
+    """
+    vdet, pdet, ocr, kinds = load_models(force_stub)
+    if trace_alloc:
+        metrics.trace_allocations()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        truth = None
+        if video is None:
+            video = tmp / "synthetic.mp4"
+            truth = make_video(video, frames=frames, size=size, cars=cars, seed=seed)
+
+        before = snapshot()
+        counts, wall, db = process(video, (vdet, pdet, ocr))
+        after = snapshot()
+        db.close()
+
+    if trace_alloc:
+        metrics.trace_allocations(False)
+
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "opencv": cv2.__version__,
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "models": kinds,
+            "video": "synthetic" if truth else str(video),
+            "seed": seed if truth else None,
+            "config": {
+                "PROCESS_WIDTH": SystemConfig.PROCESS_WIDTH,
+                "INFERENCE_IMGSZ": SystemConfig.INFERENCE_IMGSZ,
+                "PROCESS_EVERY_N_FRAMES": SystemConfig.PROCESS_EVERY_N_FRAMES,
+                "DETECT_MODE": SystemConfig.DETECT_MODE,
+                "OFFLINE_MODE": SystemConfig.OFFLINE_MODE,
+                "PLATE_DETECT_MODE": SystemConfig.PLATE_DETECT_MODE,
+                "OCR_STABLE_FRAMES": SystemConfig.OCR_STABLE_FRAMES,
+                "OCR_VOTING_WINDOW": SystemConfig.OCR_VOTING_WINDOW,
+                "SPEED_CALC_INTERVAL": SystemConfig.SPEED_CALC_INTERVAL,
+            },
+        },
+        "counts": counts,
+        "wall_s": round(wall, 3),
+        "fps": round(counts["frames"] / wall, 2) if wall else None,
+        "stages": stage_report(before, after),
+    }
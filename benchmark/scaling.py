@@ -0,0 +1,117 @@
+"""
+الـ throughput الكلي لما عدد الـ jobs المتوازية بيزيد - مع وبدون توزيع الـ threads (core.resources)
+
+  default: كل engine بيعمل threads بعدد كل الـ cores (سلوك الـ libraries العادي)
+  managed: كل job ياخد cores / jobs من الـ threads (ولو --affinity يتثبت على cores منفصلة)
+
+  python -m benchmark.scaling --jobs 1 2 4 --frames 200 --out scaling.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from benchmark.synthetic import make_video
+
+_worker = {}
+
+
+def _init(policy, jobs, counter, barrier, affinity, force_stub):
+    # spawn: الـ process جديدة فالـ env بيتطبق قبل import بتاع torch / paddle
+    from config import SystemConfig
+    from core import resources
+    if policy == "managed":
+        SystemConfig.CPU_AFFINITY = affinity
+        with counter.get_lock():
+            index = counter.value
+            counter.value += 1
+        _worker["budget"] = resources.apply(resources.plan(jobs, index))
+
+    from benchmark.runner import load_models
+    _worker["models"] = load_models(force_stub)
+    _worker["barrier"] = barrier
+
+
+def _ready():
+    # كل worker بياخد واحدة بس (الـ barrier) - كده الموديلات كلها اتحملت قبل ما نبدأ التوقيت
+    _worker["barrier"].wait()
+    return _worker.get("budget")
+
+
+def _job(video):
+    from benchmark.runner import process
+
+    counts, wall, db = process(video, _worker["models"][:3])
+    db.close()
+    return counts["frames"], wall
+
+
+def measure(video, jobs, policy, affinity=False, force_stub=False):
+    ctx = multiprocessing.get_context("spawn")
+    counter = ctx.Value("i", 0)
+    barrier = ctx.Barrier(jobs)
+
+    with ProcessPoolExecutor(
+        max_workers=jobs,
+        mp_context=ctx,
+        initializer=_init,
+        initargs=(policy, jobs, counter, barrier, affinity, force_stub)
+    ) as pool:
+        budgets = [f.result() for f in [pool.submit(_ready) for _ in range(jobs)]]
+
+        t0 = time.perf_counter()
+        results = [f.result() for f in [pool.submit(_job, str(video)) for _ in range(jobs)]]
+        wall = time.perf_counter() - t0
+
+    total = sum(n for n, _ in results)
+    per_job = [n / w for n, w in results if w]
+    return {
+        "jobs": jobs,
+        "policy": policy,
+        "wall_s": round(wall, 3),
+        "aggregate_fps": round(total / wall, 2) if wall else None,
+        "per_job_fps": round(sum(per_job) / len(per_job), 2) if per_job else None,
+        "budget": budgets[0],
+    }
+
+
+def run(jobs=(1, 2, 4), frames=200, video=None, policies=("default", "managed"), affinity=False, force_stub=False):
+    with tempfile.TemporaryDirectory() as tmp:
+        if video is None:
+            video = Path(tmp) / "synthetic.mp4"
+            make_video(video, frames=frames)
+
+        rows = []
+        for policy in policies:
+            for n in jobs:
+                rows.append(measure(video, n, policy, affinity, force_stub))
+
+    # السرعة النسبية للـ throughput الكلي مقارنة بـ job واحد بنفس الـ policy
+    base = {r["policy"]: r["aggregate_fps"] for r in rows if r["jobs"] == min(jobs)}
+    for r in rows:
+        b = base.get(r["policy"])
+        r["scaling"] = round(r["aggregate_fps"] / b, 2) if b and r["aggregate_fps"] else None
+
+    return {"cores": os.cpu_count(), "frames": frames, "affinity": affinity, "results": rows}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Aggregate throughput as parallel jobs scale, with and without thread budgets")
+    parser.add_argument("--jobs", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--video", help="use an existing video instead of a synthetic one")
+    parser.add_argument("--policies", nargs="+", choices=("default", "managed"), default=["default", "managed"])
+    parser.add_argument("--affinity", action="store_true", help="pin each managed job to its own cores")
+    parser.add_argument("--stub", action="store_true", help="force stub models even if real ones exist")
+    parser.add_argument("--out", help="write JSON result to this file")
+    args = parser.parse_args()
+
+    result = run(tuple(args.jobs), args.frames, args.video, tuple(args.policies), args.affinity, args.stub)
+    text = json.dumps(result, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text)
+    print(text)
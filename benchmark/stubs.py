@@ -0,0 +1,97 @@
+"""
+موديلات بديلة deterministic للـ benchmark لما الموديلات الحقيقية مش موجودة
+(CPU بس، بدون network) - نفس الـ interface بتاع VehicleDetector / PlateDetector / OCREngine
+"""
+import cv2
+import numpy as np
+from ocr.cache import CachedReader, dhash
+from ocr.preprocess import PlatePreprocessor
+
+
+def _components(mask, min_area):
+    n, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+    boxes = []
+    for i in range(1, n):
+        x, y, w, h, area = stats[i]
+        if area >= min_area:
+            boxes.append((float(x), float(y), float(x + w), float(y + h), float(area)))
+    return boxes
+
+
+class StubVehicleDetector:
+    def __init__(self, model=None, conf=None, min_area=400, max_dist=80):
+        self.min_area = min_area
+        self.max_dist = max_dist
+        self.tracks = {}
+        self.next_id = 1
+
+    def reset(self):
+        self.tracks = {}
+        self.next_id = 1
+
+    def detect(self, frame):
+        hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
+        mask = cv2.inRange(hsv, (0, 100, 60), (180, 255, 255))
+
+        # tracking بسيط بأقرب مركز بدل ByteTrack
+        vehicles = []
+        used = set()
+        for x1, y1, x2, y2, _ in _components(mask, self.min_area):
+            center = ((x1 + x2) / 2, (y1 + y2) / 2)
+            best, best_d = None, self.max_dist
+            for tid, prev in self.tracks.items():
+                if tid in used:
+                    continue
+                d = np.hypot(center[0] - prev[0], center[1] - prev[1])
+                if d < best_d:
+                    best, best_d = tid, d
+            if best is None:
+                best = self.next_id
+                self.next_id += 1
+            used.add(best)
+            vehicles.append({
+                "track_id": best,
+                "bbox": (x1, y1, x2, y2),
+                "center": center
+            })
+
+        self.tracks = {v["track_id"]: v["center"] for v in vehicles}
+        return vehicles
+
+
+class StubPlateDetector:
+    def __init__(self, model=None, conf=None, min_area=60):
+        self.min_area = min_area
+
+    def _boxes(self, img):
+        mask = cv2.inRange(img, (200, 200, 200), (255, 255, 255))
+        mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, np.ones((5, 5), np.uint8))
+        return _components(mask, self.min_area)
+
+    def detect(self, crop, with_conf=False):
+        if crop is None or crop.size == 0:
+            return None
+        boxes = self._boxes(crop)
+        if not boxes:
+            return None
+        best = max(boxes, key=lambda b: b[4])
+        box = np.array(best[:4], dtype=np.float32)
+        if with_conf:
+            return box, 0.9
+        return box
+
+    def detect_all(self, frame):
+        boxes = self._boxes(frame)
+        if not boxes:
+            return np.zeros((0, 5), dtype=np.float32)
+        return np.array([(*b[:4], 0.9) for b in boxes], dtype=np.float32)
+
+
+class StubOCREngine(CachedReader):
+    def _read(self, img):
+        # نفس الـ preprocessing الحقيقي عشان التكلفة تبقى قريبة، والنص من hash خشن للصورة
+        out = []
+        for var in PlatePreprocessor.generate(img):
+            h = dhash(var, size=4)
+            out.append(("SYN%04d" % (h % 10000), 0.9))
+        return out
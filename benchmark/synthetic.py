@@ -0,0 +1,79 @@
+import json
+import cv2
+import numpy as np
+
+# ألوان السيارات مشبعة عشان الـ stub detector يلاقيها بالـ saturation
+CAR_COLORS = [
+    (40, 40, 200), (200, 60, 40), (40, 180, 40),
+    (30, 160, 220), (180, 40, 180), (200, 200, 30),
+]
+ROAD_COLOR = (70, 70, 70)
+PLATE_CHARS = "ABCDEFGHJKLMNPRSTUVXYZ"
+
+
+def _plate_text(rng):
+    letters = "".join(rng.choice(list(PLATE_CHARS), 3))
+    digits = "".join(rng.choice(list("0123456789"), 3))
+    return letters + digits
+
+
+def make_video(path, frames=300, size=(1280, 720), fps=24.0, cars=4, seed=0):
+    """
+    توليد فيديو مرور صناعي: مستطيلات بتتحرك ومرسوم عليها لوحة بنص
+    بيرجع ground truth لكل سيارة (اللوحة والسرعة بالبكسل/frame) وبيحفظه جنب الفيديو
+    """
+    rng = np.random.default_rng(seed)
+    w, h = size
+    lane_h = h // (cars + 1)
+
+    vehicles = []
+    for i in range(cars):
+        car_w = int(rng.integers(w // 10, w // 6))
+        car_h = int(min(lane_h * 0.8, car_w * 0.6))
+        vehicles.append({
+            "id": i,
+            "plate": _plate_text(rng),
+            "color": CAR_COLORS[i % len(CAR_COLORS)],
+            "size": (car_w, car_h),
+            "y": int(lane_h * (i + 0.6)),
+            "x0": float(rng.integers(-w // 2, 0)),
+            "speed_px": float(rng.uniform(4, 14)),
+        })
+
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"mp4v"), fps, (w, h))
+    frame = np.empty((h, w, 3), dtype=np.uint8)
+
+    for f in range(frames):
+        frame[:] = ROAD_COLOR
+        for v in vehicles:
+            car_w, car_h = v["size"]
+            # السيارة بتلف من أول الكادر لما تخرج
+            x = int((v["x0"] + v["speed_px"] * f) % (w + car_w)) - car_w
+            y = v["y"]
+            cv2.rectangle(frame, (x, y), (x + car_w, y + car_h), v["color"], -1)
+
+            pw, ph = int(car_w * 0.45), int(car_h * 0.22)
+            px = x + (car_w - pw) // 2
+            py = y + car_h - ph - 4
+            cv2.rectangle(frame, (px, py), (px + pw, py + ph), (255, 255, 255), -1)
+            scale = ph / 32.0
+            cv2.putText(
+                frame, v["plate"], (px + 4, py + ph - 5),
+                cv2.FONT_HERSHEY_SIMPLEX, scale, (0, 0, 0), max(1, int(scale * 2))
+            )
+        writer.write(frame)
+
+    writer.release()
+
+    truth = {
+        "frames": frames,
+        "size": [w, h],
+        "fps": fps,
+        "vehicles": [
+            {"id": v["id"], "plate": v["plate"], "speed_px_per_frame": round(v["speed_px"], 3)}
+            for v in vehicles
+        ],
+    }
+    with open(str(path) + ".json", "w", encoding="utf-8") as f:
+        json.dump(truth, f, indent=2)
+    return truth
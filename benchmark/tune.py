@@ -0,0 +1,236 @@
+"""
+ضبط إعدادات السرعة/الدقة على clips معلّمة: بيجرب تركيبات من SystemConfig
+وبيقيس FPS + دقة اللوحات + خطأ السرعة، وبيطلع الـ configs اللي على الـ Pareto frontier
+(مفيش config تانية أسرع وأدق وخطأ سرعتها أقل في نفس الوقت)
+
+ملف الـ labels:
+  {"clips": [{"video": "gate1.mp4", "camera_id": "gate1",
+              "vehicles": [{"plate": "ABC123", "speed_kmh": 54.0}, ...]}]}
+(مسار الفيديو نسبي لملف الـ labels)
+
+  python -m benchmark.tune --labels site.json --samples 40 --out tune.json --markdown tune.md
+  python -m benchmark.tune --synthetic 2 --stub     # تجربة سريعة على فيديوهات صناعية
+"""
+import argparse
+import itertools
+import json
+import random
+import tempfile
+from pathlib import Path
+from config import SystemConfig
+from database import canonical_plate
+from benchmark.runner import load_models, overrides, process
+from benchmark.synthetic import make_video
+
+# القيم اللي بتتجرب لكل إعداد (ممكن تتغير بـ --space)
+SPACE = {
+    "PROCESS_WIDTH": [640, 960, 1280],
+    "PROCESS_EVERY_N_FRAMES": [1, 2, 3],
+    "VEHICLE_CONF": [0.3, 0.4, 0.5],
+    "PLATE_CONF": [0.2, 0.25, 0.35],
+    "OCR_STABLE_FRAMES": [3, 5],
+    "OCR_VOTING_WINDOW": [5, 10],
+}
+
+
+def load_labels(path):
+    path = Path(path)
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    clips = []
+    for clip in data["clips"]:
+        video = Path(clip["video"])
+        clips.append({
+            "video": str(video if video.is_absolute() else path.parent / video),
+            "camera_id": clip.get("camera_id"),
+            "vehicles": clip.get("vehicles", []),
+        })
+    return clips
+
+
+def synthetic_clips(directory, count, frames=240):
+    """فيديوهات صناعية - السرعة الحقيقية بتتحول من بكسل/إطار لـ km/h بـ SPEED_PPM"""
+    clips = []
+    for i in range(count):
+        video = Path(directory) / f"synthetic_{i}.mp4"
+        truth = make_video(video, frames=frames, seed=i)
+        clips.append({
+            "video": str(video),
+            "camera_id": None,
+            "vehicles": [
+                {
+                    "plate": v["plate"],
+                    "speed_kmh": round(v["speed_px_per_frame"] * truth["fps"] / SystemConfig.SPEED_PPM * 3.6, 2)
+                }
+                for v in truth["vehicles"]
+            ],
+        })
+    return clips
+
+
+def candidates(space, samples=None, seed=0):
+    """كل التركيبات (grid) أو عينة عشوائية منها - الـ config الحالية دايماً أول واحدة"""
+    keys = sorted(space)
+    grid = [dict(zip(keys, values)) for values in itertools.product(*(space[k] for k in keys))]
+    baseline = {k: getattr(SystemConfig, k) for k in keys}
+    grid = [c for c in grid if c != baseline]
+    if samples and samples - 1 < len(grid):
+        grid = random.Random(seed).sample(grid, samples - 1)
+    return [baseline] + grid
+
+
+def score(db, truth):
+    """(اللوحات الصح, عدد المقروء, عدد الحقيقي, أخطاء السرعة) لـ clip واحد"""
+    rows = db.c.execute("SELECT plate, avg_speed FROM vehicles WHERE plate IS NOT NULL").fetchall()
+    read = {}
+    for plate, speed in rows:
+        read.setdefault(canonical_plate(plate), speed)
+
+    expected = {canonical_plate(v["plate"]): v.get("speed_kmh") for v in truth}
+    correct = set(read) & set(expected)
+    errors = [
+        abs(read[p] - expected[p])
+        for p in correct
+        if expected[p] is not None and read[p] is not None
+    ]
+    return len(correct), len(read), len(expected), errors
+
+
+def evaluate(config, clips, models):
+    """تشغيل كل الـ clips بـ config واحدة بنفس مسار الـ API (benchmark.runner.process)"""
+    values = dict(config)
+    if "PROCESS_WIDTH" in config:
+        values["PROCESS_HEIGHT"] = config["PROCESS_WIDTH"] * 9 // 16
+
+    frames = correct = n_read = n_truth = 0
+    errors = []
+    wall = 0.0
+    with overrides(values):
+        vdet, pdet, _ = models
+        # الثقة بتتقري من الكاشف نفسه مش من SystemConfig
+        vdet.conf, pdet.conf = SystemConfig.VEHICLE_CONF, SystemConfig.PLATE_CONF
+
+        for clip in clips:
+            counts, seconds, db = process(clip["video"], models, clip["camera_id"])
+            wall += seconds
+            frames += counts["frames"]
+
+            c, r, t, e = score(db, clip["vehicles"])
+            correct, n_read, n_truth = correct + c, n_read + r, n_truth + t
+            errors.extend(e)
+            db.close()
+
+    precision = correct / n_read if n_read else 0.0
+    recall = correct / n_truth if n_truth else 0.0
+    return {
+        "config": config,
+        "fps": round(frames / wall, 2) if wall else 0.0,
+        "plate_precision": round(precision, 4),
+        "plate_recall": round(recall, 4),
+        "plate_f1": round(2 * precision * recall / (precision + recall), 4) if precision + recall else 0.0,
+        "speed_mae_kmh": round(sum(errors) / len(errors), 2) if errors else None,
+        "speed_matched": len(errors),
+    }
+
+
+def _objectives(trial):
+    # الأكبر أحسن في الكل (خطأ السرعة بالسالب، ومن غير قياس = أسوأ حاجة)
+    mae = trial["speed_mae_kmh"]
+    return trial["fps"], trial["plate_f1"], -mae if mae is not None else float("-inf")
+
+
+def pareto(trials):
+    """الـ trials اللي مفيش trial تانية أحسن منها أو زيها في كل الأهداف وأحسن في واحد"""
+    objs = [_objectives(t) for t in trials]
+    front = []
+    for i, a in enumerate(objs):
+        dominated = any(
+            all(x >= y for x, y in zip(b, a)) and any(x > y for x, y in zip(b, a))
+            for j, b in enumerate(objs) if j != i
+        )
+        if not dominated:
+            front.append(trials[i])
+    return sorted(front, key=lambda t: t["fps"], reverse=True)
+
+
+def markdown(report):
+    keys = sorted(report["space"])
+    lines = [
+        f"# Tuning report ({report['trials']} configs, {len(report['clips'])} clips, models: {report['models']})",
+        "",
+        "Pareto-optimal configs (fastest first). `*` = current SystemConfig.",
+        "",
+        "| " + " | ".join(["", "fps", "plate F1", "precision", "recall", "speed MAE km/h"] + keys) + " |",
+        "|" + "---|" * (6 + len(keys)),
+    ]
+    for t in report["pareto"]:
+        mark = "*" if t["config"] == report["baseline"]["config"] else ""
+        mae = "-" if t["speed_mae_kmh"] is None else t["speed_mae_kmh"]
+        cells = [mark, t["fps"], t["plate_f1"], t["plate_precision"], t["plate_recall"], mae]
+        cells += [t["config"][k] for k in keys]
+        lines.append("| " + " | ".join(str(c) for c in cells) + " |")
+
+    b = report["baseline"]
+    lines += [
+        "",
+        f"Current config: {b['fps']} fps, plate F1 {b['plate_f1']}, speed MAE {b['speed_mae_kmh']} km/h",
+    ]
+    return "\n".join(lines) + "\n"
+
+
+def run(clips, space=None, samples=None, seed=0, force_stub=False, log=print):
+    space = space or SPACE
+    vdet, pdet, ocr, kinds = load_models(force_stub)
+    models = (vdet, pdet, ocr)
+
+    trials = []
+    configs = candidates(space, samples, seed)
+    for i, config in enumerate(configs, 1):
+        trial = evaluate(config, clips, models)
+        trials.append(trial)
+        if log:
+            log(f"[{i}/{len(configs)}] fps={trial['fps']} f1={trial['plate_f1']} mae={trial['speed_mae_kmh']} {config}")
+
+    return {
+        "models": kinds,
+        "clips": [c["video"] for c in clips],
+        "space": space,
+        "trials": len(trials),
+        "baseline": trials[0],
+        "pareto": pareto(trials),
+        "all": trials,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Search config knobs and report the fps / plate accuracy / speed error Pareto front")
+    parser.add_argument("--labels", help="labeled clip set (JSON)")
+    parser.add_argument("--synthetic", type=int, default=0, help="use N synthetic clips instead of --labels")
+    parser.add_argument("--space", help="JSON {setting: [values]} to search instead of the default space")
+    parser.add_argument("--samples", type=int, help="random sample of the grid (default: full grid)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--stub", action="store_true", help="force stub models even if real ones exist")
+    parser.add_argument("--out", help="write the full JSON report to this file")
+    parser.add_argument("--markdown", help="write the Pareto table to this file")
+    args = parser.parse_args()
+
+    if not args.labels and not args.synthetic:
+        parser.error("--labels or --synthetic is required")
+
+    space = None
+    if args.space:
+        with open(args.space, encoding="utf-8") as f:
+            space = json.load(f)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        clips = load_labels(args.labels) if args.labels else synthetic_clips(tmp, args.synthetic)
+        report = run(clips, space, args.samples, args.seed, args.stub)
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    text = markdown(report)
+    if args.markdown:
+        with open(args.markdown, "w", encoding="utf-8") as f:
+            f.write(text)
+    print(text)
@@ -0,0 +1,96 @@
+"""
+مقارنة طريقتين لكشف اللوحات على نفس الفيديو:
+  crop  : PlateDetector مرة لكل سيارة
+  frame : PlateDetector مرة واحدة على الإطار كله + ربط اللوحات بالسيارات
+
+الاستخدام:
+  python benchmark_plate_modes.py video.mp4 --frames 300
+"""
+import argparse
+import json
+import time
+import cv2
+import numpy as np
+from config import SystemConfig
+from detection.vehicle_detector import VehicleDetector
+from detection.plate_detector import PlateDetector, assign_plates
+from core.frames import resize_frame
+
+
+def run(video_path, max_frames):
+    vdet = VehicleDetector(SystemConfig.VEHICLE_MODEL, SystemConfig.VEHICLE_CONF)
+    pdet = PlateDetector(SystemConfig.PLATE_MODEL, SystemConfig.PLATE_CONF)
+
+    cap = cv2.VideoCapture(video_path)
+    frames = 0
+    vehicle_count = 0
+    crop_time = frame_time = 0.0
+    crop_calls = frame_calls = 0
+    crop_found = frame_found = both_found = 0
+
+    while cap.isOpened() and frames < max_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames += 1
+        if frames % SystemConfig.PROCESS_EVERY_N_FRAMES != 0:
+            continue
+
+        frame = resize_frame(frame)
+        vehicles = vdet.detect(frame)
+        if not vehicles:
+            continue
+        vehicle_count += len(vehicles)
+
+        # crop: inference لكل سيارة
+        t0 = time.perf_counter()
+        crop_hits = set()
+        for v in vehicles:
+            x1, y1, x2, y2 = map(int, v["bbox"])
+            crop_calls += 1
+            if pdet.detect(frame[max(y1, 0):y2, max(x1, 0):x2]) is not None:
+                crop_hits.add(v["track_id"])
+        crop_time += time.perf_counter() - t0
+
+        # frame: inference واحد للإطار
+        t0 = time.perf_counter()
+        frame_calls += 1
+        plates = pdet.detect_all(frame)
+        boxes = np.array([v["bbox"] for v in vehicles], dtype=np.float32)
+        assigned = assign_plates(plates, boxes, SystemConfig.PLATE_ASSIGN_MIN_OVERLAP)
+        frame_hits = {vehicles[i]["track_id"] for i in assigned}
+        frame_time += time.perf_counter() - t0
+
+        crop_found += len(crop_hits)
+        frame_found += len(frame_hits)
+        both_found += len(crop_hits & frame_hits)
+
+    cap.release()
+
+    return {
+        "video": str(video_path),
+        "frames": frames,
+        "vehicle_detections": vehicle_count,
+        "crop": {
+            "inferences": crop_calls,
+            "total_ms": round(crop_time * 1000, 2),
+            "plates_found": crop_found,
+        },
+        "frame": {
+            "inferences": frame_calls,
+            "total_ms": round(frame_time * 1000, 2),
+            "plates_found": frame_found,
+        },
+        # recall الطريقة الجديدة بالنسبة لطريقة الـ crop (المرجع)
+        "frame_recall_vs_crop": round(both_found / crop_found, 4) if crop_found else None,
+        "speedup": round(crop_time / frame_time, 2) if frame_time else None,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark per-crop vs full-frame plate detection")
+    parser.add_argument("video")
+    parser.add_argument("--frames", type=int, default=300)
+    args = parser.parse_args()
+
+    print(json.dumps(run(args.video, args.frames), indent=2))
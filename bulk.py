@@ -0,0 +1,268 @@
+"""
+معالجة أرشيف فيديوهات من غير الـ API: process pool بعدد الـ cores،
+كل worker بيحمّل الموديلات مرة واحدة ويعالج فيديو ورا التاني
+
+  python -m core.bulk /archive/2024 "clips/*.mp4" --workers 8 --db --format ndjson parquet
+
+- كل فيديو بيتعالج في DB مؤقتة في الذاكرة، والنتيجة بترجع للـ process الرئيسي
+  اللي هو الوحيد اللي بيكتب (ملفات النتايج + الـ DB + الـ manifest)
+- manifest.jsonl بيتسجل فيه كل فيديو خلص، فإعادة تشغيل نفس الأمر بتكمّل من مكان ما وقف
+"""
+import argparse
+import glob
+import hashlib
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from config import SystemConfig
+from core import resources
+from database import DatabaseManager
+
+MANIFEST = "manifest.jsonl"
+
+# حالة الـ worker (الموديلات بتتحمل مرة واحدة في initializer)
+_worker = {}
+
+
+def find_videos(inputs):
+    """ملفات / مجلدات (recursive) / glob patterns -> قايمة مسارات بدون تكرار"""
+    found = []
+    for item in inputs:
+        p = Path(item)
+        if p.is_dir():
+            found.extend(p.rglob("*"))
+        elif p.is_file():
+            found.append(p)
+        else:
+            found.extend(Path(f) for f in glob.glob(item, recursive=True))
+    seen = set()
+    out = []
+    for f in sorted(f.resolve() for f in found if f.suffix.lower() in SystemConfig.VIDEO_FORMATS):
+        if f not in seen:
+            seen.add(f)
+            out.append(f)
+    return out
+
+
+def video_key(path):
+    """اسم ثابت لملفات النتايج (اسم الفيديو + hash المسار عشان الأسماء المتكررة)"""
+    return f"{path.stem}-{hashlib.sha1(str(path).encode()).hexdigest()[:8]}"
+
+
+def fingerprint(path):
+    st = path.stat()
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def load_manifest(out_dir):
+    """آخر حالة لكل فيديو في الـ manifest"""
+    entries = {}
+    path = out_dir / MANIFEST
+    if not path.exists():
+        return entries
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # سطر ناقص من تشغيل اتقطع
+                continue
+            entries[entry["video"]] = entry
+    return entries
+
+
+def _init_worker(workers, counter, watchlist, camera_id):
+    # كل worker ياخد نصيبه من الـ cores بدل ما كلهم يتخانقوا على كل الـ cores
+    with counter.get_lock():
+        index = counter.value
+        counter.value += 1
+    resources.apply(resources.plan(workers, index))
+
+    from core.vehicle_processor import VehicleProcessor
+    _worker["models"] = VehicleProcessor.load_models()
+    _worker["watchlist"] = watchlist
+    _worker["camera_id"] = camera_id
+
+
+def _process(path, key):
+    from core.video_processor import VideoProcessor
+
+    db = DatabaseManager(":memory:")
+    for plate, reason in _worker["watchlist"]:
+        db.add_to_watchlist(plate, reason)
+
+    t0 = time.perf_counter()
+    vp = VideoProcessor(db, _worker["camera_id"], task_id=key, models=_worker["models"])
+    vp.proc.evidence_dir = SystemConfig.EVIDENCE_DIR / "bulk" / key
+    vp.process_video(path)
+    seconds = time.perf_counter() - t0
+
+    rows = db.dump()
+    db.close()
+    return {
+        "rows": rows,
+        "frames": vp.proc.frame_counter,
+        "seconds": round(seconds, 3),
+        "ocr": vp.proc.get_ocr_metrics(),
+        "speed": vp.proc.get_speed_metrics(),
+    }
+
+
+def to_records(video, rows, ids=None):
+    """سطر لكل سيارة: بيانات السيارة + المخالفة + التنبيهات"""
+    ids = ids or {}
+    violations = {r[0]: r for r in rows["violations"]}
+    alerts = {}
+    for r in rows["alerts"]:
+        alerts.setdefault(r[0], []).append(r[2])
+    reads = {}
+    for r in rows["ocr_timeline"]:
+        reads[r[0]] = reads.get(r[0], 0) + 1
+
+    records = []
+    for vid, track_id, plate, max_speed, avg_speed, evidence_path in rows["vehicles"]:
+        v = violations.get(vid)
+        records.append({
+            "video": video,
+            "vehicle_id": ids.get(vid, vid),
+            "track_id": track_id,
+            "plate": plate,
+            "max_speed": max_speed,
+            "avg_speed": avg_speed,
+            "violation_speed": v[2] if v else None,
+            "speed_limit": v[3] if v else None,
+            "watchlist_hits": alerts.get(vid, []),
+            "ocr_reads": reads.get(vid, 0),
+            "evidence_path": evidence_path,
+        })
+    return records
+
+
+def write_ndjson(records, path):
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        for r in records:
+            f.write(json.dumps(r, ensure_ascii=False) + "\n")
+    os.replace(tmp, path)
+
+
+def write_parquet(records, path):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    tmp = path.with_suffix(".tmp")
+    pq.write_table(pa.Table.from_pylist(records), tmp)
+    os.replace(tmp, path)
+
+
+WRITERS = {"ndjson": write_ndjson, "parquet": write_parquet}
+
+
+def run(inputs, out_dir=None, workers=None, formats=None, db_path=None, camera_id=None, resume=True):
+    """
+    db_path: لو اتبعت النتايج بتتضاف للـ DB دي كمان (من الـ process الرئيسي بس)
+    بترجع ملخص (عدد اللي خلص / اتسكيب / فشل)
+    """
+    out_dir = Path(out_dir or SystemConfig.BULK_OUTPUT_DIR)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    formats = tuple(formats or SystemConfig.BULK_FORMATS)
+    for fmt in formats:
+        if fmt not in WRITERS:
+            raise ValueError(f"unknown output format: {fmt}")
+    if "parquet" in formats:
+        # نفشل من الأول بدل ما نفشل بعد أول فيديو
+        import pyarrow  # noqa: F401
+
+    videos = find_videos(inputs)
+    manifest = load_manifest(out_dir) if resume else {}
+    pending = []
+    skipped = 0
+    for path in videos:
+        entry = manifest.get(str(path))
+        if entry and entry["status"] == "done" and entry.get("fingerprint") == fingerprint(path):
+            skipped += 1
+        else:
+            pending.append(path)
+
+    summary = {"videos": len(videos), "skipped": skipped, "done": 0, "failed": 0}
+    if not pending:
+        return summary
+
+    workers = max(1, min(workers or SystemConfig.BULK_WORKERS or os.cpu_count() or 1, len(pending)))
+    budget = resources.plan(workers)
+
+    # الـ watchlist بتتنسخ لكل worker مرة واحدة
+    db = DatabaseManager(str(db_path)) if db_path else None
+    source = db or DatabaseManager(str(SystemConfig.DB_PATH))
+    watchlist = source.get_watchlist()
+    if source is not db:
+        source.close()
+
+    print(f"{len(pending)} videos ({skipped} already done) on {workers} workers x {budget['torch']} threads")
+
+    try:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(workers, multiprocessing.Value("i", 0), watchlist, camera_id)
+        ) as pool, open(out_dir / MANIFEST, "a", encoding="utf-8") as mf:
+            futures = {pool.submit(_process, str(p), video_key(p)): p for p in pending}
+
+            for fut in as_completed(futures):
+                path = futures[fut]
+                key = video_key(path)
+                entry = {"video": str(path), "key": key, "fingerprint": fingerprint(path)}
+                try:
+                    result = fut.result()
+                    ids = db.merge(result["rows"]) if db is not None else None
+                    records = to_records(str(path), result["rows"], ids)
+                    for fmt in formats:
+                        WRITERS[fmt](records, out_dir / f"{key}.{fmt}")
+                    entry.update(
+                        status="done",
+                        vehicles=len(records),
+                        frames=result["frames"],
+                        seconds=result["seconds"],
+                        ocr=result["ocr"],
+                        speed=result["speed"],
+                    )
+                    summary["done"] += 1
+                except Exception as e:
+                    entry.update(status="failed", error=str(e))
+                    summary["failed"] += 1
+
+                # الـ manifest بيتكتب بعد ملفات النتايج، فأي سطر done معناه إن النتيجة كاملة
+                mf.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                mf.flush()
+                os.fsync(mf.fileno())
+                print(f"[{summary['done'] + summary['failed']}/{len(pending)}] {entry['status']}: {path}")
+    finally:
+        if db is not None:
+            db.close()
+
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Process a video archive without the API")
+    parser.add_argument("inputs", nargs="+", help="video files, directories or glob patterns")
+    parser.add_argument("--out", default=str(SystemConfig.BULK_OUTPUT_DIR), help="output directory (results + manifest)")
+    parser.add_argument("--workers", type=int, default=SystemConfig.BULK_WORKERS)
+    parser.add_argument("--format", nargs="+", choices=sorted(WRITERS), default=list(SystemConfig.BULK_FORMATS))
+    parser.add_argument("--db", nargs="?", const=str(SystemConfig.DB_PATH), help="also merge results into this SQLite DB")
+    parser.add_argument("--camera", help="camera id for ROI / homography")
+    parser.add_argument("--no-resume", action="store_true", help="reprocess videos already in the manifest")
+    args = parser.parse_args()
+
+    print(json.dumps(run(
+        args.inputs,
+        out_dir=args.out,
+        workers=args.workers,
+        formats=args.format,
+        db_path=args.db,
+        camera_id=args.camera,
+        resume=not args.no_resume,
+    ), indent=2))
@@ -0,0 +1,109 @@
+import cv2
+from collections import OrderedDict
+from config import SystemConfig
+
+def dhash(img, size=8):
+    """difference hash (64 bit) لـ crop اللوحة بعد توحيد الحجم والإضاءة"""
+    gray = img if img.ndim == 2 else cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(gray, (size + 1, size), interpolation=cv2.INTER_AREA)
+    diff = small[:, 1:] > small[:, :-1]
+    h = 0
+    for bit in diff.flatten():
+        h = (h << 1) | int(bit)
+    return h
+
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+
+class OCRCache:
+    def __init__(self, max_tracks=256, per_track=8, max_distance=4):
+        """
+        max_tracks: أقصى عدد tracks في الكاش (LRU)
+        per_track: أقصى عدد hashes لكل track (LRU)
+        max_distance: أقصى Hamming distance يعتبر نفس اللوحة
+        """
+        self.max_tracks = max_tracks
+        self.per_track = per_track
+        self.max_distance = max_distance
+        self.tracks = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, tid, h):
+        entries = self.tracks.get(tid)
+        if entries is None:
+            self.misses += 1
+            return None
+
+        self.tracks.move_to_end(tid)
+        for key in entries:
+            if hamming(key, h) <= self.max_distance:
+                entries.move_to_end(key)
+                self.hits += 1
+                return entries[key]
+
+        self.misses += 1
+        return None
+
+    def put(self, tid, h, results):
+        entries = self.tracks.get(tid)
+        if entries is None:
+            entries = self.tracks[tid] = OrderedDict()
+            if len(self.tracks) > self.max_tracks:
+                self.tracks.popitem(last=False)
+        self.tracks.move_to_end(tid)
+
+        entries[h] = results
+        entries.move_to_end(h)
+        if len(entries) > self.per_track:
+            entries.popitem(last=False)
+
+    def drop(self, tid):
+        self.tracks.pop(tid, None)
+
+    def clear(self):
+        """قبل فيديو جديد بنفس الـ engine: الـ track ids بتبدأ من الأول والإحصائيات لكل فيديو"""
+        self.tracks.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0
+
+
+class CachedReader:
+    """
+    read مشترك بين OCREngine والـ stub: القراءات بتتخزن لكل track بالـ dHash
+    الـ subclass بيعرّف _read(img) بس
+    """
+    def __init__(self):
+        self.cache = OCRCache(
+            SystemConfig.OCR_CACHE_MAX_TRACKS,
+            SystemConfig.OCR_CACHE_PER_TRACK,
+            SystemConfig.OCR_CACHE_MAX_DISTANCE
+        )
+
+    def read(self, img, tid=None):
+        """
+        tid: لو اتبعت، القراءات بتتخزن لكل track ولقطة شبه مطابقة بترجع من الكاش
+        """
+        if tid is not None and SystemConfig.OCR_CACHE_ENABLED:
+            h = dhash(img)
+            cached = self.cache.get(tid, h)
+            if cached is not None:
+                return list(cached)
+            out = self._read(img)
+            self.cache.put(tid, h, tuple(out))
+            return out
+        return self._read(img)
+
+    def read_batch(self, imgs):
+        """قراءات لمجموعة crops (من غير كاش) - list لكل crop بنفس الترتيب"""
+        return [self._read(img) for img in imgs]
+
+    def _read(self, img):
+        raise NotImplementedError
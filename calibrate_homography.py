@@ -0,0 +1,84 @@
+"""
+معايرة الكاميرا بدون واجهة (homography لكل كاميرا) من ملف نقاط
+
+ملف النقاط (JSON):
+{
+  "camera_1": {
+    "frame_size": [1920, 1080],
+    "image_points": [[x, y], ...],   # بكسل في الإطار الأصلي
+    "world_points": [[X, Y], ...]    # متر على الأرض (4 نقاط على الأقل)
+  }
+}
+
+الاستخدام:
+  python calibrate_homography.py points.json
+  python calibrate_homography.py points.json --out data/homography.json
+"""
+import argparse
+import json
+import sys
+import cv2
+import numpy as np
+from config import SystemConfig
+
+
+def calibrate(entry):
+    img = np.asarray(entry["image_points"], dtype=np.float32)
+    world = np.asarray(entry["world_points"], dtype=np.float32)
+
+    if len(img) < 4 or len(img) != len(world):
+        raise ValueError("need at least 4 matching image/world points")
+
+    H, _ = cv2.findHomography(img, world, method=0 if len(img) == 4 else cv2.RANSAC)
+    if H is None:
+        raise ValueError("points are degenerate (collinear?)")
+
+    # خطأ إعادة الإسقاط بالمتر
+    proj = cv2.perspectiveTransform(img.reshape(-1, 1, 2), H).reshape(-1, 2)
+    errors = np.linalg.norm(proj - world, axis=1)
+
+    return {
+        "frame_size": list(entry["frame_size"]),
+        "homography": H.tolist(),
+        "reprojection_error_m": {
+            "mean": round(float(errors.mean()), 4),
+            "max": round(float(errors.max()), 4)
+        }
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compute per-camera ground-plane homographies")
+    parser.add_argument("points", help="JSON file with point correspondences per camera")
+    parser.add_argument("--out", default=str(SystemConfig.SPEED_HOMOGRAPHY_PATH))
+    args = parser.parse_args()
+
+    with open(args.points, encoding="utf-8") as f:
+        cameras = json.load(f)
+
+    # الحفاظ على الكاميرات المعايرة قبل كده
+    try:
+        with open(args.out, encoding="utf-8") as f:
+            result = json.load(f)
+    except FileNotFoundError:
+        result = {}
+
+    failed = False
+    for camera_id, entry in cameras.items():
+        try:
+            result[camera_id] = calibrate(entry)
+            err = result[camera_id]["reprojection_error_m"]
+            print(f"{camera_id}: mean error {err['mean']} m, max {err['max']} m")
+        except (KeyError, ValueError) as e:
+            print(f"{camera_id}: {e}", file=sys.stderr)
+            failed = True
+
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+    print(f"saved -> {args.out}")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,8 +1,12 @@
+import sys
 import cv2
 import numpy as np
 
-# فتح الفيديو
-video_path = r"C:\Users\abdal\Videos\Sample.mp4"
+# فتح الفيديو (للمعايرة بدون واجهة استخدم calibrate_homography.py)
+if len(sys.argv) < 2:
+    print("الاستخدام: python calibrate_speed.py video.mp4")
+    exit()
+video_path = sys.argv[1]
 cap = cv2.VideoCapture(video_path)
 
 # اقرأ أول إطار
@@ -17,6 +17,19 @@ class SystemConfig:
     VEHICLE_CONF = 0.4  # خفّضت شوية للسرعة
     PLATE_CONF = 0.25
 
+    # طريقة كشف اللوحات:
+    # "crop"  = PlateDetector مرة لكل سيارة
+    # "frame" = مرة واحدة على الإطار كله وربط كل لوحة بالسيارة اللي فيها
+    PLATE_DETECT_MODE = "crop"
+    PLATE_ASSIGN_MIN_OVERLAP = 0.8  # أقل نسبة من اللوحة لازم تكون جوه السيارة
+
+    # Backend الـ inference للكاشفين:
+    # "torch" = .pt عادي | "onnx" = ONNX Runtime | "onnx-int8" = ONNX مكمّم بصور المعايرة
+    INFERENCE_BACKEND = "torch"
+    INFERENCE_IMGSZ = 640  # مقاس input الموديل (ثابت في ONNX)
+    CALIBRATION_DIR = DATA_DIR / "calibration"  # صور المعايرة للـ INT8
+    CALIBRATION_MAX_IMAGES = 200
+
     # ========== PERFORMANCE OPTIMIZATION ==========
     # معالجة resolution أصغر = سرعة أعلى
     PROCESS_WIDTH = 1280  # بدل 1920 (Full HD)
@@ -25,36 +38,150 @@ class SystemConfig:
     # معالجة كل N frames (skip frames للسرعة)
     PROCESS_EVERY_N_FRAMES = 2  # يعني هيعالج frame واحد ويسكيب واحد
     
+    # "skip": الإطارات بين كل N بتترمي
+    # "propagate": كل الإطارات بتتعالج، الكاشف كل K إطار والباقي optical flow
+    DETECT_MODE = "skip"
+    DETECT_EVERY_K = 3          # K المبدئي
+    DETECT_K_MIN = 1
+    DETECT_K_MAX = 6
+    DETECT_MANY_TRACKS = 8      # فوق العدد ده أقصى K بيبقى النص
+    DETECT_DRIFT_LOW = 0.05     # drift (نسبة من قطر الصندوق) أقل من كده -> K يزيد
+    DETECT_DRIFT_HIGH = 0.15    # أكبر من كده -> K يقل
+    
     # استخدام GPU إذا متوفر
     USE_GPU = True
     
     # حجم batch للمعالجة
     BATCH_SIZE = 2  # لو عندك GPU قوي، زوّده لـ 2 أو 4
 
+    # ========== CPU / THREADS ==========
+    # عدد مهام المعالجة اللي بتشتغل في نفس الوقت في الـ API (الباقي في الطابور)
+    MAX_PARALLEL_JOBS = 1
+    # threads لكل engine في كل job / worker - None = الـ cores مقسومة على عدد الـ jobs
+    THREADS_TORCH = None
+    THREADS_PADDLE = None
+    THREADS_OPENCV = None
+    # تثبيت كل worker في الـ bulk على cores منفصلة (Linux بس)
+    CPU_AFFINITY = False
+
+    # ========== OFFLINE MODE (الفيديوهات المرفوعة) ==========
+    # "single": OCR أثناء التتبع
+    # "two_pass": تتبع + تقييم الإطارات الأول، وبعدين OCR على أحسن إطارات كل سيارة بس
+    OFFLINE_MODE = "single"
+    TWO_PASS_TOP_FRAMES = 3     # عدد الإطارات اللي بتتقري لكل سيارة
+    TWO_PASS_SEEK_GAP = 30      # لو الإطار الجاي أقرب من كده بنقرا لقدام بدل seek
+
+    # ========== DETECTION CACHE ==========
+    # تسجيل مخرجات الـ tracker لكل فيديو وإعادة استخدامها (لتجربة إعدادات OCR / السرعة)
+    DETECTION_CACHE = False
+    DETECTION_CACHE_DIR = DATA_DIR / "detcache"
+
+    # ========== REGION OF INTEREST ==========
+    # مضلع لكل كاميرا / مهمة كنسبة من أبعاد الإطار (0..1)
+    # الكشف بيشتغل على المستطيل المحيط بس، والسيارات اللي مركزها برا المضلع بتتجاهل
+    # مثال: {"default": [(0.1, 0.4), (0.9, 0.4), (1.0, 1.0), (0.0, 1.0)]}
+    ROI_POLYGONS = {}
+
     # ========== OCR SETTINGS ==========
     OCR_STABLE_FRAMES = 5  # قلّلته من 5 للسرعة
     OCR_VOTING_WINDOW = 10  # قلّلته من 10
     OCR_MIN_W = 40  # قلّلته من 50
     OCR_MIN_H = 15  # قلّلته من 20
+    OCR_TARGET_HEIGHT = 96  # ارتفاع اللوحة بعد التكبير قبل الـ OCR (أقصى تكبير 2.5x)
+    OCR_EARLY_MARGIN = 1.5  # فرق الثقة الموزونة اللي يكفي لقرار مبكر قبل OCR_VOTING_WINDOW
+
+    # جودة اللوحة قبل الـ OCR (best-shot)
+    OCR_QUALITY_TOP_K = 3         # عدد أفضل اللقطات المحفوظة لكل سيارة
+    OCR_QUALITY_MARGIN = 0.1      # لقطة جديدة تتقري بس لو أحسن من أفضل قراءة بالفرق ده
+    OCR_QUALITY_MIN_SCORE = 0.3   # أقل جودة مقبولة (0..1)
+    OCR_QUALITY_RETRY_EVERY = 2   # من غير consensus: قراءة تانية كل العدد ده من اللقطات المقبولة
+    OCR_SHARPNESS_REF = 150.0     # Laplacian variance اللي بنعتبرها حادة تماماً
+    OCR_PLATE_ASPECT = 3.0        # نسبة العرض للارتفاع الطبيعية للوحة
+
+    # كاش القراءات للقطات شبه المطابقة (عربيات واقفة / بطيئة)
+    OCR_CACHE_ENABLED = True
+    OCR_CACHE_MAX_TRACKS = 256    # أقصى عدد سيارات في الكاش (LRU)
+    OCR_CACHE_PER_TRACK = 8       # أقصى عدد لقطات لكل سيارة
+    OCR_CACHE_MAX_DISTANCE = 4    # أقصى Hamming distance بين الـ hashes (من 64)
 
     # ========== SPEED CALCULATION ==========
-    SPEED_FPS = 24.0        # FPS الفيديو (مهم للدقة!)
+    SPEED_FPS = 24.0        # FPS احتياطي لو الفيديو مرجعش FPS
     SPEED_PPM = 83       # Pixels Per Meter (معايرة من الفيديو)
     SPEED_MAX = 200.0       # أقصى سرعة منطقية km/h
     SPEED_LIMIT = 60.0      # حد السرعة km/h
     
     # حساب السرعة كل N frames
     SPEED_CALC_INTERVAL = 3  # يحسب السرعة كل 3 frames
+
+    # استخدام timestamps الفيديو (CAP_PROP_POS_MSEC) بدل رقم الإطار / FPS
+    SPEED_USE_CONTAINER_TIMESTAMPS = False
+
+    # معايرة perspective (homography لكل كاميرا) - من calibrate_homography.py
+    # لو الكاميرا ملهاش homography بنستخدم SPEED_PPM
+    SPEED_HOMOGRAPHY_PATH = DATA_DIR / "homography.json"
+    SPEED_USE_LUT = False  # جدول متر لكل بكسل (bilinear) بدل الـ homography المباشر
     
     # حد أدنى للسرعة للحفظ (تجاهل السيارات الواقفة)
     SPEED_MIN_THRESHOLD = 5.0  # km/h
 
+    # ========== TRACK LIFECYCLE ==========
+    # السيارة اللي متشافتش العدد ده من الـ frames المعالجة بتتقفل وتتشال من الذاكرة
+    TRACK_LOST_FRAMES = 30
+
     # ========== WATCHLIST ==========
     WATCHLIST_THRESHOLD = 0.75
 
     # ========== EVIDENCE SAVING ==========
     SAVE_EVIDENCE = True
     SAVE_FRAME_QUALITY = 85  # جودة JPEG (0-100)
+
+    # ========== UPLOADS ==========
+    UPLOAD_CHUNK_SIZE = 1024 * 1024            # 1MB لكل كتابة
+    UPLOAD_MAX_BYTES = 20 * 1024 ** 3          # 20GB
+    # صيغ ممكن نعالجها وهي لسه بتترفع (الـ index مش في آخر الملف)
+    UPLOAD_PROGRESSIVE_FORMATS = (".ts", ".mkv")
+    UPLOAD_PROGRESSIVE_MIN_BYTES = 8 * 1024 * 1024  # نبدأ المعالجة بعد 8MB
+    UPLOAD_POLL_SECONDS = 1.0
+    # الـ seek في .ts / .mkv تقريبي: بنعمل seek لقبل الإطار بالمدة دي (keyframe)
+    # وبعدين grab لقدام لحد ما وقت الإطار (POS_MSEC) يطابق
+    SEEK_BACK_MS = 2000
+    VIDEO_FORMATS = ('.mp4', '.avi', '.mov', '.mkv', '.ts')
+
+    # ========== STILL IMAGES (كاميرات الكارتة / الجراجات) ==========
+    STILLS_BATCH_SIZE = 16        # صور في كل call للكاشف
+    STILLS_MAX_IMAGES = 1000      # أقصى عدد صور في الطلب الواحد
+    STILLS_DECODE_THREADS = 4     # فك الـ JPEG بالتوازي مع الكشف
+    STILLS_DETECT_VEHICLES = False  # كشف السيارات (vehicle_bbox) - pass زيادة مش محتاجينه للقراءة
+
+    # ========== BULK (CLI) ==========
+    BULK_WORKERS = None                  # None = عدد الـ cores
+    BULK_OUTPUT_DIR = DATA_DIR / "bulk"  # ملفات النتايج + manifest.jsonl
+    BULK_FORMATS = ("ndjson",)           # ndjson و/أو parquet (محتاج pyarrow)
+
+    # ========== EVENTS (SSE) ==========
+    EVENTS_HISTORY = 1000        # عدد الأحداث المحفوظة للـ resume بـ Last-Event-ID
+    EVENTS_CLIENT_BUFFER = 256   # أقصى أحداث في انتظار كل client
+    EVENTS_KEEPALIVE = 15        # ثواني بين رسائل keepalive
+    EVENTS_PROGRESS_EVERY = 25   # إرسال progress كل N frames
+
+    # ========== PLATE SIGHTINGS ==========
+    SIGHTINGS_CACHE_SIZE = 10000  # عدد اللوحات في كاش آخر ظهور (LRU)
+
+    # ========== RESPONSE CACHE (ETag) ==========
+    RESPONSE_CACHE_ENABLED = True
+    RESPONSE_CACHE_MAX_ENTRIES = 256  # عدد الردود المحفوظة (مسار + params)
+
+    # ========== RETENTION ==========
+    RETENTION_OCR_DAYS = 7           # ocr_timeline أقدم من كده بيتلخص في ocr_summary ويتأرشف
+    RETENTION_EVIDENCE_DAYS = 90     # مجلدات الأدلة أقدم من كده بتتمسح (None = مفيش حذف)
+    RETENTION_SUMMARY_TOP_K = 3      # عدد المرشحين المحفوظين لكل سيارة
+    RETENTION_BATCH_VEHICLES = 500   # عدد السيارات في كل transaction
+    RETENTION_VACUUM_PAGES = 2000    # صفحات incremental vacuum في كل تشغيل (0 = كل الفاضي)
+    RETENTION_INTERVAL_HOURS = 6     # تشغيل دوري جوه الـ API (0 = مفيش - مع أكتر من worker استخدم cron)
+    ARCHIVE_DIR = DATA_DIR / "archive"
+
+    # ========== EXPORT ==========
+    EXPORT_CHUNK_ROWS = 1000     # عدد الصفوف في كل chunk من الـ stream
     
     @classmethod
     def init_dirs(cls):
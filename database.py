@@ -1,13 +1,40 @@
+import re
 import sqlite3
 from datetime import datetime
 
+
+def canonical_plate(text):
+    """الشكل الموحد للوحة (حروف كبيرة وأرقام بس) - زي مخرجات الـ OCR"""
+    return re.sub(r"[^A-Z0-9]", "", (text or "").upper())
+
+
 class DatabaseManager:
+    # الجداول اللي ينفع تتصدّر: (الأعمدة, SELECT) - الجدول الأساسي دايماً alias "v"
+    EXPORTS = {
+        "vehicles": (
+            ("id", "track_id", "plate", "max_speed", "avg_speed", "evidence_path", "created_at"),
+            "SELECT v.id, v.track_id, v.plate, v.max_speed, v.avg_speed, v.evidence_path, v.created_at FROM vehicles v"
+        ),
+        "violations": (
+            ("id", "vehicle_id", "plate", "speed", "speed_limit", "evidence_path", "created_at"),
+            """SELECT v.id, v.vehicle_id, v.plate, v.speed, v.speed_limit, veh.evidence_path, v.created_at
+            FROM violations v LEFT JOIN vehicles veh ON veh.id = v.vehicle_id"""
+        ),
+        "alerts": (
+            ("id", "vehicle_id", "plate", "watchlist_plate", "reason", "similarity", "evidence_path", "created_at"),
+            "SELECT v.id, v.vehicle_id, v.plate, v.watchlist_plate, v.reason, v.similarity, v.evidence_path, v.created_at FROM alerts v"
+        ),
+    }
+
     def __init__(self, path):
         self.conn = sqlite3.connect(path, check_same_thread=False)
         self.c = self.conn.cursor()
         self._init()
 
     def _init(self):
+        # بيأثر بس على DB جديدة (قبل أول جدول) - القديمة بتتحول مرة واحدة من retention
+        self.c.execute("PRAGMA auto_vacuum = INCREMENTAL")
+
         # Vehicles table
         self.c.execute("""
         CREATE TABLE IF NOT EXISTS vehicles(
@@ -31,6 +58,22 @@ class DatabaseManager:
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         )""")
 
+        self.c.execute("CREATE INDEX IF NOT EXISTS idx_ocr_vehicle ON ocr_timeline(vehicle_id, frame)")
+        self.c.execute("CREATE INDEX IF NOT EXISTS idx_ocr_created ON ocr_timeline(created_at)")
+
+        # ملخص القراءات بعد ضغط ocr_timeline القديم (أفضل المرشحين لكل سيارة)
+        self.c.execute("""
+        CREATE TABLE IF NOT EXISTS ocr_summary(
+            vehicle_id INTEGER,
+            text TEXT,
+            reads INTEGER,
+            mean_confidence REAL,
+            max_confidence REAL,
+            first_frame INTEGER,
+            last_frame INTEGER,
+            PRIMARY KEY (vehicle_id, text)
+        )""")
+
         # Violations
         self.c.execute("""
         CREATE TABLE IF NOT EXISTS violations(
@@ -65,6 +108,35 @@ class DatabaseManager:
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         )""")
 
+        # Plate sightings - كل قراءة نهائية للوحة (مفتاح البحث: اللوحة + الوقت)
+        new_sightings = self.c.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name='plate_sightings'"
+        ).fetchone() is None
+        self.c.execute("""
+        CREATE TABLE IF NOT EXISTS plate_sightings(
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            plate TEXT NOT NULL,
+            vehicle_id INTEGER,
+            camera_id TEXT,
+            task_id TEXT,
+            confidence REAL,
+            consensus INTEGER DEFAULT 1,
+            seen_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )""")
+        self.c.execute(
+            "CREATE INDEX IF NOT EXISTS idx_sightings_plate_time ON plate_sightings(plate, seen_at)"
+        )
+        if new_sightings:
+            # DB قديمة: نبني الـ sightings من اللوحات الموجودة (الـ OCR بيكتبها بالشكل الموحد)
+            self.c.execute("""
+                INSERT INTO plate_sightings(plate, vehicle_id, seen_at)
+                SELECT plate, id, created_at FROM vehicles WHERE plate IS NOT NULL AND plate != ''
+            """)
+
+        # للتصدير بفترة زمنية
+        for table in ("vehicles", "violations", "alerts"):
+            self.c.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_created ON {table}(created_at)")
+
         self.conn.commit()
 
     def add_vehicle(self, track_id):
@@ -96,6 +168,59 @@ class DatabaseManager:
             (vehicle_id, frame, text, confidence)
         )
 
+    def add_sighting(self, plate, vehicle_id, camera_id=None, task_id=None, confidence=None, consensus=True):
+        """تسجيل ظهور لوحة - بترجع (اللوحة الموحدة, seen_at)"""
+        plate = canonical_plate(plate)
+        seen_at = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+        self.c.execute(
+            "INSERT INTO plate_sightings(plate,vehicle_id,camera_id,task_id,confidence,consensus,seen_at) VALUES(?,?,?,?,?,?,?)",
+            (plate, vehicle_id, camera_id, task_id, confidence, int(consensus), seen_at)
+        )
+        return plate, seen_at
+
+    def add_plate_reads(self, reads, camera_id=None, task_id=None):
+        """
+        قراءات من غير tracking (الصور الثابتة): سيارة + ظهور لكل قراءة في commit واحد
+        reads: [(plate, confidence)] - بترجع [(vehicle_id, اللوحة الموحدة, seen_at)]
+        """
+        out = []
+        with self.conn:
+            for plate, conf in reads:
+                self.c.execute("INSERT INTO vehicles(plate) VALUES(?)", (plate,))
+                vid = self.c.lastrowid
+                key, seen_at = self.add_sighting(plate, vid, camera_id, task_id, conf, consensus=False)
+                out.append((vid, key, seen_at))
+        return out
+
+    def get_sightings(self, plate, since=None, until=None, limit=100):
+        """ظهور لوحة (الأحدث الأول) - بيستخدم index (plate, seen_at)"""
+        sql = """
+            SELECT s.id, s.vehicle_id, s.camera_id, s.task_id, s.confidence, s.consensus, s.seen_at,
+                   v.max_speed, v.evidence_path
+            FROM plate_sightings s
+            LEFT JOIN vehicles v ON v.id = s.vehicle_id
+            WHERE s.plate = ?
+        """
+        params = [canonical_plate(plate)]
+        if since:
+            sql += " AND s.seen_at >= ?"
+            params.append(since)
+        if until:
+            sql += " AND s.seen_at < ?"
+            params.append(until)
+        sql += " ORDER BY s.seen_at DESC LIMIT ?"
+        params.append(limit)
+        return self.c.execute(sql, params).fetchall()
+
+    def get_last_sighting(self, plate):
+        return self.c.execute("""
+            SELECT seen_at, camera_id, task_id, vehicle_id
+            FROM plate_sightings
+            WHERE plate = ?
+            ORDER BY seen_at DESC
+            LIMIT 1
+        """, (canonical_plate(plate),)).fetchone()
+
     def add_violation(self, vehicle_id, plate, speed, speed_limit):
         self.c.execute(
             "INSERT INTO violations(vehicle_id,plate,speed,speed_limit) VALUES(?,?,?,?)",
@@ -150,26 +275,111 @@ class DatabaseManager:
         )
         self.conn.commit()
 
-    def get_all_vehicles(self):
-        """جلب كل العربيات المسجلة"""
+    def get_all_vehicles(self, limit=-1):
+        """جلب العربيات المسجلة (limit=-1 يعني الكل)"""
         rows = self.c.execute("""
             SELECT id, track_id, plate, max_speed, avg_speed, evidence_path, created_at
             FROM vehicles
             WHERE plate IS NOT NULL
             ORDER BY created_at DESC
-        """).fetchall()
+            LIMIT ?
+        """, (limit,)).fetchall()
         return rows
 
-    def get_all_violations(self):
-        """جلب كل المخالفات"""
+    def get_all_violations(self, limit=-1):
+        """جلب المخالفات (limit=-1 يعني الكل)"""
         rows = self.c.execute("""
             SELECT v.id, v.plate, v.speed, v.speed_limit, v.created_at, veh.evidence_path
             FROM violations v
             LEFT JOIN vehicles veh ON veh.id = v.vehicle_id
             ORDER BY v.created_at DESC
-        """).fetchall()
+            LIMIT ?
+        """, (limit,)).fetchall()
         return rows
 
+    def iter_export(self, table, since=None, until=None, plate=None, chunk_size=1000):
+        """
+        صفوف الجدول على دفعات بـ cursor (الذاكرة ثابتة مهما كان عدد الصفوف)
+        since شامل و until مش شامل، بصيغة created_at ("YYYY-MM-DD HH:MM:SS" UTC)
+        """
+        _, sql = self.EXPORTS[table]
+        where, params = [], []
+        if since:
+            where.append("v.created_at >= ?")
+            params.append(since)
+        if until:
+            where.append("v.created_at < ?")
+            params.append(until)
+        if plate:
+            where.append("v.plate = ?")
+            params.append(plate)
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY v.id"
+
+        cur = self.conn.cursor()
+        try:
+            cur.execute(sql, params)
+            while True:
+                rows = cur.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            cur.close()
+
+    def dump(self):
+        """كل نتايج الـ DB (من غير الـ watchlist) - للنقل من DB مؤقتة لـ DB تانية"""
+        return {
+            "vehicles": self.c.execute(
+                "SELECT id, track_id, plate, max_speed, avg_speed, evidence_path FROM vehicles"
+            ).fetchall(),
+            "ocr_timeline": self.c.execute(
+                "SELECT vehicle_id, frame, text, confidence FROM ocr_timeline"
+            ).fetchall(),
+            "violations": self.c.execute(
+                "SELECT vehicle_id, plate, speed, speed_limit FROM violations"
+            ).fetchall(),
+            "alerts": self.c.execute(
+                "SELECT vehicle_id, plate, watchlist_plate, reason, similarity, evidence_path FROM alerts"
+            ).fetchall(),
+            "plate_sightings": self.c.execute(
+                "SELECT vehicle_id, plate, camera_id, task_id, confidence, consensus, seen_at FROM plate_sightings"
+            ).fetchall(),
+        }
+
+    def merge(self, rows):
+        """
+        إضافة نتيجة dump() في transaction واحدة
+        بترجع {vehicle_id القديم: vehicle_id الجديد}
+        """
+        ids = {}
+        with self.conn:
+            for vid, *values in rows["vehicles"]:
+                self.c.execute(
+                    "INSERT INTO vehicles(track_id, plate, max_speed, avg_speed, evidence_path) VALUES(?,?,?,?,?)",
+                    values
+                )
+                ids[vid] = self.c.lastrowid
+
+            self.c.executemany(
+                "INSERT INTO ocr_timeline(vehicle_id,frame,text,confidence) VALUES(?,?,?,?)",
+                [(ids.get(vid), *rest) for vid, *rest in rows["ocr_timeline"]]
+            )
+            self.c.executemany(
+                "INSERT INTO violations(vehicle_id,plate,speed,speed_limit) VALUES(?,?,?,?)",
+                [(ids.get(vid), *rest) for vid, *rest in rows["violations"]]
+            )
+            self.c.executemany(
+                "INSERT INTO alerts(vehicle_id,plate,watchlist_plate,reason,similarity,evidence_path) VALUES(?,?,?,?,?,?)",
+                [(ids.get(vid), *rest) for vid, *rest in rows["alerts"]]
+            )
+            self.c.executemany(
+                "INSERT INTO plate_sightings(vehicle_id,plate,camera_id,task_id,confidence,consensus,seen_at) VALUES(?,?,?,?,?,?,?)",
+                [(ids.get(vid), *rest) for vid, *rest in rows.get("plate_sightings", [])]
+            )
+        return ids
+
     def commit(self):
         self.conn.commit()
 
@@ -0,0 +1,80 @@
+"""
+Event bus داخل الـ process للـ progress / اللوحات / المخالفات / التنبيهات
+الـ publish بيشتغل من أي thread (الـ pipeline شغال في background thread)
+والـ subscribers بيستقبلوا على الـ event loop بتاع FastAPI (SSE)
+"""
+import asyncio
+import itertools
+import json
+import threading
+from collections import deque
+from config import SystemConfig
+
+
+class Subscription:
+    def __init__(self, loop, maxsize):
+        self.loop = loop
+        self.queue = deque(maxlen=maxsize)  # buffer محدود لكل client
+        self.ready = asyncio.Event()
+        self.dropped = 0
+
+    def offer(self, event):
+        # client بطيء: بنشيل الأقدم، ويقدر يكمل بـ Last-Event-ID لو لسه في الـ history
+        if len(self.queue) == self.queue.maxlen:
+            self.dropped += 1
+        self.queue.append(event)
+        self.ready.set()
+
+    async def get(self, timeout):
+        if not self.queue:
+            self.ready.clear()
+            try:
+                await asyncio.wait_for(self.ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+        return self.queue.popleft()
+
+
+class EventBus:
+    def __init__(self, history=1000, client_buffer=256):
+        self.history = deque(maxlen=history)
+        self.client_buffer = client_buffer
+        self.subscribers = set()
+        self.lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def publish(self, type, **data):
+        with self.lock:
+            event = (next(self._ids), type, json.dumps(data, default=str))
+            self.history.append(event)
+            subs = list(self.subscribers)
+
+        for sub in subs:
+            try:
+                sub.loop.call_soon_threadsafe(sub.offer, event)
+            except RuntimeError:
+                # الـ loop اتقفل
+                self.unsubscribe(sub)
+        return event[0]
+
+    def subscribe(self, last_id=None):
+        """لازم تتنادي من جوه الـ event loop"""
+        sub = Subscription(asyncio.get_running_loop(), self.client_buffer)
+        with self.lock:
+            backlog = [e for e in self.history if last_id is not None and e[0] > last_id]
+            self.subscribers.add(sub)
+        for event in backlog:
+            sub.offer(event)
+        return sub
+
+    def unsubscribe(self, sub):
+        with self.lock:
+            self.subscribers.discard(sub)
+
+    @staticmethod
+    def format(event):
+        event_id, type, data = event
+        return f"id: {event_id}\nevent: {type}\ndata: {data}\n\n"
+
+
+BUS = EventBus(SystemConfig.EVENTS_HISTORY, SystemConfig.EVENTS_CLIENT_BUFFER)
@@ -0,0 +1,64 @@
+"""
+تصدير vehicles / violations / alerts بـ stream (CSV أو NDJSON) على chunks ثابتة الحجم
+"""
+import csv
+import io
+import json
+from datetime import datetime, timezone
+from config import SystemConfig
+from database import DatabaseManager
+
+FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def parse_time(value):
+    """
+    "2024-05-01" أو "2024-05-01T10:30:00[+02:00]" -> صيغة created_at في SQLite (UTC)
+    بترمي ValueError لو الصيغة غلط
+    """
+    if not value:
+        return None
+    t = datetime.fromisoformat(value)
+    if t.tzinfo is not None:
+        t = t.astimezone(timezone.utc).replace(tzinfo=None)
+    return t.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _csv_chunk(rows, header=None):
+    buf = io.StringIO()
+    w = csv.writer(buf)
+    if header:
+        w.writerow(header)
+    w.writerows(rows)
+    return buf.getvalue()
+
+
+def stream(table, fmt="csv", since=None, until=None, plate=None, chunk_size=None):
+    """
+    generator بيرجع النص chunk ورا chunk - DB connection خاصة بيه بتتقفل في الآخر
+    (StreamingResponse بيشغّله في threadpool)
+    """
+    columns, _ = DatabaseManager.EXPORTS[table]
+    chunk_size = chunk_size or SystemConfig.EXPORT_CHUNK_ROWS
+
+    db = DatabaseManager(SystemConfig.DB_PATH)
+    try:
+        if fmt == "csv":
+            header = columns
+            for rows in db.iter_export(table, since, until, plate, chunk_size):
+                yield _csv_chunk(rows, header)
+                header = None
+            if header:
+                # مفيش صفوف: الـ header بس
+                yield _csv_chunk([], header)
+        else:
+            for rows in db.iter_export(table, since, until, plate, chunk_size):
+                yield "".join(
+                    json.dumps(dict(zip(columns, r)), ensure_ascii=False) + "\n"
+                    for r in rows
+                )
+    finally:
+        db.close()
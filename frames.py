@@ -0,0 +1,110 @@
+import math
+import cv2
+import numpy as np
+from config import SystemConfig
+
+def resize_frame(frame, width=None):
+    """تصغير الإطار للمعالجة الأسرع"""
+    width = width or SystemConfig.PROCESS_WIDTH
+    h, w = frame.shape[:2]
+    if w > width:
+        scale = width / w
+        new_w = width
+        new_h = int(h * scale)
+        return cv2.resize(frame, (new_w, new_h))
+    return frame
+
+
+class PreparedFrame:
+    """
+    إطار جاهز للمعالجة:
+    - original: الإطار الأصلي زي ما هو (بدون نسخ) - الـ crops بتتاخد منه كـ views
+    - detect: buffer ثابت بمقاس input الموديل (مش لازم يتحفظ بعد الإطار ده)
+    كل الإحداثيات اللي بتطلع بره بتبقى في مساحة إطار المعالجة (PROCESS_WIDTH)
+    زي ما كانت قبل كده، عشان ROI / SPEED_PPM / OCR_MIN_W يفضلوا بنفس المعنى
+    """
+    def __init__(self, original, region, detect, scale, det_scale, offset, shape):
+        self.original = original
+        self.region = region        # الجزء من الأصلي اللي اتعمله resize للـ detect (view)
+        self.detect = detect
+        self.scale = scale          # معالجة / أصلي
+        self.det_scale = det_scale  # detect / أصلي
+        self.offset = offset        # بداية الـ region في الأصلي
+        self.shape = shape          # (h, w) مقاس إطار المعالجة
+        self._process = None
+
+    def detect_to_process(self, boxes):
+        """(N, 4) من إحداثيات الـ detect لإحداثيات المعالجة"""
+        b = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        ox, oy = self.offset
+        off = np.array([ox, oy, ox, oy], dtype=np.float32)
+        return (b / self.det_scale + off) * self.scale
+
+    def region_to_process(self, boxes):
+        """(N, 4) من إحداثيات الـ region (الأصلي) لإحداثيات المعالجة"""
+        b = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        ox, oy = self.offset
+        off = np.array([ox, oy, ox, oy], dtype=np.float32)
+        return (b + off) * self.scale
+
+    def map_vehicles(self, vehicles):
+        if not vehicles:
+            return vehicles
+        boxes = self.detect_to_process([v["bbox"] for v in vehicles])
+        for v, (x1, y1, x2, y2) in zip(vehicles, boxes):
+            v["bbox"] = (float(x1), float(y1), float(x2), float(y2))
+            v["center"] = ((x1 + x2) / 2, (y1 + y2) / 2)
+        return vehicles
+
+    def crop(self, box):
+        """crop من الإطار الأصلي (view بدون نسخ) لـ box بإحداثيات المعالجة"""
+        h, w = self.original.shape[:2]
+        x1, y1, x2, y2 = (float(c) / self.scale for c in box[:4])
+        x1, y1 = max(int(x1), 0), max(int(y1), 0)
+        x2, y2 = min(int(math.ceil(x2)), w), min(int(math.ceil(y2)), h)
+        return self.original[y1:y2, x1:x2]
+
+    def process_frame(self):
+        """الإطار بمقاس المعالجة - بيتعمل بس لما نحتاجه (حفظ الأدلة)"""
+        if self._process is None:
+            self._process = resize_frame(self.original)
+        return self._process
+
+
+class FramePreprocessor:
+    def __init__(self, imgsz=None):
+        """
+        resize واحد بس من الإطار الأصلي (أو ROI) لمقاس input الموديل في buffer ثابت،
+        فالـ YOLO letterbox بيعمل padding بس من غير resize تاني
+        """
+        self.imgsz = imgsz or SystemConfig.INFERENCE_IMGSZ
+        self.buf = None
+
+    def prepare(self, frame, roi=None, detect=True):
+        """detect=False: من غير resize لمقاس الموديل (لما الـ tracks جاية من الكاش)"""
+        h, w = frame.shape[:2]
+        scale = min(1.0, SystemConfig.PROCESS_WIDTH / w)
+        shape = (int(h * scale), int(w * scale))
+
+        x1, y1, x2, y2 = 0, 0, w, h
+        if roi is not None:
+            roi.bind(shape)
+            rx1, ry1, rx2, ry2 = roi.rect
+            x1, y1 = int(rx1 / scale), int(ry1 / scale)
+            x2 = min(w, int(math.ceil(rx2 / scale)))
+            y2 = min(h, int(math.ceil(ry2 / scale)))
+        region = frame[y1:y2, x1:x2]
+
+        rh, rw = region.shape[:2]
+        det_scale = self.imgsz / max(rh, rw)
+        if not detect:
+            return PreparedFrame(frame, region, None, scale, det_scale, (x1, y1), shape)
+        dw, dh = max(1, int(round(rw * det_scale))), max(1, int(round(rh * det_scale)))
+
+        # الـ buffer بيتعمل مرة واحدة لكل مقاس
+        if self.buf is None or self.buf.shape[:2] != (dh, dw):
+            self.buf = np.empty((dh, dw, 3), dtype=np.uint8)
+        cv2.resize(region, (dw, dh), dst=self.buf, interpolation=cv2.INTER_LINEAR)
+
+        return PreparedFrame(frame, region, self.buf, scale, det_scale, (x1, y1), shape)
+
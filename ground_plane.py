@@ -0,0 +1,75 @@
+import json
+import numpy as np
+from config import SystemConfig
+
+class GroundPlane:
+    def __init__(self, homography, frame_size, use_lut=False):
+        """
+        homography: مصفوفة 3x3 من بكسل الصورة لإحداثيات الأرض بالمتر
+        frame_size: (w, h) مقاس الإطار اللي اتعملت عليه المعايرة
+        use_lut: جدول متر لكل بكسل محسوب مرة واحدة (مع interpolation) بدل الضرب لكل نقطة
+                 الضرب المباشر أدق ومش أبطأ بفرق يذكر، فالجدول اختياري
+        """
+        self.base = np.asarray(homography, dtype=np.float64).reshape(3, 3)
+        self.frame_size = tuple(frame_size)
+        self.use_lut = use_lut
+
+        self._shape = None
+        self.H = self.base
+        self.lut = None
+
+    @classmethod
+    def for_camera(cls, camera_id):
+        """تحميل الـ homography الخاص بالكاميرا من SPEED_HOMOGRAPHY_PATH (None لو مش موجود)"""
+        path = SystemConfig.SPEED_HOMOGRAPHY_PATH
+        if not path.exists():
+            return None
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        entry = data.get(camera_id) if camera_id is not None else None
+        if entry is None:
+            entry = data.get("default")
+        if entry is None:
+            return None
+        return cls(entry["homography"], entry["frame_size"], SystemConfig.SPEED_USE_LUT)
+
+    def bind(self, shape):
+        """تعديل الـ homography لمقاس إطار المعالجة (بعد resize_frame)"""
+        h, w = shape[:2]
+        if self._shape == (h, w):
+            return
+
+        sx = self.frame_size[0] / w
+        sy = self.frame_size[1] / h
+        self.H = self.base @ np.diag([sx, sy, 1.0])
+        self._shape = (h, w)
+
+        if self.use_lut:
+            ys, xs = np.mgrid[0:h, 0:w].astype(np.float32)
+            pts = np.stack([xs.ravel(), ys.ravel()], axis=1)
+            self.lut = self._transform(pts).reshape(h, w, 2).astype(np.float32)
+
+    def _transform(self, pts):
+        pts = np.asarray(pts, dtype=np.float64).reshape(-1, 2)
+        homo = np.hstack([pts, np.ones((len(pts), 1))]) @ self.H.T
+        return homo[:, :2] / homo[:, 2:3]
+
+    def to_meters(self, points):
+        """تحويل نقط تلامس كل السيارات مع الأرض لإحداثيات بالمتر مرة واحدة"""
+        pts = np.asarray(points, dtype=np.float32).reshape(-1, 2)
+        if self.lut is None:
+            return self._transform(pts).astype(np.float32)
+
+        # bilinear بين أقرب 4 بكسلات - التقريب لأقرب بكسل بيبوظ المسافة قرب الأفق
+        h, w = self._shape
+        x = np.clip(pts[:, 0], 0, w - 1)
+        y = np.clip(pts[:, 1], 0, h - 1)
+        x0 = np.minimum(np.floor(x).astype(np.int64), w - 2) if w > 1 else np.zeros(len(x), dtype=np.int64)
+        y0 = np.minimum(np.floor(y).astype(np.int64), h - 2) if h > 1 else np.zeros(len(y), dtype=np.int64)
+        x1 = np.minimum(x0 + 1, w - 1)
+        y1 = np.minimum(y0 + 1, h - 1)
+        fx = (x - x0)[:, None]
+        fy = (y - y0)[:, None]
+        top = self.lut[y0, x0] * (1 - fx) + self.lut[y0, x1] * fx
+        bottom = self.lut[y1, x0] * (1 - fx) + self.lut[y1, x1] * fx
+        return (top * (1 - fy) + bottom * fy).astype(np.float32)
@@ -2,19 +2,24 @@ import cv2
 import base64
 import asyncio
 from core.vehicle_processor import VehicleProcessor
+from core import metrics
 from config import SystemConfig
 import numpy as np
 
 class LiveVideoProcessor:
-    def __init__(self, db, websocket):
-        self.proc = VehicleProcessor(db)
+    def __init__(self, db, websocket, camera_id=None):
+        self.proc = VehicleProcessor(db, camera_id)
         self.websocket = websocket
         self.frame_count = 0
         self.send_every_n_frames = 3  # إرسال كل 3 frames للسرعة
+        self._overlay = None  # buffer ثابت للرسم بدل نسخة جديدة كل frame
 
     def draw_detection(self, frame, vehicles_info):
-        """رسم bounding boxes والمعلومات على الإطار"""
-        overlay = frame.copy()
+        """رسم bounding boxes والمعلومات على الإطار (in-place)"""
+        if self._overlay is None or self._overlay.shape != frame.shape:
+            self._overlay = np.empty_like(frame)
+        np.copyto(self._overlay, frame)
+        overlay = self._overlay
         
         for info in vehicles_info:
             bbox = info.get('bbox')
@@ -107,7 +112,7 @@ class LiveVideoProcessor:
         
         # دمج الصورة الأصلية مع الـ overlay
         alpha = 0.8
-        return cv2.addWeighted(overlay, alpha, frame, 1 - alpha, 0)
+        return cv2.addWeighted(overlay, alpha, frame, 1 - alpha, 0, dst=frame)
 
     def encode_frame(self, frame):
         """تحويل الإطار لـ base64 للإرسال"""
@@ -136,7 +141,7 @@ class LiveVideoProcessor:
             
             info = {
                 'track_id': tid,
-                'bbox': bbox,
+                'bbox': tuple(c / self.proc.scale for c in bbox),
                 'has_plate': state.get('plate_final', False),
                 'plate': state.get('final_plate'),
                 'speed': state.get('last_speed'),
@@ -156,6 +161,7 @@ class LiveVideoProcessor:
         
         total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
         fps = cap.get(cv2.CAP_PROP_FPS)
+        self.proc.set_fps(fps)
         
         # إرسال معلومات الفيديو
         await self.websocket.send_json({
@@ -166,34 +172,38 @@ class LiveVideoProcessor:
         })
         
         self.frame_count = 0
+        frame = None
         
         try:
             while cap.isOpened():
-                ret, frame = cap.read()
+                # إعادة استخدام نفس الـ buffer للـ decode
+                with metrics.stage("decode"):
+                    ret, frame = cap.read(frame)
                 if not ret:
                     break
                 
                 self.frame_count += 1
                 
-                # حفظ الإطار الأصلي
-                original_frame = frame.copy()
-                
-                # معالجة الإطار
-                self.proc.process(frame)
+                # معالجة الإطار (مش بتعدّل على frame، فمفيش داعي لنسخة)
+                timestamp = None
+                if SystemConfig.SPEED_USE_CONTAINER_TIMESTAMPS:
+                    timestamp = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+                self.proc.process(frame, timestamp)
                 
                 # الحصول على معلومات السيارات
                 vehicles_info = self.get_vehicles_info()
                 
                 # رسم المعلومات على الإطار
                 try:
-                    annotated_frame = self.draw_detection(original_frame, vehicles_info)
+                    annotated_frame = self.draw_detection(frame, vehicles_info)
                 except Exception as e:
                     print(f"Error drawing detections: {e}")
-                    annotated_frame = original_frame
+                    annotated_frame = frame
                 
                 # إرسال الإطار كل N frames
                 if self.frame_count % self.send_every_n_frames == 0:
-                    frame_data = self.encode_frame(annotated_frame)
+                    with metrics.stage("encode"):
+                        frame_data = self.encode_frame(annotated_frame)
                     
                     # إعداد البيانات للإرسال
                     data = {
@@ -223,7 +233,7 @@ class LiveVideoProcessor:
                 
                 # حفظ في DB كل 50 frame
                 if self.frame_count % 50 == 0:
-                    self.proc.db.commit()
+                    metrics.timed_commit(self.proc.db)
         
         except Exception as e:
             print(f"Error in video processing: {e}")
@@ -231,4 +241,5 @@ class LiveVideoProcessor:
         
         finally:
             cap.release()
-            self.proc.db.commit()
\ No newline at end of file
+            self.proc.finalize_all()
+            metrics.timed_commit(self.proc.db)
\ No newline at end of file
@@ -1,16 +1,32 @@
-from fastapi import FastAPI, UploadFile, File, BackgroundTasks, HTTPException
+from config import SystemConfig
+from core import resources
+# قبل ما torch / paddle يتعملهم import - عشان OMP / MKL ياخدوا نصيب كل job بس
+resources.apply(resources.plan(SystemConfig.MAX_PARALLEL_JOBS))
+
+from fastapi import FastAPI, UploadFile, File, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-from database import DatabaseManager
+from database import DatabaseManager, canonical_plate
 from core.video_processor import VideoProcessor
-from config import SystemConfig
+from core import metrics
+from core.events import BUS, EventBus
+from core.upload import UploadState, UploadTooLarge, receive, iter_upload, is_progressive
+from core import export
+from core.sightings import LAST_SEEN
+from core.response_cache import RESPONSES
+from core import retention
+from starlette.requests import ClientDisconnect
+import asyncio
+import threading
 import tempfile
-import shutil
 import sqlite3
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 import os
 from pathlib import Path
+from typing import List, Optional
 
 app = FastAPI(title="LPR System API", version="1.0.0")
 
@@ -26,6 +42,29 @@ app.add_middleware(
 # حالة المهام (مؤقتة – لاحقاً Redis / DB)
 tasks_status = {}
 tasks_metrics = {}  # ✅ نخزن metrics لكل task
+tasks_processors = {}  # المهام الشغالة - للـ metrics اللحظية
+
+VIDEO_FORMATS = SystemConfig.VIDEO_FORMATS
+
+
+# =========================
+# Retention (دوري)
+# =========================
+async def retention_loop():
+    loop = asyncio.get_running_loop()
+    while True:
+        try:
+            result = await loop.run_in_executor(None, retention.run)
+            print(f"Retention: {result}")
+        except Exception as e:
+            print(f"Retention failed: {e}")
+        await asyncio.sleep(SystemConfig.RETENTION_INTERVAL_HOURS * 3600)
+
+
+@app.on_event("startup")
+async def start_retention():
+    if SystemConfig.RETENTION_INTERVAL_HOURS:
+        asyncio.create_task(retention_loop())
 
 
 # =========================
@@ -39,16 +78,29 @@ class WatchlistItem(BaseModel):
 # =========================
 # Background task function
 # =========================
-def run_video(path: str, task_id: str):
+def set_task_status(task_id: str, status: str):
+    tasks_status[task_id] = status
+    BUS.publish("task", task_id=task_id, status=status)
+
+
+# مهام المعالجة ليها pool لوحدها: أكتر من MAX_PARALLEL_JOBS في نفس الوقت بيقلل الـ throughput الكلي،
+# والمهام اللي مستنية بتفضل في طابور الـ executor من غير ما تمسك threads الـ endpoints
+VIDEO_JOBS = ThreadPoolExecutor(
+    max_workers=max(1, SystemConfig.MAX_PARALLEL_JOBS), thread_name_prefix="video-job"
+)
+
+
+def run_video(path: str, task_id: str, camera_id: str = None, upload: UploadState = None):
     db = None
     try:
-        tasks_status[task_id] = "processing"
-        
+        set_task_status(task_id, "processing")
+
         db = DatabaseManager(SystemConfig.DB_PATH)
-        vp = VideoProcessor(db)
-        
-        result = vp.process_video(path)
-        
+        vp = VideoProcessor(db, camera_id, task_id)
+        tasks_processors[task_id] = vp
+
+        result = vp.process_video(path, upload)
+
         # ✅ حفظ metrics الخاصة بالtask
         tasks_metrics[task_id] = {
             "ocr": vp.proc.get_ocr_metrics(),
@@ -56,44 +108,166 @@ def run_video(path: str, task_id: str):
         }
         
         db.commit()
-        tasks_status[task_id] = "done"
+        set_task_status(task_id, "done")
 
     except Exception as e:
-        tasks_status[task_id] = f"error: {str(e)}"
+        set_task_status(task_id, f"error: {str(e)}")
         print(f"Error processing video {task_id}: {e}")
 
     finally:
+        tasks_processors.pop(task_id, None)
         if db:
             db.close()
         if os.path.exists(path):
             os.remove(path)
 
 
+# =========================
+# Still images (batch - synchronous)
+# =========================
+_stills = None
+_stills_lock = threading.Lock()
+
+
+def run_stills(images, names, camera_id=None, record=True, vehicles=False):
+    global _stills
+    with _stills_lock:
+        # الموديلات بتتحمل مرة واحدة وبتتعاد بين الطلبات
+        if _stills is None:
+            from core.stills import StillProcessor
+            _stills = StillProcessor()
+
+    db = DatabaseManager(SystemConfig.DB_PATH) if record else None
+    try:
+        return _stills.process(images, names, db=db, camera_id=camera_id, task_id=None, with_vehicles=vehicles)
+    finally:
+        if db:
+            db.close()
+
+
+@app.post("/api/process/images")
+async def process_images(
+    files: List[UploadFile] = File(...),
+    camera_id: Optional[str] = None,
+    record: bool = True,
+    vehicles: bool = SystemConfig.STILLS_DETECT_VEHICLES
+):
+    if len(files) > SystemConfig.STILLS_MAX_IMAGES:
+        raise HTTPException(413, f"too many images (max {SystemConfig.STILLS_MAX_IMAGES})")
+
+    images = [await f.read() for f in files]
+    names = [f.filename or str(i) for i, f in enumerate(files)]
+
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, run_stills, images, names, camera_id, record, vehicles)
+
+
 # =========================
 # Upload video (Non-blocking)
 # =========================
 @app.post("/api/process/video")
 async def process_video(
-    background_tasks: BackgroundTasks,
-    file: UploadFile = File(...)
+    file: UploadFile = File(...),
+    camera_id: Optional[str] = None,
+    sha256: Optional[str] = None
 ):
     """رفع فيديو للمعالجة"""
-    if not file.filename.lower().endswith(('.mp4', '.avi', '.mov', '.mkv')):
+    if not file.filename.lower().endswith(VIDEO_FORMATS):
         raise HTTPException(400, "Video format not supported")
     
     task_id = str(uuid.uuid4())
 
-    with tempfile.NamedTemporaryFile(delete=False, suffix='.mp4') as tmp:
-        shutil.copyfileobj(file.file, tmp)
-        path = tmp.name
+    fd, path = tempfile.mkstemp(suffix=Path(file.filename).suffix.lower())
+    os.close(fd)
+
+    # نسخ بـ chunks من غير ما نوقف الـ event loop
+    try:
+        size, digest = await receive(iter_upload(file), path)
+    except UploadTooLarge as e:
+        os.remove(path)
+        raise HTTPException(413, str(e))
 
-    tasks_status[task_id] = "queued"
-    background_tasks.add_task(run_video, path, task_id)
+    if sha256 and sha256.lower() != digest:
+        os.remove(path)
+        raise HTTPException(400, "Checksum mismatch")
+
+    set_task_status(task_id, "queued")
+    VIDEO_JOBS.submit(run_video, path, task_id, camera_id)
 
     return {
         "task_id": task_id,
         "status": "queued",
-        "filename": file.filename
+        "filename": file.filename,
+        "size": size,
+        "sha256": digest
+    }
+
+
+@app.post("/api/process/video/stream")
+async def process_video_stream(
+    request: Request,
+    filename: str,
+    camera_id: Optional[str] = None,
+    sha256: Optional[str] = None
+):
+    """
+    رفع فيديو كـ raw body (مش multipart)
+    الصيغ في UPLOAD_PROGRESSIVE_FORMATS بتبدأ معالجتها قبل ما الرفع يخلص
+    """
+    if not filename.lower().endswith(VIDEO_FORMATS):
+        raise HTTPException(400, "Video format not supported")
+
+    length = request.headers.get("content-length")
+    if length and length.isdigit() and int(length) > SystemConfig.UPLOAD_MAX_BYTES:
+        raise HTTPException(413, "Upload too large")
+
+    task_id = str(uuid.uuid4())
+    fd, path = tempfile.mkstemp(suffix=Path(filename).suffix.lower())
+    os.close(fd)
+
+    state = UploadState() if is_progressive(filename) else None
+    loop = asyncio.get_running_loop()
+    started = []
+
+    def start():
+        started.append(True)
+        set_task_status(task_id, "queued")
+        loop.run_in_executor(VIDEO_JOBS, run_video, path, task_id, camera_id, state)
+
+    set_task_status(task_id, "uploading")
+    try:
+        size, digest = await receive(
+            request.stream(), path, state,
+            on_ready=start if state is not None else None
+        )
+    except (UploadTooLarge, ClientDisconnect) as e:
+        # لو المعالجة بدأت، run_video هيفشل ويمسح الملف
+        if not started:
+            os.remove(path)
+            set_task_status(task_id, f"error: {e}")
+        code = 413 if isinstance(e, UploadTooLarge) else 400
+        raise HTTPException(code, str(e) or "Client disconnected")
+
+    if sha256 and sha256.lower() != digest:
+        if state is not None:
+            state.finish(error="checksum mismatch")
+        else:
+            os.remove(path)
+            set_task_status(task_id, "error: checksum mismatch")
+        raise HTTPException(400, "Checksum mismatch")
+
+    if state is not None:
+        state.finish()
+    else:
+        start()
+
+    return {
+        "task_id": task_id,
+        "status": tasks_status[task_id],
+        "filename": filename,
+        "size": size,
+        "sha256": digest,
+        "progressive": state is not None
     }
 
 
@@ -112,88 +286,242 @@ def task_status(task_id: str):
     # إذا المهمة خلصت، نرجع metrics
     if status == "done" and task_id in tasks_metrics:
         response["metrics"] = tasks_metrics[task_id]
+
+    # أثناء المعالجة نرجع الـ metrics اللحظية
+    vp = tasks_processors.get(task_id)
+    if status == "processing" and vp is not None:
+        response["metrics"] = {
+            "frames": vp.proc.frame_counter,
+            "active_tracks": len(vp.proc.states),
+            "ocr": vp.proc.get_ocr_metrics(),
+            "speed": vp.proc.get_speed_metrics()
+        }
     
     return response
 
 
+# =========================
+# Server-sent events
+# =========================
+@app.get("/api/events")
+async def event_stream(request: Request, last_event_id: Optional[int] = None):
+    """بث الأحداث (progress / plate / violation / alert / task) بـ SSE"""
+    header = request.headers.get("last-event-id")
+    if header and header.isdigit():
+        last_event_id = int(header)
+
+    sub = BUS.subscribe(last_event_id)
+
+    async def stream():
+        try:
+            yield "retry: 3000\n\n"
+            while not await request.is_disconnected():
+                event = await sub.get(SystemConfig.EVENTS_KEEPALIVE)
+                yield ": keepalive\n\n" if event is None else EventBus.format(event)
+        finally:
+            BUS.unsubscribe(sub)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+# =========================
+# Prometheus metrics
+# =========================
+@app.get("/api/metrics")
+def prometheus_metrics():
+    """metrics بصيغة Prometheus"""
+    counts = {}
+    for status in tasks_status.values():
+        key = "error" if status.startswith("error") else status
+        counts[key] = counts.get(key, 0) + 1
+    for status in ("uploading", "queued", "processing", "done", "error"):
+        metrics.TASKS.set(counts.get(status, 0), status)
+
+    return PlainTextResponse(
+        metrics.REGISTRY.render(),
+        media_type="text/plain; version=0.0.4"
+    )
+
+
+# =========================
+# Streaming export (CSV / NDJSON)
+# =========================
+@app.get("/api/export/{table}")
+def export_table(
+    table: str,
+    format: str = "csv",
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    plate: Optional[str] = None
+):
+    """
+    تصدير vehicles / violations / alerts كلها بـ stream (الذاكرة ثابتة)
+    since / until: تاريخ أو وقت ISO (since شامل، until مش شامل)
+    """
+    if table not in DatabaseManager.EXPORTS:
+        raise HTTPException(404, f"Unknown table. Allowed: {', '.join(DatabaseManager.EXPORTS)}")
+    if format not in export.FORMATS:
+        raise HTTPException(400, f"Unsupported format. Allowed: {', '.join(export.FORMATS)}")
+    try:
+        since_ts = export.parse_time(since)
+        until_ts = export.parse_time(until)
+    except ValueError:
+        raise HTTPException(400, "since / until must be ISO dates (YYYY-MM-DD[THH:MM:SS])")
+
+    filename = f"{table}-{(since or 'all')[:10]}.{format}"
+    return StreamingResponse(
+        export.stream(table, format, since_ts, until_ts, canonical_plate(plate) if plate else None),
+        media_type=export.FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+# =========================
+# Plate sightings
+# =========================
+@app.get("/api/plates/{plate}/sightings")
+def plate_sightings(
+    plate: str,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    limit: int = 100
+):
+    """كل مرات ظهور لوحة (الأحدث الأول) + آخر ظهور"""
+    key = canonical_plate(plate)
+    if not key:
+        raise HTTPException(400, "Invalid plate")
+    try:
+        since_ts = export.parse_time(since)
+        until_ts = export.parse_time(until)
+    except ValueError:
+        raise HTTPException(400, "since / until must be ISO dates (YYYY-MM-DD[THH:MM:SS])")
+
+    db = DatabaseManager(SystemConfig.DB_PATH)
+    rows = db.get_sightings(key, since_ts, until_ts, limit)
+
+    # من الـ DB مش من LAST_SEEN: الكاش مبيشوفش الكتابة من الـ bulk CLI أو من workers تانية
+    if rows and until_ts is None:
+        # الصفوف مترتبة الأحدث الأول - أول صف هو آخر ظهور
+        r = rows[0]
+        last_seen = {"seen_at": r[6], "camera_id": r[2], "task_id": r[3], "vehicle_id": r[1]}
+    else:
+        r = db.get_last_sighting(key)
+        last_seen = {"seen_at": r[0], "camera_id": r[1], "task_id": r[2], "vehicle_id": r[3]} if r else None
+    if last_seen is not None:
+        LAST_SEEN.put(key, last_seen)
+    db.close()
+
+    return {
+        "plate": key,
+        "last_seen": last_seen,
+        "sightings": [
+            {
+                "id": r[0],
+                "vehicle_id": r[1],
+                "camera_id": r[2],
+                "task_id": r[3],
+                "confidence": r[4],
+                "consensus": bool(r[5]),
+                "seen_at": r[6],
+                "max_speed": r[7],
+                "evidence_path": r[8]
+            }
+            for r in rows
+        ]
+    }
+
+
 # =========================
 # Get all vehicles
 # =========================
 @app.get("/api/vehicles")
-def get_vehicles(limit: int = 100):
+def get_vehicles(request: Request, limit: int = 100):
     """جلب العربيات المسجلة"""
-    db = DatabaseManager(SystemConfig.DB_PATH)
-    rows = db.get_all_vehicles()
-    db.close()
+    def build():
+        db = DatabaseManager(SystemConfig.DB_PATH)
+        rows = db.get_all_vehicles(limit)
+        db.close()
     
-    return [
-        {
-            "id": r[0],
-            "track_id": r[1],
-            "plate": r[2],
-            "max_speed": r[3],
-            "avg_speed": r[4],
-            "evidence_path": r[5],
-            "created_at": r[6]
-        }
-        for r in rows[:limit]
-    ]
+        return [
+            {
+                "id": r[0],
+                "track_id": r[1],
+                "plate": r[2],
+                "max_speed": r[3],
+                "avg_speed": r[4],
+                "evidence_path": r[5],
+                "created_at": r[6]
+            }
+            for r in rows
+        ]
+
+    return RESPONSES.respond(request, build)
 
 
 # =========================
 # Get all violations
 # =========================
 @app.get("/api/violations")
-def get_violations(limit: int = 100):
+def get_violations(request: Request, limit: int = 100):
     """جلب المخالفات"""
-    db = DatabaseManager(SystemConfig.DB_PATH)
-    rows = db.get_all_violations()
-    db.close()
+    def build():
+        db = DatabaseManager(SystemConfig.DB_PATH)
+        rows = db.get_all_violations(limit)
+        db.close()
     
-    return [
-        {
-            "id": r[0],
-            "plate": r[1],
-            "speed": r[2],
-            "speed_limit": r[3],
-            "created_at": r[4],
-            "evidence_path": r[5]
-        }
-        for r in rows[:limit]
-    ]
+        return [
+            {
+                "id": r[0],
+                "plate": r[1],
+                "speed": r[2],
+                "speed_limit": r[3],
+                "created_at": r[4],
+                "evidence_path": r[5]
+            }
+            for r in rows
+        ]
+
+    return RESPONSES.respond(request, build)
 
 
 # =========================
 # Get alerts
 # =========================
 @app.get("/api/alerts")
-def get_alerts(limit: int = 100):
+def get_alerts(request: Request, limit: int = 100):
     """جلب تنبيهات الwatchlist"""
-    db = DatabaseManager(SystemConfig.DB_PATH)
+    def build():
+        db = DatabaseManager(SystemConfig.DB_PATH)
     
-    rows = db.c.execute("""
-        SELECT
-            id, plate, watchlist_plate, reason,
-            similarity, evidence_path, created_at
-        FROM alerts
-        ORDER BY created_at DESC
-        LIMIT ?
-    """, (limit,)).fetchall()
+        rows = db.c.execute("""
+            SELECT
+                id, plate, watchlist_plate, reason,
+                similarity, evidence_path, created_at
+            FROM alerts
+            ORDER BY created_at DESC
+            LIMIT ?
+        """, (limit,)).fetchall()
     
-    db.close()
+        db.close()
     
-    return [
-        {
-            "id": r[0],
-            "plate": r[1],
-            "watchlist_plate": r[2],
-            "reason": r[3],
-            "similarity": r[4],
-            "evidence_path": r[5],
-            "created_at": r[6]
-        }
-        for r in rows
-    ]
+        return [
+            {
+                "id": r[0],
+                "plate": r[1],
+                "watchlist_plate": r[2],
+                "reason": r[3],
+                "similarity": r[4],
+                "evidence_path": r[5],
+                "created_at": r[6]
+            }
+            for r in rows
+        ]
+
+    return RESPONSES.respond(request, build)
 
 
 # =========================
@@ -210,11 +538,30 @@ def vehicle_timeline(vehicle_id: int):
         WHERE vehicle_id = ?
         ORDER BY frame
     """, (vehicle_id,)).fetchall()
+
+    # القراءات القديمة بتتضغط في ocr_summary (retention)
+    summary = db.c.execute("""
+        SELECT text, reads, mean_confidence, max_confidence, first_frame, last_frame
+        FROM ocr_summary
+        WHERE vehicle_id = ?
+        ORDER BY reads DESC, mean_confidence DESC
+    """, (vehicle_id,)).fetchall()
     
     db.close()
     
     return {
         "vehicle_id": vehicle_id,
+        "summary": [
+            {
+                "text": r[0],
+                "reads": r[1],
+                "mean_confidence": r[2],
+                "max_confidence": r[3],
+                "first_frame": r[4],
+                "last_frame": r[5]
+            }
+            for r in summary
+        ],
         "timeline": [
             {
                 "frame": r[0],
@@ -231,26 +578,29 @@ def vehicle_timeline(vehicle_id: int):
 # Watchlist Management
 # =========================
 @app.get("/api/watchlist")
-def get_watchlist():
+def get_watchlist(request: Request):
     """جلب قائمة المراقبة"""
-    db = DatabaseManager(SystemConfig.DB_PATH)
-    rows = db.c.execute("""
-        SELECT id, plate, reason, created_at
-        FROM watchlist
-        WHERE active = 1
-        ORDER BY created_at DESC
-    """).fetchall()
-    db.close()
+    def build():
+        db = DatabaseManager(SystemConfig.DB_PATH)
+        rows = db.c.execute("""
+            SELECT id, plate, reason, created_at
+            FROM watchlist
+            WHERE active = 1
+            ORDER BY created_at DESC
+        """).fetchall()
+        db.close()
     
-    return [
-        {
-            "id": r[0],
-            "plate": r[1],
-            "reason": r[2],
-            "created_at": r[3]
-        }
-        for r in rows
-    ]
+        return [
+            {
+                "id": r[0],
+                "plate": r[1],
+                "reason": r[2],
+                "created_at": r[3]
+            }
+            for r in rows
+        ]
+
+    return RESPONSES.respond(request, build)
 
 
 @app.post("/api/watchlist")
@@ -280,19 +630,22 @@ def remove_from_watchlist(plate: str):
 # Statistics
 # =========================
 @app.get("/api/stats")
-def get_stats():
+def get_stats(request: Request):
     """إحصائيات النظام"""
-    db = DatabaseManager(SystemConfig.DB_PATH)
+    def build():
+        db = DatabaseManager(SystemConfig.DB_PATH)
     
-    stats = {
-        "total_vehicles": db.c.execute("SELECT COUNT(*) FROM vehicles WHERE plate IS NOT NULL").fetchone()[0],
-        "total_violations": db.c.execute("SELECT COUNT(*) FROM violations").fetchone()[0],
-        "total_alerts": db.c.execute("SELECT COUNT(*) FROM alerts").fetchone()[0],
-        "watchlist_count": db.c.execute("SELECT COUNT(*) FROM watchlist WHERE active=1").fetchone()[0],
-    }
+        stats = {
+            "total_vehicles": db.c.execute("SELECT COUNT(*) FROM vehicles WHERE plate IS NOT NULL").fetchone()[0],
+            "total_violations": db.c.execute("SELECT COUNT(*) FROM violations").fetchone()[0],
+            "total_alerts": db.c.execute("SELECT COUNT(*) FROM alerts").fetchone()[0],
+            "watchlist_count": db.c.execute("SELECT COUNT(*) FROM watchlist WHERE active=1").fetchone()[0],
+        }
     
-    db.close()
-    return stats
+        db.close()
+        return stats
+
+    return RESPONSES.respond(request, build)
 
 
 # =========================
@@ -0,0 +1,192 @@
+"""
+Instrumentation خفيفة (histograms / counters / gauges) بصيغة Prometheus text
+"""
+import bisect
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def _labels(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{n}="{v}"' for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name, doc, labels=()):
+        self.name = name
+        self.doc = doc
+        self.labels = tuple(labels)
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def header(self):
+        return [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, *label_values):
+        with self.lock:
+            self.series[label_values] = self.series.get(label_values, 0) + amount
+
+    def render(self):
+        lines = self.header()
+        for key, value in sorted(self.series.items()):
+            lines.append(f"{self.name}{_labels(self.labels, key)} {value}")
+        return lines
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value, *label_values):
+        with self.lock:
+            self.series[label_values] = value
+
+    def inc(self, amount=1, *label_values):
+        with self.lock:
+            self.series[label_values] = self.series.get(label_values, 0) + amount
+
+    def dec(self, amount=1, *label_values):
+        self.inc(-amount, *label_values)
+
+    def render(self):
+        lines = self.header()
+        for key, value in sorted(self.series.items()):
+            lines.append(f"{self.name}{_labels(self.labels, key)} {value}")
+        return lines
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, doc, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, doc, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *label_values):
+        i = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            s = self.series.get(label_values)
+            if s is None:
+                s = self.series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            s[0][i] += 1
+            s[1] += value
+            s[2] += 1
+
+    def snapshot(self):
+        """نسخة من القيم الحالية {labels: (counts, sum, count)} - للمقارنة قبل/بعد"""
+        with self.lock:
+            return {k: (list(c), total, n) for k, (c, total, n) in self.series.items()}
+
+    def render(self):
+        lines = self.header()
+        for key, (counts, total, n) in sorted(self.series.items()):
+            cumulative = 0
+            for bound, c in zip(self.buckets + (float("inf"),), counts):
+                cumulative += c
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(
+                    f"{self.name}_bucket{_labels(self.labels + ('le',), key + (le,))} {cumulative}"
+                )
+            lines.append(f"{self.name}_sum{_labels(self.labels, key)} {total}")
+            lines.append(f"{self.name}_count{_labels(self.labels, key)} {n}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def counter(self, name, doc, labels=()):
+        m = Counter(name, doc, labels)
+        self.metrics.append(m)
+        return m
+
+    def gauge(self, name, doc, labels=()):
+        m = Gauge(name, doc, labels)
+        self.metrics.append(m)
+        return m
+
+    def histogram(self, name, doc, labels=(), buckets=LATENCY_BUCKETS):
+        m = Histogram(name, doc, labels, buckets)
+        self.metrics.append(m)
+        return m
+
+    def render(self):
+        lines = []
+        for m in self.metrics:
+            lines.extend(m.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "lpr_stage_seconds", "Latency of each pipeline stage", ["stage"]
+)
+FRAMES = REGISTRY.counter(
+    "lpr_frames_total", "Frames seen by the pipeline", ["result"]
+)
+ACTIVE_TRACKS = REGISTRY.gauge(
+    "lpr_active_tracks", "Vehicle tracks currently held in memory"
+)
+OCR_CALLS = REGISTRY.counter(
+    "lpr_ocr_calls_total", "OCR calls (including cache hits)"
+)
+OCR_CALLS_PER_VEHICLE = REGISTRY.histogram(
+    "lpr_ocr_calls_per_vehicle", "OCR calls made for a vehicle before its track closed",
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21)
+)
+STAGE_ALLOC_BYTES = REGISTRY.histogram(
+    "lpr_stage_alloc_bytes", "Peak temporary allocation inside each stage (only while tracing)", ["stage"],
+    buckets=(1024, 16384, 65536, 262144, 1048576, 4194304, 16777216, 67108864)
+)
+DB_FLUSH_SECONDS = REGISTRY.histogram(
+    "lpr_db_flush_seconds", "Time spent committing to SQLite"
+)
+TASKS = REGISTRY.gauge(
+    "lpr_tasks", "Processing tasks by status", ["status"]
+)
+
+
+_trace_alloc = False
+
+
+def trace_allocations(enabled=True):
+    """قياس الـ allocations لكل مرحلة بـ tracemalloc (أبطأ - للـ benchmark بس)"""
+    global _trace_alloc
+    _trace_alloc = enabled
+    if enabled and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+@contextmanager
+def stage(name):
+    """قياس زمن مرحلة في الـ pipeline"""
+    if _trace_alloc:
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - t0, name)
+        if _trace_alloc:
+            # الـ peak فوق اللي كان موجود = أكبر allocation مؤقتة جوه المرحلة
+            STAGE_ALLOC_BYTES.observe(tracemalloc.get_traced_memory()[1] - before, name)
+
+
+def timed_commit(db):
+    t0 = time.perf_counter()
+    db.commit()
+    DB_FLUSH_SECONDS.observe(time.perf_counter() - t0)
@@ -1,15 +1,94 @@
-from ultralytics import YOLO
+from detection.backends import load_yolo, predict_batch, select_device
+from config import SystemConfig
+import numpy as np
 
 class PlateDetector:
-    def __init__(self, model, conf):
-        self.model = YOLO(model)
+    def __init__(self, model, conf, backend=None, imgsz=None):
+        self.imgsz = imgsz or SystemConfig.INFERENCE_IMGSZ
+        self.backend = backend or SystemConfig.INFERENCE_BACKEND
+        self.model = load_yolo(model, self.backend, self.imgsz)
         self.conf = conf
+        self.device = select_device()
 
-    def detect(self, crop):
+    def _predict(self, img):
+        return self.model(img, conf=self.conf, imgsz=self.imgsz, device=self.device, verbose=False)
+
+    def detect(self, crop, with_conf=False):
         if crop is None:
             return None
-        r = self.model(crop, conf=self.conf, verbose=False)
+        r = self._predict(crop)
         if not r or not r[0].boxes:
             return None
         b = r[0].boxes[0]
-        return b.xyxy[0].cpu().numpy()
+        box = b.xyxy[0].cpu().numpy()
+        if with_conf:
+            return box, float(b.conf[0])
+        return box
+
+    def detect_all(self, frame):
+        """كشف كل اللوحات في الإطار مرة واحدة - مصفوفة (N, 5): x1, y1, x2, y2, conf"""
+        if frame is None:
+            return np.zeros((0, 5), dtype=np.float32)
+        r = self._predict(frame)
+        if not r or not r[0].boxes:
+            return np.zeros((0, 5), dtype=np.float32)
+        b = r[0].boxes
+        return np.hstack([
+            b.xyxy.cpu().numpy(),
+            b.conf.cpu().numpy()[:, None]
+        ]).astype(np.float32)
+
+    def detect_all_batch(self, frames):
+        """detect_all لمجموعة صور في call واحدة - مصفوفة (N, 5) لكل صورة"""
+        results = predict_batch(
+            self.model, frames, self.backend,
+            conf=self.conf, imgsz=self.imgsz, device=self.device
+        )
+        out = []
+        for r in results:
+            if not r.boxes:
+                out.append(np.zeros((0, 5), dtype=np.float32))
+                continue
+            out.append(np.hstack([
+                r.boxes.xyxy.cpu().numpy(),
+                r.boxes.conf.cpu().numpy()[:, None]
+            ]).astype(np.float32))
+        return out
+
+
+def assign_plates(plates, vehicle_boxes, min_overlap=0.8):
+    """
+    ربط كل لوحة بالسيارة اللي فيها (مصفوفة containment بين كل اللوحات وكل السيارات)
+    plates: (P, 5) من detect_all
+    vehicle_boxes: (V, 4)
+    بترجع {index السيارة: (x1, y1, x2, y2, conf)} - لوحة واحدة لكل سيارة (الأعلى ثقة)
+    """
+    plates = np.asarray(plates, dtype=np.float32).reshape(-1, 5)
+    vboxes = np.asarray(vehicle_boxes, dtype=np.float32).reshape(-1, 4)
+    if len(plates) == 0 or len(vboxes) == 0:
+        return {}
+
+    p = plates[:, None, :4]
+    v = vboxes[None, :, :]
+
+    iw = np.clip(np.minimum(p[..., 2], v[..., 2]) - np.maximum(p[..., 0], v[..., 0]), 0, None)
+    ih = np.clip(np.minimum(p[..., 3], v[..., 3]) - np.maximum(p[..., 1], v[..., 1]), 0, None)
+    inter = iw * ih
+
+    p_area = (p[..., 2] - p[..., 0]) * (p[..., 3] - p[..., 1])
+    v_area = (v[..., 2] - v[..., 0]) * (v[..., 3] - v[..., 1])
+
+    containment = inter / np.maximum(p_area, 1e-6)
+    iou = inter / np.maximum(p_area + v_area - inter, 1e-6)
+
+    # لو اللوحة جوه أكتر من سيارة (تداخل)، الأصغر (IoU أعلى) تكسب
+    score = containment + 1e-3 * iou
+    best_v = score.argmax(axis=1)
+    ok = containment[np.arange(len(plates)), best_v] >= min_overlap
+
+    assigned = {}
+    for pi in np.argsort(-plates[:, 4]):
+        vi = int(best_v[pi])
+        if ok[pi] and vi not in assigned:
+            assigned[vi] = plates[pi]
+    return assigned
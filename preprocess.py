@@ -1,13 +1,37 @@
 import cv2
+import threading
+from config import SystemConfig
+
+_local = threading.local()
 
 class PlatePreprocessor:
     @staticmethod
-    def generate(img):
+    def _clahe():
+        # CLAHE واحد لكل thread بدل ما يتعمل مع كل لوحة
+        c = getattr(_local, "clahe", None)
+        if c is None:
+            c = _local.clahe = cv2.createCLAHE(2.0, (8,8))
+        return c
+
+    @staticmethod
+    def _gray(img):
         gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        gray = cv2.resize(gray, None, fx=2.5, fy=2.5, interpolation=cv2.INTER_CUBIC)
 
-        clahe = cv2.createCLAHE(2.0, (8,8)).apply(gray)
+        # تكبير لحد ارتفاع ثابت بس (أقصى 2.5x) بدل 2.5x لكل crop
+        scale = min(2.5, SystemConfig.OCR_TARGET_HEIGHT / gray.shape[0])
+        if scale > 1:
+            gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_CUBIC)
+        return gray
+
+    @staticmethod
+    def generate(img):
+        gray = PlatePreprocessor._gray(img)
+        clahe = PlatePreprocessor._clahe().apply(gray)
         _, otsu = cv2.threshold(clahe, 0, 255, cv2.THRESH_BINARY+cv2.THRESH_OTSU)
 
         return [gray, clahe, otsu]
 
+    @staticmethod
+    def primary(img):
+        """variant واحد بس (CLAHE) - للـ batch OCR في الصور الثابتة"""
+        return PlatePreprocessor._clahe().apply(PlatePreprocessor._gray(img))
@@ -0,0 +1,164 @@
+import cv2
+import numpy as np
+from config import SystemConfig
+
+
+class TrackPropagator:
+    """
+    الـ YOLO + ByteTrack كل K إطار بس، وفي النص الصناديق بتتحرك بـ sparse optical flow
+    (Lucas-Kanade + فحص forward-backward)، ولو النقط ضاعت بنكمّل بآخر سرعة (constant velocity)
+
+    K بيتغير لوحده:
+    - drift: الفرق بين مكان الصندوق المتوقع واللي الكاشف لقاه (نسبة من قطر الصندوق)
+      كبير -> نكشف أكتر، صغير -> نكشف أقل
+    - لو الـ tracks كتير الحد الأقصى لـ K بيقل للنص
+    """
+    LK_PARAMS = dict(
+        winSize=(15, 15),
+        maxLevel=2,
+        criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 0.03)
+    )
+
+    def __init__(self, detector, k=None, k_min=None, k_max=None):
+        self.detector = detector
+        self.k_min = k_min or SystemConfig.DETECT_K_MIN
+        self.k_max = k_max or SystemConfig.DETECT_K_MAX
+        self.k = k or SystemConfig.DETECT_EVERY_K
+        self.since_detect = None
+        self.drift = 0.0
+
+        self.prev_gray = None
+        # tid -> {"bbox", "anchor" (صندوق آخر كشف), "velocity" (بكسل/إطار)} بإحداثيات الصورة
+        self.tracks = {}
+        self.points = None    # (P, 1, 2) float32
+        self.owners = None    # (P,) رقم الـ track لكل نقطة
+
+    def reset(self):
+        self.detector.reset()
+        self.since_detect = None
+        self.prev_gray = None
+        self.tracks = {}
+        self.points = self.owners = None
+
+    def due(self):
+        """الإطار الجاي هيتعمله كشف ولا propagation"""
+        return self.since_detect is None or self.since_detect >= self.k
+
+    def detect(self, frame):
+        """
+        نفس مخرجات VehicleDetector.detect + "detected":
+        True لو من الكاشف، False لو صندوق متوقع
+        """
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        if self.due() or self.prev_gray is None or self.prev_gray.shape != gray.shape:
+            vehicles = self._detect(frame, gray)
+        else:
+            vehicles = self._propagate(gray)
+        self.prev_gray = gray
+        self.since_detect += 1
+        return vehicles
+
+    def _detect(self, frame, gray):
+        vehicles = self.detector.detect(frame)
+        steps = self.since_detect or 1
+
+        errors = []
+        tracks = {}
+        for v in vehicles:
+            box = np.asarray(v["bbox"], dtype=np.float32)
+            velocity = np.zeros(2, dtype=np.float32)
+            old = self.tracks.get(v["track_id"])
+            if old is not None:
+                # التوقع للإطار ده = آخر صندوق + خطوة كمان بنفس السرعة
+                predicted = old["bbox"] + np.tile(old["velocity"], 2)
+                diag = max(float(np.hypot(box[2] - box[0], box[3] - box[1])), 1.0)
+                errors.append(float(np.abs(_center(predicted) - _center(box)).max()) / diag)
+                velocity = (_center(box) - _center(old["anchor"])) / steps
+            tracks[v["track_id"]] = {"bbox": box, "anchor": box, "velocity": velocity}
+            v["detected"] = True
+
+        self.tracks = tracks
+        self._adapt(errors)
+        self._seed(gray)
+        self.since_detect = 0
+        return vehicles
+
+    def _adapt(self, errors):
+        if errors:
+            self.drift = 0.7 * self.drift + 0.3 * float(np.mean(errors))
+
+        cap = self.k_max
+        if len(self.tracks) > SystemConfig.DETECT_MANY_TRACKS:
+            cap = max(self.k_min, self.k_max // 2)
+
+        if self.drift > SystemConfig.DETECT_DRIFT_HIGH:
+            self.k -= 1
+        elif self.drift < SystemConfig.DETECT_DRIFT_LOW:
+            self.k += 1
+        self.k = int(min(max(self.k, self.k_min), cap))
+
+    def _seed(self, gray):
+        """نقط مميزة جوه كل صندوق (من غير الأطراف عشان الخلفية)"""
+        h, w = gray.shape
+        points, owners = [], []
+        for tid, t in self.tracks.items():
+            x1, y1, x2, y2 = t["bbox"]
+            mx, my = (x2 - x1) * 0.15, (y2 - y1) * 0.15
+            x1, y1 = int(max(x1 + mx, 0)), int(max(y1 + my, 0))
+            x2, y2 = int(min(x2 - mx, w)), int(min(y2 - my, h))
+            if x2 - x1 < 8 or y2 - y1 < 8:
+                continue
+            found = cv2.goodFeaturesToTrack(gray[y1:y2, x1:x2], maxCorners=20, qualityLevel=0.01, minDistance=4)
+            if found is None:
+                continue
+            found += np.array([x1, y1], dtype=np.float32)
+            points.append(found)
+            owners.extend([tid] * len(found))
+
+        if points:
+            self.points = np.concatenate(points).astype(np.float32)
+            self.owners = np.asarray(owners)
+        else:
+            self.points = self.owners = None
+
+    def _propagate(self, gray):
+        moved = {}
+        if self.points is not None:
+            p1, st, _ = cv2.calcOpticalFlowPyrLK(self.prev_gray, gray, self.points, None, **self.LK_PARAMS)
+            back, st_back, _ = cv2.calcOpticalFlowPyrLK(gray, self.prev_gray, p1, None, **self.LK_PARAMS)
+            good = (
+                (st.ravel() == 1)
+                & (st_back.ravel() == 1)
+                & (np.abs(self.points - back).reshape(-1, 2).max(axis=1) < 1.0)
+            )
+            delta = (p1 - self.points).reshape(-1, 2)
+            for tid in np.unique(self.owners[good]):
+                sel = good & (self.owners == tid)
+                if sel.sum() >= 3:
+                    moved[tid] = np.median(delta[sel], axis=0)
+
+            self.points = p1[good]
+            self.owners = self.owners[good]
+            if len(self.points) == 0:
+                self.points = self.owners = None
+
+        vehicles = []
+        for tid, t in self.tracks.items():
+            d = moved.get(tid)
+            if d is None:
+                d = t["velocity"]
+            else:
+                t["velocity"] = 0.5 * t["velocity"] + 0.5 * d
+            t["bbox"] = t["bbox"] + np.tile(d, 2)
+            box = t["bbox"]
+            vehicles.append({
+                "track_id": int(tid),
+                "bbox": tuple(box),
+                "center": tuple(_center(box)),
+                "detected": False
+            })
+        return vehicles
+
+
+def _center(box):
+    return np.array([(box[0] + box[2]) / 2, (box[1] + box[3]) / 2], dtype=np.float32)
@@ -0,0 +1,134 @@
+import cv2
+import heapq
+import itertools
+import numpy as np
+from config import SystemConfig
+
+class PlateQuality:
+    @staticmethod
+    def score(img, det_conf=1.0):
+        """
+        تقييم جودة crop اللوحة (0..1) قبل الـ OCR
+        sharpness (Laplacian variance) + contrast + الحجم + نسبة العرض للارتفاع + ثقة الكاشف
+        """
+        h, w = img.shape[:2]
+        if h == 0 or w == 0:
+            return 0.0
+
+        gray = img if img.ndim == 2 else cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+
+        sharpness = cv2.Laplacian(gray, cv2.CV_64F).var()
+        sharp_score = min(sharpness / SystemConfig.OCR_SHARPNESS_REF, 1.0)
+
+        contrast_score = min(float(gray.std()) / 64.0, 1.0)
+
+        size_score = min(w / (2.0 * SystemConfig.OCR_MIN_W), 1.0) * min(h / (2.0 * SystemConfig.OCR_MIN_H), 1.0)
+
+        # اللوحة المايلة أو المقصوصة نسبتها بتبعد عن النسبة الطبيعية
+        aspect = w / h
+        aspect_score = float(np.exp(-abs(np.log(aspect / SystemConfig.OCR_PLATE_ASPECT))))
+
+        return float(
+            0.35 * sharp_score
+            + 0.15 * contrast_score
+            + 0.2 * size_score
+            + 0.15 * aspect_score
+            + 0.15 * float(det_conf)
+        )
+
+
+class VehicleQuality:
+    @staticmethod
+    def score(crop, bbox, shape):
+        """
+        تقييم سريع لإطار السيارة من غير كشف لوحة (المرحلة الأولى في two-pass)
+        الحجم + حدة النص التحتاني (مكان اللوحة غالباً) + السيارة مش مقصوصة عند حافة الإطار
+        """
+        h, w = shape[:2]
+        x1, y1, x2, y2 = bbox
+        ch, cw = crop.shape[:2]
+        if ch < 4 or cw < 4:
+            return 0.0
+
+        size_score = min((x2 - x1) * (y2 - y1) / (0.1 * w * h), 1.0)
+
+        # حدة على نسخة صغيرة بعرض ثابت عشان التكلفة متزيدش مع حجم السيارة
+        lower = crop[ch // 2:]
+        small = cv2.resize(lower, (128, max(1, int(128 * lower.shape[0] / cw))), interpolation=cv2.INTER_AREA)
+        gray = small if small.ndim == 2 else cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        sharp_score = min(cv2.Laplacian(gray, cv2.CV_64F).var() / SystemConfig.OCR_SHARPNESS_REF, 1.0)
+
+        clipped = x1 <= 1 or y1 <= 1 or x2 >= w - 1 or y2 >= h - 1
+        return float((0.5 * size_score + 0.5 * sharp_score) * (0.5 if clipped else 1.0))
+
+
+class BestShotBuffer:
+    def __init__(self, k=3, margin=0.1, min_score=0.3, retry_every=2):
+        """
+        k: عدد أفضل اللقطات المحفوظة لكل track
+        margin: اللقطة لازم تتفوق على أفضل لقطة اتقرت بالفرق ده عشان تتقري تاني
+        min_score: أقل جودة مقبولة
+        retry_every: بعد قراءة من غير consensus، إعادة القراءة بعد العدد ده من اللقطات المقبولة
+        """
+        self.k = k
+        self.margin = margin
+        self.min_score = min_score
+        self.retry_every = max(1, retry_every)
+        self.shots = {}
+        self._seq = itertools.count()
+
+    def add(self, tid, crop, score):
+        """
+        إضافة لقطة - بترجع الـ crop اللي لازم يتعمله OCR دلوقتي (أو None)
+        أول قراءة بتحصل بعد k لقطات مقبولة على أفضلهم،
+        وبعد كده أي لقطة أحسن من أفضل قراءة بـ margin، أو لقطة retry بعد miss
+        """
+        if score < self.min_score:
+            return None
+
+        entry = self.shots.setdefault(tid, {"heap": [], "best_read": None, "seen": 0, "retry_at": None})
+        entry["seen"] += 1
+
+        # الـ crop ممكن يكون view من الإطار، فبننسخ بس لو هيتحفظ
+        if len(entry["heap"]) < self.k:
+            heapq.heappush(entry["heap"], (score, next(self._seq), crop.copy()))
+        elif score > entry["heap"][0][0]:
+            heapq.heapreplace(entry["heap"], (score, next(self._seq), crop.copy()))
+
+        if entry["best_read"] is None:
+            if entry["seen"] < self.k:
+                return None
+            best = max(entry["heap"])
+            entry["best_read"] = best[0]
+            return best[2]
+
+        if score >= entry["best_read"] + self.margin:
+            entry["best_read"] = score
+            entry["retry_at"] = None
+            return crop
+
+        if entry["retry_at"] is not None and entry["seen"] >= entry["retry_at"]:
+            entry["best_read"] = max(entry["best_read"], score)
+            entry["retry_at"] = None
+            return crop
+
+        return None
+
+    def miss(self, tid):
+        """
+        القراءة موصلتش لـ consensus (مفيش نص صالح / أصوات قليلة / مختلفة):
+        لقطة كمان هتتقري بعد retry_every لقطات مقبولة حتى لو الجودة ثابتة أو نزلت
+        """
+        entry = self.shots.get(tid)
+        if entry is not None and entry["best_read"] is not None:
+            entry["retry_at"] = entry["seen"] + self.retry_every
+
+    def best(self, tid):
+        """أفضل لقطة محفوظة للـ track"""
+        entry = self.shots.get(tid)
+        if not entry or not entry["heap"]:
+            return None
+        return max(entry["heap"])[2]
+
+    def drop(self, tid):
+        self.shots.pop(tid, None)
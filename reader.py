@@ -3,17 +3,22 @@ os.environ["DISABLE_MODEL_SOURCE_CHECK"] = "True"
 
 from paddleocr import PaddleOCR
 from ocr.preprocess import PlatePreprocessor
+from ocr.cache import CachedReader
+from core import resources
+import cv2
 import re
 
-class OCREngine:
+class OCREngine(CachedReader):
     def __init__(self):
+        super().__init__()
         self.ocr = PaddleOCR(
             lang="en",
             use_gpu=False,
-            show_log=False
+            show_log=False,
+            cpu_threads=resources.threads("paddle")
         )
 
-    def read(self, img):
+    def _read(self, img):
         out = []
         for var in PlatePreprocessor.generate(img):
             res = self.ocr.ocr(var, cls=False)
@@ -26,6 +31,23 @@ class OCREngine:
                     out.append((txt, conf))
         return out
 
+    def read_batch(self, imgs):
+        """
+        OCR لمجموعة crops في call واحدة للـ recognizer (الصور الثابتة):
+        variant واحد ومن غير text detection - الـ crop جاي من كاشف اللوحات أصلاً
+        """
+        if not imgs:
+            return []
+        variants = [cv2.cvtColor(PlatePreprocessor.primary(img), cv2.COLOR_GRAY2BGR) for img in imgs]
+        # الـ recognizer بيقسّم لـ batches بـ rec_batch_num لوحده
+        rec, _ = self.ocr.text_recognizer(variants)
+
+        out = []
+        for text, conf in rec:
+            txt = self._clean(text)
+            out.append([(txt, float(conf))] if self._valid(txt) else [])
+        return out
+
     def _clean(self, t):
         t = re.sub(r"[^A-Z0-9]", "", t.upper())
         return t
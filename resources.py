@@ -0,0 +1,78 @@
+"""
+توزيع الـ CPU على الـ engines (torch / Paddle / OpenCV) وعلى الـ jobs / workers
+
+كل library لوحدها بتعمل thread pool بعدد كل الـ cores، فمع أكتر من job في نفس الوقت
+الـ threads بتتخانق والـ throughput الكلي بيقل. الحل: كل worker ياخد نصيبه بس
+(cores / عدد الـ workers) ولو CPU_AFFINITY يتثبت على cores منفصلة
+"""
+import os
+from config import SystemConfig
+
+# الـ budget المطبّق في الـ process دي (OCREngine بيقرا منه عدد threads الـ Paddle)
+CURRENT = {}
+
+
+def available_cores():
+    """الـ cores المسموحة للـ process (بتحترم taskset / cgroups لو متاحة)"""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def plan(workers=1, index=None, cores=None):
+    """
+    الـ budget لـ worker واحد من workers:
+    {"torch": n, "paddle": n, "opencv": n, "cores": [..] أو None}
+    الأرقام المحددة في SystemConfig.THREADS_* بتكسب على الحساب التلقائي
+    """
+    cores = cores if cores is not None else available_cores()
+    workers = max(1, workers)
+    share = max(1, len(cores) // workers)
+
+    affinity = None
+    if SystemConfig.CPU_AFFINITY and index is not None and len(cores) >= workers:
+        start = (index % workers) * share
+        affinity = cores[start:start + share]
+
+    return {
+        "torch": SystemConfig.THREADS_TORCH or share,
+        "paddle": SystemConfig.THREADS_PADDLE or share,
+        "opencv": SystemConfig.THREADS_OPENCV or share,
+        "cores": affinity,
+    }
+
+
+def apply(budget):
+    """
+    تطبيق الـ budget على الـ process الحالية
+    متغيرات OpenMP / MKL بتأثر بس لو اتعملت قبل import بتاع torch / paddle
+    """
+    omp = str(max(budget["torch"], budget["paddle"]))
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ.setdefault(var, omp)
+
+    if budget.get("cores") and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, budget["cores"])
+
+    import cv2
+    cv2.setNumThreads(budget["opencv"])
+
+    try:
+        import torch
+        torch.set_num_threads(budget["torch"])
+        try:
+            # بيتقبل مرة واحدة بس قبل أي شغل parallel
+            torch.set_num_interop_threads(1)
+        except RuntimeError:
+            pass
+    except ImportError:
+        pass
+
+    CURRENT.clear()
+    CURRENT.update(budget)
+    return budget
+
+
+def threads(engine):
+    """عدد الـ threads لـ engine حسب الـ budget المطبّق (أو الحساب التلقائي)"""
+    return CURRENT.get(engine) or plan(SystemConfig.MAX_PARALLEL_JOBS)[engine]
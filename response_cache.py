@@ -0,0 +1,78 @@
+"""
+كاش لردود الـ GET اللي الـ dashboard بيسألها كل شوية (vehicles / violations / alerts / watchlist / stats)
+
+- المفتاح: المسار + الـ query params
+- الصلاحية: PRAGMA data_version على connection ثابتة - بيزيد مع أي commit من connection تانية
+  (الـ processors، الـ endpoints، أو الـ bulk CLI من process تاني)
+- ETag = hash المحتوى، فلو If-None-Match مطابق بنرجع 304 من غير body
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+from collections import OrderedDict
+from fastapi.responses import Response
+from config import SystemConfig
+
+
+class ResponseCache:
+    def __init__(self, db_path, max_entries=256):
+        self.db_path = str(db_path)
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # key -> (data_version, etag, body)
+        self.lock = threading.Lock()
+        self.conn = None
+        self.hits = 0
+        self.misses = 0
+
+    def version(self):
+        with self.lock:
+            if self.conn is None:
+                self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            return self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    @staticmethod
+    def key(request):
+        return request.url.path + "?" + "&".join(
+            f"{k}={v}" for k, v in sorted(request.query_params.multi_items())
+        )
+
+    def get(self, key, version, build):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] == version:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry
+
+        # الـ build بره الـ lock - لو حصلت كتابة أثناءه الـ version الجاية هتختلف ونعيد البناء
+        body = json.dumps(build(), ensure_ascii=False, default=str).encode("utf-8")
+        etag = '"' + hashlib.sha1(body).hexdigest()[:20] + '"'
+        entry = (version, etag, body)
+        with self.lock:
+            self.misses += 1
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return entry
+
+    def respond(self, request, build):
+        """
+        build: دالة بترجع الـ payload (بتتنادي بس لو الكاش مش صالح)
+        """
+        if not SystemConfig.RESPONSE_CACHE_ENABLED:
+            return build()
+
+        _, etag, body = self.get(self.key(request), self.version(), build)
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+        # W/ من الـ proxies مش فارقة هنا (المقارنة weak)
+        match = [t.strip() for t in request.headers.get("if-none-match", "").split(",")]
+        match = [t[2:] if t.startswith("W/") else t for t in match]
+        if etag in match or "*" in match:
+            return Response(status_code=304, headers=headers)
+        return Response(body, media_type="application/json", headers=headers)
+
+
+RESPONSES = ResponseCache(SystemConfig.DB_PATH, SystemConfig.RESPONSE_CACHE_MAX_ENTRIES)
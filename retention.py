@@ -0,0 +1,182 @@
+"""
+سياسة الاحتفاظ بالبيانات - عشان حجم الـ DB وسرعة الاستعلامات يفضلوا ثابتين مع الوقت
+
+- ocr_timeline: قراءات السيارات اللي كل قراءاتها أقدم من RETENTION_OCR_DAYS
+  بتتلخص في ocr_summary (أفضل المرشحين: عدد القراءات + متوسط الثقة)،
+  وتتكتب في أرشيف يومي مضغوط ARCHIVE_DIR/ocr_timeline/YYYY-MM-DD.ndjson.gz وبعدين تتمسح
+- evidence: مجلدات الأيام الأقدم من RETENTION_EVIDENCE_DAYS بتتمسح
+  ومساراتها بتتشال من vehicles / alerts
+- incremental vacuum عشان الصفحات الفاضية ترجع للـ filesystem
+
+  python -m core.retention                   # تشغيل مرة (مثلاً من cron)
+  python -m core.retention --convert-vacuum  # DB قديمة: تحويل لـ auto_vacuum=INCREMENTAL (VACUUM كامل مرة واحدة)
+"""
+import argparse
+import gzip
+import json
+import re
+import shutil
+from datetime import datetime, timedelta
+from pathlib import Path
+from config import SystemConfig
+from database import DatabaseManager
+
+DATE_DIR = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+
+def _cutoff(days):
+    return (datetime.utcnow() - timedelta(days=days)).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def summarize(rows, top_k):
+    """
+    rows: (frame, text, confidence) لسيارة واحدة
+    بترجع أفضل top_k مرشح: (text, reads, mean_conf, max_conf, first_frame, last_frame)
+    """
+    stats = {}
+    for frame, text, conf in rows:
+        s = stats.get(text)
+        if s is None:
+            stats[text] = [1, conf, conf, frame, frame]
+        else:
+            s[0] += 1
+            s[1] += conf
+            s[2] = max(s[2], conf)
+            s[3] = min(s[3], frame)
+            s[4] = max(s[4], frame)
+
+    ranked = sorted(stats.items(), key=lambda kv: (kv[1][0], kv[1][1]), reverse=True)[:top_k]
+    return [
+        (text, n, round(total / n, 4), mx, first, last)
+        for text, (n, total, mx, first, last) in ranked
+    ]
+
+
+def compact_ocr(db, days=None, archive_dir=None, top_k=None, batch=None):
+    """ضغط وأرشفة ocr_timeline القديم - بترجع (عدد السيارات, عدد الصفوف)"""
+    days = SystemConfig.RETENTION_OCR_DAYS if days is None else days
+    archive_dir = Path(archive_dir or SystemConfig.ARCHIVE_DIR) / "ocr_timeline"
+    top_k = top_k or SystemConfig.RETENTION_SUMMARY_TOP_K
+    batch = batch or SystemConfig.RETENTION_BATCH_VEHICLES
+    cutoff = _cutoff(days)
+
+    # السيارة بتتضغط مرة واحدة لما كل قراءاتها تبقى قديمة (السيارات الشغالة بتستنى)
+    vids = [r[0] for r in db.c.execute("""
+        SELECT vehicle_id FROM ocr_timeline WHERE created_at < ? GROUP BY vehicle_id
+        EXCEPT
+        SELECT vehicle_id FROM ocr_timeline WHERE created_at >= ?
+    """, (cutoff, cutoff)).fetchall()]
+
+    archive_dir.mkdir(parents=True, exist_ok=True)
+    total_rows = 0
+    for i in range(0, len(vids), batch):
+        chunk = vids[i:i + batch]
+        marks = ",".join("?" * len(chunk))
+        rows = db.c.execute(f"""
+            SELECT vehicle_id, frame, text, confidence, created_at
+            FROM ocr_timeline
+            WHERE vehicle_id IN ({marks})
+            ORDER BY vehicle_id, id
+        """, chunk).fetchall()
+
+        per_vehicle = {}
+        per_day = {}
+        for vid, frame, text, conf, created_at in rows:
+            per_vehicle.setdefault(vid, []).append((frame, text, conf))
+            per_day.setdefault(str(created_at)[:10], []).append(json.dumps({
+                "vehicle_id": vid,
+                "frame": frame,
+                "text": text,
+                "confidence": conf,
+                "created_at": created_at
+            }, ensure_ascii=False))
+
+        # الأرشيف الأول، وبعده المسح - لو حصل crash في النص ممكن يتكرر سطر في الأرشيف بس مفيش ضياع
+        for day, lines in per_day.items():
+            # كل تشغيل بيضيف gzip member جديد - gzip.open بيقرا الملف كله عادي
+            with gzip.open(archive_dir / f"{day}.ndjson.gz", "at", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+
+        with db.conn:
+            db.c.executemany(
+                """INSERT OR REPLACE INTO ocr_summary(
+                    vehicle_id, text, reads, mean_confidence, max_confidence, first_frame, last_frame
+                ) VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                [(vid, *s) for vid, reads in per_vehicle.items() for s in summarize(reads, top_k)]
+            )
+            db.c.execute(f"DELETE FROM ocr_timeline WHERE vehicle_id IN ({marks})", chunk)
+        total_rows += len(rows)
+
+    return len(vids), total_rows
+
+
+def prune_evidence(db, days=None, evidence_dir=None):
+    """مسح مجلدات الأدلة (YYYY-MM-DD) الأقدم من days - بترجع عدد المجلدات"""
+    days = SystemConfig.RETENTION_EVIDENCE_DAYS if days is None else days
+    if days is None:
+        return 0
+    evidence_dir = Path(evidence_dir or SystemConfig.EVIDENCE_DIR)
+    if not evidence_dir.exists():
+        return 0
+    oldest = (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d")
+
+    # الأدلة بتتحفظ في EVIDENCE_DIR/<date>/ و EVIDENCE_DIR/bulk/<video>/<date>/
+    roots = [evidence_dir] + [p for p in (evidence_dir / "bulk").glob("*") if p.is_dir()]
+    removed = 0
+    for root in roots:
+        for d in root.iterdir():
+            if not d.is_dir() or not DATE_DIR.match(d.name) or d.name >= oldest:
+                continue
+            shutil.rmtree(d, ignore_errors=True)
+            prefix = str(d) + "%"
+            with db.conn:
+                db.c.execute("UPDATE vehicles SET evidence_path=NULL WHERE evidence_path LIKE ?", (prefix,))
+                db.c.execute("UPDATE alerts SET evidence_path='' WHERE evidence_path LIKE ?", (prefix,))
+            removed += 1
+    return removed
+
+
+def vacuum(db, pages=None, convert=False):
+    """
+    incremental vacuum - بيرجع الصفحات الفاضية بس من غير ما يقفل الـ DB مدة طويلة
+    convert: DB اتعملت قبل auto_vacuum=INCREMENTAL محتاجة VACUUM كامل مرة واحدة
+    """
+    pages = SystemConfig.RETENTION_VACUUM_PAGES if pages is None else pages
+    db.commit()
+    mode = db.c.execute("PRAGMA auto_vacuum").fetchone()[0]
+    if mode != 2:
+        if not convert:
+            return {"mode": mode, "freed_pages": 0}
+        db.c.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        db.c.execute("VACUUM")
+        return {"mode": 2, "freed_pages": None, "converted": True}
+
+    free = db.c.execute("PRAGMA freelist_count").fetchone()[0]
+    # execute() بيعمل step واحد بس (صفحة واحدة)، executescript بيكمّل الـ pragma للآخر
+    db.conn.executescript(f"PRAGMA incremental_vacuum({int(pages)});" if pages else "PRAGMA incremental_vacuum;")
+    return {"mode": 2, "freed_pages": free - db.c.execute("PRAGMA freelist_count").fetchone()[0]}
+
+
+def run(db_path=None, convert_vacuum=False):
+    """تشغيل كل السياسات مرة - بترجع ملخص"""
+    db = DatabaseManager(str(db_path or SystemConfig.DB_PATH))
+    try:
+        vehicles, rows = compact_ocr(db)
+        dirs = prune_evidence(db)
+        vac = vacuum(db, convert=convert_vacuum)
+    finally:
+        db.close()
+    return {
+        "ocr_compacted_vehicles": vehicles,
+        "ocr_archived_rows": rows,
+        "evidence_dirs_removed": dirs,
+        "vacuum": vac,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply retention: compact/archive ocr_timeline, prune evidence, vacuum")
+    parser.add_argument("--db", default=str(SystemConfig.DB_PATH))
+    parser.add_argument("--convert-vacuum", action="store_true", help="one-time full VACUUM to enable incremental vacuum")
+    args = parser.parse_args()
+    print(json.dumps(run(args.db, args.convert_vacuum), indent=2))
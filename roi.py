@@ -0,0 +1,88 @@
+import numpy as np
+from config import SystemConfig
+
+class RegionOfInterest:
+    def __init__(self, polygon):
+        """
+        polygon: نقاط المضلع [(x, y), ...] كنسبة من أبعاد الإطار (0..1)
+        """
+        self.polygon = np.asarray(polygon, dtype=np.float32)
+        if self.polygon.ndim != 2 or self.polygon.shape[0] < 3:
+            raise ValueError("ROI polygon needs at least 3 points")
+
+        # نحسب المضلع بالبكسل مرة واحدة لكل مقاس إطار
+        self._shape = None
+        self.points = None
+        self.rect = None
+
+    @classmethod
+    def for_camera(cls, camera_id):
+        """جلب الـ ROI الخاص بكاميرا / مهمة معينة (None لو مش متعرّف)"""
+        polygon = SystemConfig.ROI_POLYGONS.get(camera_id)
+        if polygon is None:
+            polygon = SystemConfig.ROI_POLYGONS.get("default")
+        if polygon is None:
+            return None
+        return cls(polygon)
+
+    def bind(self, shape):
+        """تحويل المضلع لإحداثيات البكسل حسب مقاس الإطار"""
+        h, w = shape[:2]
+        if self._shape == (h, w):
+            return
+
+        pts = self.polygon * np.array([w, h], dtype=np.float32)
+        pts[:, 0] = np.clip(pts[:, 0], 0, w)
+        pts[:, 1] = np.clip(pts[:, 1], 0, h)
+
+        x1, y1 = np.floor(pts.min(axis=0)).astype(int)
+        x2, y2 = np.ceil(pts.max(axis=0)).astype(int)
+
+        self._shape = (h, w)
+        self.points = pts
+        self.rect = (int(x1), int(y1), int(x2), int(y2))
+
+    def crop(self, frame):
+        """قص الإطار على المستطيل المحيط بالـ ROI (view بدون نسخ)"""
+        self.bind(frame.shape)
+        x1, y1, x2, y2 = self.rect
+        return frame[y1:y2, x1:x2], (x1, y1)
+
+    def contains(self, centers):
+        """
+        فحص مجموعة مراكز مرة واحدة (ray casting)
+        centers: مصفوفة (N, 2) بإحداثيات الإطار الكامل
+        """
+        c = np.asarray(centers, dtype=np.float32).reshape(-1, 2)
+        if len(c) == 0:
+            return np.zeros(0, dtype=bool)
+
+        x = c[:, 0:1]
+        y = c[:, 1:2]
+        x1 = self.points[:, 0]
+        y1 = self.points[:, 1]
+        x2 = np.roll(x1, -1)
+        y2 = np.roll(y1, -1)
+
+        crosses = (y1 > y) != (y2 > y)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            x_cross = (x2 - x1) * (y - y1) / (y2 - y1) + x1
+        inside = crosses & (x < x_cross)
+        return np.count_nonzero(inside, axis=1) % 2 == 1
+
+    def filter(self, vehicles, offset=(0, 0)):
+        """
+        إرجاع إحداثيات الـ crop للإطار الكامل وحذف السيارات اللي مركزها برا المضلع
+        """
+        ox, oy = offset
+        for v in vehicles:
+            x1, y1, x2, y2 = v["bbox"]
+            v["bbox"] = (x1 + ox, y1 + oy, x2 + ox, y2 + oy)
+            cx, cy = v["center"]
+            v["center"] = (cx + ox, cy + oy)
+
+        if not vehicles:
+            return vehicles
+
+        mask = self.contains([v["center"] for v in vehicles])
+        return [v for v, keep in zip(vehicles, mask) if keep]
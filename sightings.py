@@ -0,0 +1,35 @@
+import threading
+from collections import OrderedDict
+from config import SystemConfig
+
+
+class LastSeenCache:
+    """
+    آخر ظهور لكل لوحة في الذاكرة (LRU) - بيتحدّث من الـ processors في نفس الـ process بس
+    (الكتابة من الـ bulk CLI أو workers تانية مش بتوصله، فالـ API بيقرا آخر ظهور من الـ DB)
+    """
+    def __init__(self, max_size=10000):
+        self.max_size = max_size
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, plate):
+        with self.lock:
+            entry = self.data.get(plate)
+            if entry is not None:
+                self.data.move_to_end(plate)
+            return entry
+
+    def put(self, plate, entry):
+        """entry: dict فيه seen_at على الأقل - الأقدم من اللي محفوظ بيتجاهل"""
+        with self.lock:
+            old = self.data.get(plate)
+            if old is not None and old["seen_at"] > entry["seen_at"]:
+                return
+            self.data[plate] = entry
+            self.data.move_to_end(plate)
+            while len(self.data) > self.max_size:
+                self.data.popitem(last=False)
+
+
+LAST_SEEN = LastSeenCache(SystemConfig.SIGHTINGS_CACHE_SIZE)
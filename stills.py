@@ -0,0 +1,205 @@
+"""
+التعرف على اللوحات في صور ثابتة (كاميرات الكارتة والجراجات) من غير ما نلفها في فيديو
+
+- كشف اللوحات على batch صور في call واحدة (من غير ByteTrack)، وكشف السيارات اختياري
+- OCR لكل لوحات الـ batch في call واحدة للـ recognizer (مفيش voting window - صورة واحدة = قراءة واحدة)
+- فك الـ JPEG للـ batch الجاية في threads بالتوازي مع كشف الـ batch الحالية
+
+  from core.stills import StillProcessor
+  stills = StillProcessor()                       # الموديلات بتتحمل مرة واحدة
+  out = stills.process(["a.jpg", jpeg_bytes, frame], db=db, camera_id="toll-3")
+  out["images_per_sec"], out["results"]
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import cv2
+import numpy as np
+from config import SystemConfig
+from detection.plate_detector import assign_plates
+from ocr.quality import PlateQuality
+from alerts.watchlist import WatchlistManager
+from core.events import BUS
+from core.sightings import LAST_SEEN
+
+
+def decode(item):
+    """bytes / مسار / مصفوفة BGR -> مصفوفة BGR (أو None لو الصورة بايظة)"""
+    if isinstance(item, np.ndarray):
+        return item
+    try:
+        if isinstance(item, (bytes, bytearray, memoryview)):
+            # imdecode بيرمي exception على buffer فاضي بدل ما يرجع None
+            if len(item) == 0:
+                return None
+            return cv2.imdecode(np.frombuffer(item, dtype=np.uint8), cv2.IMREAD_COLOR)
+        return cv2.imread(str(item), cv2.IMREAD_COLOR)
+    except cv2.error:
+        return None
+
+
+class StillProcessor:
+    def __init__(self, models=None, batch_size=None):
+        """
+        models: (vdet, pdet, ocr) من VehicleProcessor.load_models
+        الموديلات مش thread-safe فـ process واحدة بس بتشتغل في نفس الوقت
+        """
+        if models is None:
+            from core.vehicle_processor import VehicleProcessor
+            models = VehicleProcessor.load_models()
+        self.vdet, self.pdet, self.ocr = models
+        self.batch_size = batch_size or SystemConfig.STILLS_BATCH_SIZE
+        self.lock = threading.Lock()
+
+    def process(self, images, names=None, db=None, camera_id=None, task_id=None, with_vehicles=None):
+        """
+        images: list من bytes / مسارات / مصفوفات
+        db: لو اتبعت، القراءات بتتسجل (vehicles + plate_sightings) والـ watchlist بتتفحص
+        with_vehicles: كشف السيارات كمان (vehicle_bbox لكل لوحة) - pass كامل زيادة لكل صورة
+        """
+        if with_vehicles is None:
+            with_vehicles = SystemConfig.STILLS_DETECT_VEHICLES
+        names = list(names) if names is not None else [
+            str(img) if isinstance(img, (str, Path)) else str(i) for i, img in enumerate(images)
+        ]
+        batches = [
+            (images[i:i + self.batch_size], names[i:i + self.batch_size])
+            for i in range(0, len(images), self.batch_size)
+        ]
+        watchlist = db.get_watchlist() if db is not None else None
+
+        results = []
+        with self.lock, ThreadPoolExecutor(SystemConfig.STILLS_DECODE_THREADS) as pool:
+            t0 = time.perf_counter()
+            pending = pool.map(decode, batches[0][0]) if batches else None
+            for i, (_, batch_names) in enumerate(batches):
+                frames = list(pending)
+                if i + 1 < len(batches):
+                    pending = pool.map(decode, batches[i + 1][0])
+
+                batch = self.process_batch(frames, batch_names, with_vehicles)
+                if db is not None:
+                    self.record(batch, db, camera_id, task_id, watchlist)
+                results.extend(batch)
+            elapsed = time.perf_counter() - t0
+
+        return {
+            "images": len(images),
+            "plates": sum(1 for r in results for p in r.get("plates", []) if p["plate"]),
+            "elapsed_s": round(elapsed, 3),
+            "images_per_sec": round(len(images) / elapsed, 2) if elapsed else None,
+            "results": results,
+        }
+
+    def process_batch(self, frames, names, with_vehicles=False):
+        """كشف + OCR لـ batch واحدة - نتيجة لكل صورة بنفس الترتيب"""
+        ok = [i for i, f in enumerate(frames) if f is not None]
+        imgs = [frames[i] for i in ok]
+        plates = self.pdet.detect_all_batch(imgs) if imgs else []
+        vehicles = self.vdet.detect_batch(imgs) if imgs and with_vehicles else [None] * len(imgs)
+
+        out = [{"image": name, "error": "could not decode image"} for name in names]
+        jobs = []  # (رقم الصورة, رقم اللوحة في الصورة, صندوق اللوحة, crop)
+        for img, found_plates, found_vehicles, i in zip(imgs, plates, vehicles, ok):
+            h, w = img.shape[:2]
+            out[i] = {"image": names[i], "width": w, "height": h, "plates": []}
+            if found_vehicles is not None:
+                out[i]["vehicles"] = len(found_vehicles)
+
+            # لوحة من غير سيارة متكشفة بتتقري برضه (كاميرات الكارتة بتصور اللوحة من قريب)
+            for pi, p in enumerate(found_plates):
+                x1, y1, x2, y2 = (int(c) for c in p[:4])
+                x1, y1, x2, y2 = max(x1, 0), max(y1, 0), min(x2, w), min(y2, h)
+                if x2 - x1 < SystemConfig.OCR_MIN_W or y2 - y1 < SystemConfig.OCR_MIN_H:
+                    continue
+                jobs.append((i, pi, p, img[y1:y2, x1:x2]))
+
+        # كل لوحات الـ batch في call واحدة
+        reads = self.ocr.read_batch([crop for *_, crop in jobs])
+
+        owners = {}
+        for (i, pi, p, crop), candidates in zip(jobs, reads):
+            entry = self.plate_entry(crop, p, candidates)
+            found_vehicles = vehicles[ok.index(i)]
+            if found_vehicles is not None:
+                if i not in owners:
+                    owners[i] = self.owners(plates[ok.index(i)], found_vehicles)
+                vi = owners[i].get(pi)
+                entry["vehicle_bbox"] = [round(float(c), 1) for c in found_vehicles[vi]["bbox"]] if vi is not None else None
+            out[i]["plates"].append(entry)
+        return out
+
+    @staticmethod
+    def owners(found_plates, found_vehicles):
+        """{رقم اللوحة: رقم السيارة اللي فيها}"""
+        boxes = np.array([v["bbox"] for v in found_vehicles], dtype=np.float32)
+        assigned = assign_plates(found_plates, boxes, SystemConfig.PLATE_ASSIGN_MIN_OVERLAP)
+        return {
+            pi: vi
+            for vi, ap in assigned.items()
+            for pi, p in enumerate(found_plates) if np.array_equal(ap, p)
+        }
+
+    @staticmethod
+    def plate_entry(crop, box, candidates):
+        conf = float(box[4])
+        candidates = sorted(candidates, key=lambda r: r[1], reverse=True)
+        best = candidates[0] if candidates else (None, 0.0)
+        return {
+            "plate": best[0],
+            "confidence": round(best[1], 3),
+            "plate_bbox": [round(float(c), 1) for c in box[:4]],
+            "detector_conf": round(conf, 3),
+            "quality": round(float(PlateQuality.score(crop, conf)), 3),
+            "candidates": [{"text": t, "confidence": round(c, 3)} for t, c in candidates[1:4]],
+        }
+
+    def record(self, batch, db, camera_id, task_id, watchlist):
+        """تسجيل القراءات في commit واحد للـ batch + فحص الـ watchlist"""
+        reads = [p for r in batch for p in r.get("plates", []) if p["plate"]]
+        if not reads:
+            return
+        saved = db.add_plate_reads(
+            [(p["plate"], p["confidence"]) for p in reads], camera_id, task_id
+        )
+
+        watch = WatchlistManager(db)
+        for p, (vid, key, seen_at) in zip(reads, saved):
+            p["vehicle_id"] = vid
+            LAST_SEEN.put(key, {
+                "seen_at": seen_at,
+                "camera_id": camera_id,
+                "task_id": task_id,
+                "vehicle_id": vid
+            })
+            BUS.publish(
+                "plate",
+                task_id=task_id,
+                vehicle_id=vid,
+                plate=p["plate"],
+                confidence=p["confidence"],
+                consensus=False
+            )
+
+            alert = watch.check(p["plate"], watchlist)
+            if alert:
+                p["alert"] = {"watchlist_plate": alert["plate"], "reason": alert["reason"]}
+                db.add_alert(
+                    vehicle_id=vid,
+                    plate=p["plate"],
+                    watchlist_plate=alert["plate"],
+                    reason=alert["reason"],
+                    similarity=round(alert["similarity"], 3),
+                    evidence_path=""
+                )
+                BUS.publish(
+                    "alert",
+                    task_id=task_id,
+                    vehicle_id=vid,
+                    plate=p["plate"],
+                    watchlist_plate=alert["plate"],
+                    reason=alert["reason"],
+                    similarity=round(alert["similarity"], 3),
+                    evidence_path=""
+                )
@@ -0,0 +1,118 @@
+"""
+كاش لمخرجات الـ tracker (track id + صندوق لكل إطار) عشان إعادة تشغيل نفس الفيديو
+بإعدادات OCR / سرعة / watchlist مختلفة من غير YOLO + ByteTrack
+
+الملفين (np.save عادي فبيتقروا بـ mmap من غير ما يتحملوا في الذاكرة):
+  <key>.tracks.npy  صف لكل سيارة في كل إطار (frame, track_id, bbox, detected)
+  <key>.index.npy   offsets: صفوف الإطار f هي tracks[index[f]:index[f + 1]]
+
+الـ key = sha256 الفيديو + الموديل + الإعدادات اللي بتأثر على الـ tracking بس
+"""
+import hashlib
+import json
+import os
+from pathlib import Path
+import numpy as np
+from config import SystemConfig
+
+DTYPE = np.dtype([
+    ("frame", np.int32),
+    ("track_id", np.int32),
+    ("bbox", np.float32, (4,)),
+    ("detected", np.bool_),
+])
+
+# أي تغيير في دول بيغيّر مخرجات الـ tracker، فبيغيّر الـ key
+KEY_CONFIG = (
+    "VEHICLE_CONF", "INFERENCE_BACKEND", "INFERENCE_IMGSZ", "USE_GPU",
+    "PROCESS_WIDTH", "PROCESS_EVERY_N_FRAMES",
+    "DETECT_MODE", "DETECT_EVERY_K", "DETECT_K_MIN", "DETECT_K_MAX",
+    "DETECT_MANY_TRACKS", "DETECT_DRIFT_LOW", "DETECT_DRIFT_HIGH",
+)
+
+
+def file_hash(path, chunk_size=None):
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        while True:
+            data = f.read(chunk_size or SystemConfig.UPLOAD_CHUNK_SIZE)
+            if not data:
+                break
+            sha.update(data)
+    return sha.hexdigest()
+
+
+def cache_key(video_path, camera_id=None):
+    h = hashlib.sha256()
+    h.update(file_hash(video_path).encode())
+
+    model = Path(SystemConfig.VEHICLE_MODEL)
+    h.update(model.name.encode())
+    if model.exists():
+        h.update(file_hash(model).encode())
+
+    config = {k: getattr(SystemConfig, k) for k in KEY_CONFIG}
+    # الـ ROI بيحدد الجزء اللي بيدخل الكاشف
+    config["ROI"] = SystemConfig.ROI_POLYGONS.get(camera_id, SystemConfig.ROI_POLYGONS.get("default"))
+    h.update(json.dumps(config, sort_keys=True, default=str).encode())
+    return h.hexdigest()[:32]
+
+
+def _paths(base):
+    base = Path(base)
+    return base.with_name(base.name + ".tracks.npy"), base.with_name(base.name + ".index.npy")
+
+
+class TrackRecorder:
+    """تسجيل مخرجات الـ tracker أثناء المعالجة - بيتحفظ بس لو الفيديو خلص"""
+    def __init__(self, base):
+        self.base = Path(base)
+        self.rows = []
+
+    def add(self, frame, vehicles):
+        for v in vehicles:
+            self.rows.append((frame, v["track_id"], v["bbox"], v.get("detected", True)))
+
+    def save(self, total_frames):
+        tracks_path, index_path = _paths(self.base)
+        tracks_path.parent.mkdir(parents=True, exist_ok=True)
+
+        tracks = np.array(self.rows, dtype=DTYPE)
+        counts = np.bincount(tracks["frame"], minlength=total_frames + 1) if len(tracks) else np.zeros(total_frames + 1, dtype=np.int64)
+        index = np.zeros(len(counts) + 1, dtype=np.int64)
+        np.cumsum(counts, out=index[1:])
+
+        # الـ index آخر واحد: وجوده معناه إن الكاش كامل
+        for path, arr in ((tracks_path, tracks), (index_path, index)):
+            tmp = path.with_name(path.name + ".tmp")
+            with open(tmp, "wb") as f:
+                np.save(f, arr)
+            os.replace(tmp, path)
+
+
+class TrackReplay:
+    """قراءة الكاش بـ mmap - بيرجع نفس شكل VehicleDetector.detect (بإحداثيات المعالجة)"""
+    def __init__(self, base):
+        tracks_path, index_path = _paths(base)
+        self.tracks = np.load(tracks_path, mmap_mode="r")
+        self.index = np.load(index_path, mmap_mode="r")
+
+    @staticmethod
+    def exists(base):
+        tracks_path, index_path = _paths(base)
+        return tracks_path.exists() and index_path.exists()
+
+    def get(self, frame):
+        if frame + 1 >= len(self.index):
+            return []
+        rows = self.tracks[self.index[frame]:self.index[frame + 1]]
+        vehicles = []
+        for r in rows:
+            x1, y1, x2, y2 = (float(c) for c in r["bbox"])
+            vehicles.append({
+                "track_id": int(r["track_id"]),
+                "bbox": (x1, y1, x2, y2),
+                "center": ((x1 + x2) / 2, (y1 + y2) / 2),
+                "detected": bool(r["detected"])
+            })
+        return vehicles
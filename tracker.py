@@ -1,85 +1,145 @@
 import numpy as np
-from collections import defaultdict, deque
 
 class SpeedTracker:
-    def __init__(self, ppm, fps):
+    MAX_KMH = 250  # فلترة السرعات الغير منطقية
+
+    def __init__(self, ppm, fps, history=30, smooth=10, interval=1, capacity=64, ground=None):
         """
         ppm: Pixels Per Meter (معايرة الكاميرا)
-        fps: Frames Per Second (معدل الإطارات)
+        fps: Frames Per Second (معدل الإطارات) - بيتستخدم لو مفيش timestamp
+        history: عدد المواقع المحفوظة لكل سيارة (ring buffer)
+        smooth: عدد السرعات اللي بنحسب متوسطها لتقليل الضوضاء
+        interval: السرعة بتتحسب بين الموقع الحالي والموقع اللي قبله بالعدد ده من العينات
+        capacity: عدد السيارات المبدئي (بيتضاعف تلقائياً)
+        ground: GroundPlane اختياري - لو موجود المواقع بتتحول لمتر قبل الحساب بدل ppm
         """
         self.ppm = ppm
         self.fps = fps
-        
-        # تخزين مواقع وأوقات السيارات
-        self.positions = defaultdict(lambda: deque(maxlen=30))  # آخر 30 موقع
-        self.timestamps = defaultdict(lambda: deque(maxlen=30))
-        self.speeds = defaultdict(lambda: deque(maxlen=10))  # آخر 10 سرعات
-        
-        self.frame_count = defaultdict(int)
-
-    def update(self, tid, center):
+        self.ground = ground
+        self.history = history
+        self.smooth = smooth
+        self.interval = max(1, min(interval, history - 1))
+
+        # struct-of-arrays: كل سيارة ليها slot ثابت
+        self.slots = {}
+        self.free = []
+        self._alloc(capacity)
+
+    def _alloc(self, capacity):
+        self.capacity = capacity
+        self.pos = np.zeros((capacity, self.history, 2), dtype=np.float32)
+        self.time = np.zeros((capacity, self.history), dtype=np.float64)
+        self.count = np.zeros(capacity, dtype=np.int64)     # عدد المواقع المسجلة
+        self.spd = np.zeros((capacity, self.smooth), dtype=np.float32)
+        self.spd_count = np.zeros(capacity, dtype=np.int64)
+        self.spd_max = np.zeros(capacity, dtype=np.float32)
+        self.free = list(range(capacity - 1, -1, -1))
+
+    def _grow(self):
+        old = (self.pos, self.time, self.count, self.spd, self.spd_count, self.spd_max)
+        n = self.capacity
+        self._alloc(n * 2)
+        self.pos[:n], self.time[:n], self.count[:n], self.spd[:n], self.spd_count[:n], self.spd_max[:n] = old
+        self.free = list(range(self.capacity - 1, n - 1, -1))
+
+    def _slot(self, tid):
+        s = self.slots.get(tid)
+        if s is None:
+            if not self.free:
+                self._grow()
+            s = self.free.pop()
+            self.count[s] = 0
+            self.spd_count[s] = 0
+            self.spd_max[s] = 0
+            self.slots[tid] = s
+        return s
+
+    def update_many(self, tids, centers, t):
         """
-        تحديث موقع السيارة وحساب السرعة
-        tid: Track ID
-        center: (x, y) - مركز السيارة
+        تحديث كل السيارات الظاهرة في الإطار مرة واحدة
+        tids: أرقام الـ tracks
+        centers: (N, 2) مراكز السيارات (أو نقط التلامس مع الأرض لو فيه ground)
+        t: وقت الإطار بالثواني (من رقم الإطار الحقيقي أو timestamp الفيديو)
+        بترجع مصفوفة (N,) بمتوسط السرعة km/h أو nan لو لسه مفيش سرعة
         """
-        current_frame = self.frame_count[tid]
-        self.frame_count[tid] += 1
-        
-        # حفظ الموقع والوقت
-        self.positions[tid].append(center)
-        self.timestamps[tid].append(current_frame)
-        
+        n = len(tids)
+        if n == 0:
+            return np.zeros(0, dtype=np.float32)
+
+        idx = np.fromiter((self._slot(tid) for tid in tids), dtype=np.int64, count=n)
+        centers = np.asarray(centers, dtype=np.float32).reshape(n, 2)
+
+        # مع الـ homography المواقع بتتخزن بالمتر مباشرة
+        if self.ground is not None:
+            centers = self.ground.to_meters(centers)
+            ppm = 1.0
+        else:
+            ppm = self.ppm
+
+        # حفظ الموقع والوقت في الـ ring buffer
+        head = self.count[idx] % self.history
+        self.pos[idx, head] = centers
+        self.time[idx, head] = t
+        self.count[idx] += 1
+
         # نحتاج على الأقل موقعين لحساب السرعة
-        if len(self.positions[tid]) < 2:
-            return None
-        
-        # حساب السرعة بين آخر نقطتين
-        p1 = np.array(self.positions[tid][-2])
-        p2 = np.array(self.positions[tid][-1])
-        
-        t1 = self.timestamps[tid][-2]
-        t2 = self.timestamps[tid][-1]
-        
-        # المسافة بالبكسل
-        distance_pixels = np.linalg.norm(p2 - p1)
-        
-        # الوقت بالثواني
-        time_seconds = (t2 - t1) / self.fps
-        
-        if time_seconds == 0:
-            return None
-        
-        # السرعة = المسافة / الوقت
-        # تحويل من بكسل/ثانية إلى متر/ثانية ثم كم/ساعة
-        distance_meters = distance_pixels / self.ppm
-        speed_ms = distance_meters / time_seconds
-        speed_kmh = speed_ms * 3.6
-        
-        # فلترة السرعات الغير منطقية
-        if 0 < speed_kmh < 250:
-            self.speeds[tid].append(speed_kmh)
-            # متوسط السرعات الأخيرة لتقليل الضوضاء
-            return float(np.mean(self.speeds[tid]))
-        
-        return None
-    
+        lag = np.minimum(self.count[idx] - 1, self.interval)
+        ready = lag > 0
+        prev = (head - lag) % self.history
+
+        distance_pixels = np.linalg.norm(centers - self.pos[idx, prev], axis=1)
+        time_seconds = t - self.time[idx, prev]
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            # تحويل من بكسل/ثانية إلى متر/ثانية ثم كم/ساعة
+            speed_kmh = distance_pixels / ppm / time_seconds * 3.6
+
+        valid = ready & (time_seconds > 0) & (speed_kmh > 0) & (speed_kmh < self.MAX_KMH)
+
+        out = np.full(n, np.nan, dtype=np.float32)
+        if not valid.any():
+            return out
+
+        vi = idx[valid]
+        shead = self.spd_count[vi] % self.smooth
+        self.spd[vi, shead] = speed_kmh[valid]
+        self.spd_count[vi] += 1
+        self.spd_max[vi] = np.maximum(self.spd_max[vi], speed_kmh[valid])
+
+        # متوسط السرعات الأخيرة لتقليل الضوضاء
+        filled = np.minimum(self.spd_count[vi], self.smooth)
+        mask = np.arange(self.smooth)[None, :] < filled[:, None]
+        out[valid] = (self.spd[vi] * mask).sum(axis=1) / filled
+        return out
+
+    def update(self, tid, center, t=None):
+        """
+        تحديث سيارة واحدة (متوافق مع الاستخدام القديم)
+        لو t مش متبعت بنعتبر كل استدعاء frame واحد
+        """
+        if t is None:
+            s = self.slots.get(tid)
+            t = (self.count[s] if s is not None else 0) / self.fps
+        speed = self.update_many([tid], [center], t)[0]
+        return None if np.isnan(speed) else float(speed)
+
     def get_average_speed(self, tid):
         """الحصول على متوسط السرعة لسيارة معينة"""
-        if tid in self.speeds and len(self.speeds[tid]) > 0:
-            return float(np.mean(self.speeds[tid]))
-        return None
-    
+        s = self.slots.get(tid)
+        if s is None or self.spd_count[s] == 0:
+            return None
+        filled = min(self.spd_count[s], self.smooth)
+        return float(self.spd[s, :filled].mean())
+
     def get_max_speed(self, tid):
         """الحصول على أقصى سرعة لسيارة معينة"""
-        if tid in self.speeds and len(self.speeds[tid]) > 0:
-            return float(np.max(self.speeds[tid]))
-        return None
-    
+        s = self.slots.get(tid)
+        if s is None or self.spd_count[s] == 0:
+            return None
+        return float(self.spd_max[s])
+
     def reset(self, tid):
         """إعادة تعيين بيانات سيارة معينة"""
-        if tid in self.positions:
-            del self.positions[tid]
-            del self.timestamps[tid]
-            del self.speeds[tid]
-            del self.frame_count[tid]
\ No newline at end of file
+        s = self.slots.pop(tid, None)
+        if s is not None:
+            self.free.append(s)
@@ -0,0 +1,102 @@
+"""
+رفع الفيديوهات بـ chunks بدون ما نوقف الـ event loop،
+مع حد أقصى للحجم و sha256، وإمكانية المعالجة أثناء الرفع
+"""
+import hashlib
+import threading
+from starlette.concurrency import run_in_threadpool
+from config import SystemConfig
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+class UploadState:
+    """حالة ملف بيترفع - مشتركة بين الرفع (event loop) والمعالجة (thread)"""
+    def __init__(self):
+        self.bytes = 0
+        self.done = False
+        self.error = None
+        self.cond = threading.Condition()
+
+    def add(self, n):
+        with self.cond:
+            self.bytes += n
+            self.cond.notify_all()
+
+    def finish(self, error=None):
+        with self.cond:
+            self.done = True
+            self.error = error
+            self.cond.notify_all()
+
+    def wait_for_more(self, seen, timeout=1.0):
+        """
+        استنى لحد ما توصل bytes أكتر من seen أو الرفع يخلص
+        بترجع True لو في bytes جديدة
+        """
+        with self.cond:
+            while self.bytes <= seen and not self.done:
+                self.cond.wait(timeout)
+            if self.error:
+                raise RuntimeError(f"upload failed: {self.error}")
+            return self.bytes > seen
+
+
+def is_progressive(filename):
+    """الصيغ اللي ينفع نقراها وهي لسه بتترفع (من غير index في آخر الملف)"""
+    return filename.lower().endswith(SystemConfig.UPLOAD_PROGRESSIVE_FORMATS)
+
+
+async def iter_upload(file, chunk_size=None):
+    """قراءة UploadFile على chunks"""
+    chunk_size = chunk_size or SystemConfig.UPLOAD_CHUNK_SIZE
+    while True:
+        data = await file.read(chunk_size)
+        if not data:
+            break
+        yield data
+
+
+def _write(f, sha, chunk):
+    sha.update(chunk)
+    f.write(chunk)
+    f.flush()
+
+
+async def receive(chunks, path, state=None, max_bytes=None, on_ready=None):
+    """
+    كتابة chunks (async iterator) في الملف من غير ما نوقف الـ event loop
+    state: UploadState للمعالجة أثناء الرفع
+    on_ready: بتتنادي مرة واحدة لما يوصل UPLOAD_PROGRESSIVE_MIN_BYTES
+    بترجع (الحجم, sha256)
+    """
+    max_bytes = max_bytes or SystemConfig.UPLOAD_MAX_BYTES
+    sha = hashlib.sha256()
+    size = 0
+    ready = on_ready is None
+
+    try:
+        with open(path, "wb") as f:
+            async for chunk in chunks:
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLarge(f"upload exceeds {max_bytes} bytes")
+
+                await run_in_threadpool(_write, f, sha, chunk)
+                if state is not None:
+                    state.add(len(chunk))
+
+                if not ready and size >= SystemConfig.UPLOAD_PROGRESSIVE_MIN_BYTES:
+                    ready = True
+                    on_ready()
+    except Exception as e:
+        if state is not None:
+            state.finish(error=str(e))
+        raise
+
+    # ملف أصغر من الحد: المعالجة تبدأ بعد ما الرفع يخلص
+    if not ready:
+        on_ready()
+    return size, sha.hexdigest()
@@ -1,18 +1,30 @@
-from ultralytics import YOLO
+from detection.backends import load_yolo, predict_batch, select_device
+from config import SystemConfig
 import numpy as np
 
 class VehicleDetector:
     CLASSES = [2, 3, 5, 7]
 
-    def __init__(self, model, conf):
-        self.model = YOLO(model)
+    def __init__(self, model, conf, backend=None, imgsz=None):
+        self.imgsz = imgsz or SystemConfig.INFERENCE_IMGSZ
+        self.backend = backend or SystemConfig.INFERENCE_BACKEND
+        self.model = load_yolo(model, self.backend, self.imgsz)
         self.conf = conf
+        self.device = select_device()
+
+    def reset(self):
+        """مسح حالة الـ tracker (ByteTrack) قبل فيديو جديد بنفس الموديل"""
+        predictor = self.model.predictor
+        for tracker in getattr(predictor, "trackers", None) or []:
+            tracker.reset()
 
     def detect(self, frame):
         res = self.model.track(
             frame,
             persist=True,
             conf=self.conf,
+            imgsz=self.imgsz,
+            device=self.device,
             classes=self.CLASSES,
             tracker="bytetrack.yaml",
             verbose=False
@@ -30,3 +42,30 @@ class VehicleDetector:
                     "center": ((box[0]+box[2])/2, (box[1]+box[3])/2)
                 })
         return vehicles
+
+    def detect_batch(self, frames):
+        """
+        كشف من غير tracking على مجموعة صور ثابتة
+        list لكل صورة: {"track_id": None, "bbox", "center", "conf"}
+        """
+        results = predict_batch(
+            self.model, frames, self.backend,
+            conf=self.conf,
+            imgsz=self.imgsz,
+            device=self.device,
+            classes=self.CLASSES
+        )
+
+        out = []
+        for r in results:
+            vehicles = []
+            if r.boxes:
+                for box, conf in zip(r.boxes.xyxy.cpu().numpy(), r.boxes.conf.cpu().numpy()):
+                    vehicles.append({
+                        "track_id": None,
+                        "bbox": tuple(box),
+                        "center": ((box[0]+box[2])/2, (box[1]+box[3])/2),
+                        "conf": float(conf)
+                    })
+            out.append(vehicles)
+        return out
@@ -1,19 +1,38 @@
 from config import SystemConfig
 from detection.vehicle_detector import VehicleDetector
-from detection.plate_detector import PlateDetector
+from detection.plate_detector import PlateDetector, assign_plates
+from detection.propagation import TrackPropagator
 from ocr.reader import OCREngine
 from ocr.voting import PlateVoting
 from speed.tracker import SpeedTracker
 from alerts.watchlist import WatchlistManager
+from core.roi import RegionOfInterest
+from core.frames import FramePreprocessor
+from speed.ground_plane import GroundPlane
+from ocr.quality import PlateQuality, VehicleQuality, BestShotBuffer
+from core import metrics
+from core.events import BUS
+from core.sightings import LAST_SEEN
 import cv2
+import heapq
+import numpy as np
 from datetime import datetime
 from pathlib import Path
 
 class VehicleProcessor:
-    def __init__(self, db):
+    def __init__(self, db, camera_id=None, task_id=None, models=None):
+        """
+        models: (vdet, pdet, ocr) من load_models عشان نعيد استخدامها بين الفيديوهات
+        (processor واحد بس يستخدمها في نفس الوقت)
+        """
         self.db = db
+        self.task_id = task_id
+        self.camera_id = camera_id
+        self.evidence_dir = SystemConfig.EVIDENCE_DIR
         self.states = {}
         self.frame_counter = 0
+        self.roi = RegionOfInterest.for_camera(camera_id)
+        self.prep = FramePreprocessor()
 
         # OCR metrics
         self.ocr_attempts = 0
@@ -24,20 +43,55 @@ class VehicleProcessor:
         self.total_vehicles = 0
         self.speeding_vehicles = 0
 
-        self.vdet = VehicleDetector(SystemConfig.VEHICLE_MODEL, SystemConfig.VEHICLE_CONF)
-        self.pdet = PlateDetector(SystemConfig.PLATE_MODEL, SystemConfig.PLATE_CONF)
-        self.ocr = OCREngine()
+        if models is None:
+            models = self.load_models()
+        else:
+            models[0].reset()
+            models[2].cache.clear()
+        self.vdet, self.pdet, self.ocr = models
+
+        # وضع "propagate": كل الإطارات بتتعالج والكاشف كل K إطار بس
+        self.propagator = None
+        if SystemConfig.DETECT_MODE == "propagate":
+            self.propagator = TrackPropagator(self.vdet)
+        self.scale = 1.0  # معالجة / أصلي لآخر إطار (للرسم على الإطار الأصلي)
+
+        # كاش الـ tracks (core.track_cache) - VideoProcessor بيحدد ده ولا ده
+        self.recorder = None
+        self.replay = None
+
+        # two-pass: dict بالسيارات اللي لوحتها مستنية المرحلة التانية (None = وضع عادي)
+        self.deferred = None
         self.vote = PlateVoting(SystemConfig.OCR_VOTING_WINDOW)
-        self.speed = SpeedTracker(SystemConfig.SPEED_PPM, SystemConfig.SPEED_FPS)
+        self.speed = SpeedTracker(
+            SystemConfig.SPEED_PPM,
+            SystemConfig.SPEED_FPS,
+            interval=SystemConfig.SPEED_CALC_INTERVAL,
+            ground=GroundPlane.for_camera(camera_id)
+        )
         self.watch = WatchlistManager(db, SystemConfig.WATCHLIST_THRESHOLD)
-    
+        self.shots = BestShotBuffer(
+            SystemConfig.OCR_QUALITY_TOP_K,
+            SystemConfig.OCR_QUALITY_MARGIN,
+            SystemConfig.OCR_QUALITY_MIN_SCORE,
+            SystemConfig.OCR_QUALITY_RETRY_EVERY
+        )
+
+    @staticmethod
+    def load_models():
+        return (
+            VehicleDetector(SystemConfig.VEHICLE_MODEL, SystemConfig.VEHICLE_CONF),
+            PlateDetector(SystemConfig.PLATE_MODEL, SystemConfig.PLATE_CONF),
+            OCREngine()
+        )
+
     def save_evidence(self, vid, frame, plate_crop):
         if not SystemConfig.SAVE_EVIDENCE:
             return None
             
         date = datetime.now().strftime("%Y-%m-%d")
         base_dir = (
-            SystemConfig.EVIDENCE_DIR
+            self.evidence_dir
             / date
             / f"vehicle_{vid}"
         )
@@ -59,30 +113,105 @@ class VehicleProcessor:
         )
         return str(base_dir)
 
-    def resize_frame(self, frame):
-        """تصغير الإطار للمعالجة الأسرع"""
-        h, w = frame.shape[:2]
-        if w > SystemConfig.PROCESS_WIDTH:
-            scale = SystemConfig.PROCESS_WIDTH / w
-            new_w = SystemConfig.PROCESS_WIDTH
-            new_h = int(h * scale)
-            return cv2.resize(frame, (new_w, new_h))
-        return frame
-
-    def process(self, frame):
+    def record_sighting(self, vid, plate, conf, consensus):
+        """تسجيل ظهور اللوحة في الـ DB وتحديث كاش آخر ظهور"""
+        key, seen_at = self.db.add_sighting(
+            plate, vid, self.camera_id, self.task_id, round(conf, 3), consensus
+        )
+        LAST_SEEN.put(key, {
+            "seen_at": seen_at,
+            "camera_id": self.camera_id,
+            "task_id": self.task_id,
+            "vehicle_id": vid
+        })
+
+    def detect_frame_plates(self, prepared, vehicles):
+        """كشف اللوحات مرة واحدة على الإطار كله (أو الـ ROI) وربطها بالـ tracks"""
+        plates = self.pdet.detect_all(prepared.region)
+        plates[:, :4] = prepared.region_to_process(plates[:, :4])
+        boxes = np.array([v["bbox"] for v in vehicles], dtype=np.float32)
+        assigned = assign_plates(plates, boxes, SystemConfig.PLATE_ASSIGN_MIN_OVERLAP)
+        return {vehicles[i]["track_id"]: box for i, box in assigned.items()}
+
+    def locate_plate(self, prepared, v, frame_plates=None):
+        """إرجاع (crop اللوحة, ثقة الكاشف) للسيارة (أو None) - views من الإطار الأصلي"""
+        if frame_plates is not None:
+            box = frame_plates.get(v["track_id"])
+            if box is None:
+                return None
+            return prepared.crop(box), float(box[4])
+
+        crop = prepared.crop(v["bbox"])
+
+        found = self.pdet.detect(crop, with_conf=True)
+        if found is None:
+            return None
+
+        box, conf = found
+        px1, py1, px2, py2 = map(int, box)
+        return crop[py1:py2, px1:px2], conf
+
+    def set_fps(self, fps):
+        """استخدام FPS الفيديو الحقيقي بدل SPEED_FPS"""
+        if fps and fps > 0:
+            self.speed.fps = fps
+
+    def process(self, frame, timestamp=None):
+        """
+        timestamp: وقت الإطار بالثواني من الفيديو (اختياري)
+        لو مش متبعت الوقت بيتحسب من رقم الإطار الحقيقي / FPS
+        """
         self.frame_counter += 1
         
-        # Skip frames للسرعة
-        if self.frame_counter % SystemConfig.PROCESS_EVERY_N_FRAMES != 0:
+        # Skip frames للسرعة (في وضع propagate مفيش إطارات بتترمي)
+        if self.propagator is None and self.frame_counter % SystemConfig.PROCESS_EVERY_N_FRAMES != 0:
+            metrics.FRAMES.inc(1, "skipped")
             return
+        metrics.FRAMES.inc(1, "processed")
         
-        # تصغير للمعالجة الأسرع
-        if SystemConfig.PROCESS_WIDTH < frame.shape[1]:
-            frame = self.resize_frame(frame)
+        # resize واحد من الإطار الأصلي (أو الـ ROI) لمقاس input الموديل في buffer ثابت
+        # الإحداثيات بعد كده في مساحة إطار المعالجة (PROCESS_WIDTH)
+        with metrics.stage("resize"):
+            prepared = self.prep.prepare(frame, self.roi, detect=self.replay is None)
+        self.scale = prepared.scale
         
-        vehicles = self.vdet.detect(frame)
+        # الكشف على منطقة الاهتمام بس
+        if self.replay is not None:
+            with metrics.stage("track_replay"):
+                vehicles = self.replay.get(self.frame_counter)
+        else:
+            if self.propagator is None:
+                stage, detector = "vehicle_detect", self.vdet
+            else:
+                stage = "vehicle_detect" if self.propagator.due() else "propagate"
+                detector = self.propagator
+            with metrics.stage(stage):
+                vehicles = prepared.map_vehicles(detector.detect(prepared.detect))
+            if self.recorder is not None:
+                self.recorder.add(self.frame_counter, vehicles)
+        if self.roi is not None:
+            vehicles = self.roi.filter(vehicles)
+
+        # حساب السرعة لكل السيارات مرة واحدة
+        with metrics.stage("speed"):
+            if self.speed.ground is not None:
+                self.speed.ground.bind(prepared.shape)
+            t = timestamp if timestamp is not None else self.frame_counter / self.speed.fps
+            if self.speed.ground is not None:
+                # الـ homography للأرض: نقطة التلامس (منتصف أسفل الصندوق) مش المركز
+                points = [((v["bbox"][0] + v["bbox"][2]) / 2, v["bbox"][3]) for v in vehicles]
+            else:
+                points = [v["center"] for v in vehicles]
+            speeds = self.speed.update_many(
+                [v["track_id"] for v in vehicles],
+                points,
+                t
+            )
+
+        # في وضع "frame" بنكشف اللوحات مرة واحدة أول ما سيارة تحتاج OCR
+        frame_plates = None
 
-        for v in vehicles:
+        for i, v in enumerate(vehicles):
             tid = v["track_id"]
 
             if tid not in self.states:
@@ -92,19 +221,31 @@ class VehicleProcessor:
                     "frames": 0,
                     "plate_final": False,
                     "max_speed": 0,
-                    "speeds": []
+                    "speeds": [],
+                    "ocr_calls": 0
                 }
                 self.total_vehicles += 1
+                metrics.ACTIVE_TRACKS.inc()
 
             state = self.states[tid]
+            state["last_seen"] = self.frame_counter
+            state["last_bbox"] = v["bbox"]
+            if not np.isnan(speeds[i]):
+                state["last_speed"] = round(float(speeds[i]), 1)
+
+            # الصناديق المتوقعة (optical flow) للسرعة والرسم بس،
+            # والعدّ وحفظ السرعة واللوحات على إطارات الكشف
+            if not v.get("detected", True):
+                continue
+
             state["frames"] += 1
             vid = state["vid"]
 
-            # حساب السرعة
+            # تحديث السرعة كل SPEED_CALC_INTERVAL
             if state["frames"] % SystemConfig.SPEED_CALC_INTERVAL == 0:
-                speed = self.speed.update(tid, v["center"])
+                speed = float(speeds[i])
                 
-                if speed and speed > SystemConfig.SPEED_MIN_THRESHOLD:
+                if speed > SystemConfig.SPEED_MIN_THRESHOLD:
                     state["speeds"].append(speed)
                     state["max_speed"] = max(state["max_speed"], speed)
                     
@@ -123,75 +264,285 @@ class VehicleProcessor:
             if state["frames"] < SystemConfig.OCR_STABLE_FRAMES:
                 continue
 
-            x1, y1, x2, y2 = map(int, v["bbox"])
-            crop = frame[y1:y2, x1:x2]
+            # two-pass: المرحلة الأولى بتسجل أحسن إطارات السيارة بس، من غير لوحات ولا OCR
+            if self.deferred is not None:
+                with metrics.stage("shot_score"):
+                    self.note_shot(state, prepared, v["bbox"])
+                continue
+
+            with metrics.stage("plate_detect"):
+                if SystemConfig.PLATE_DETECT_MODE == "frame" and frame_plates is None:
+                    frame_plates = self.detect_frame_plates(prepared, vehicles)
 
-            box = self.pdet.detect(crop)
-            if box is None:
+                found = self.locate_plate(prepared, v, frame_plates)
+            if found is None:
                 continue
 
-            px1, py1, px2, py2 = map(int, box)
-            plate_crop = crop[py1:py2, px1:px2]
+            # الـ crop من الأصلي، والحد الأدنى بمقاس إطار المعالجة زي الأول
+            plate_crop, plate_conf = found
+            ph, pw = plate_crop.shape[:2]
+            if pw * prepared.scale < SystemConfig.OCR_MIN_W or ph * prepared.scale < SystemConfig.OCR_MIN_H:
+                continue
 
-            if plate_crop.shape[1] < SystemConfig.OCR_MIN_W:
+            # OCR على أفضل اللقطات بس (تجاهل الـ blur والزوايا السيئة)
+            with metrics.stage("plate_quality"):
+                score = PlateQuality.score(plate_crop, plate_conf)
+                shot = self.shots.add(tid, plate_crop, score)
+            if shot is None:
                 continue
 
             self.ocr_attempts += 1
-            results = self.ocr.read(plate_crop)
-
-            for text, conf in results:
-                self.ocr_valid_reads += 1
-                self.vote.add(vid, text, conf)
+            state["ocr_calls"] += 1
+            metrics.OCR_CALLS.inc()
+            with metrics.stage("ocr"):
+                results = self.ocr.read(shot, tid)
 
-                self.db.add_ocr_timeline(
-                    vehicle_id=vid,
-                    frame=state["frames"],
-                    text=text,
-                    confidence=round(conf, 3)
-                )
+            with metrics.stage("voting"):
+                for text, conf in results:
+                    self.ocr_valid_reads += 1
+                    self.vote.add(vid, text, conf)
+                consensus = self.vote.consensus(vid)
 
-            consensus = self.vote.consensus(vid)
+            with metrics.stage("db_write"):
+                for text, conf in results:
+                    self.db.add_ocr_timeline(
+                        vehicle_id=vid,
+                        frame=state["frames"],
+                        text=text,
+                        confidence=round(conf, 3)
+                    )
             if consensus:
-                plate, conf = consensus
                 self.ocr_consensus += 1
-                state["plate_final"] = True
-                
-                evidence_path = self.save_evidence(
-                    vid=vid,
-                    frame=frame,
-                    plate_crop=plate_crop
+                self.confirm_plate(
+                    tid, state, consensus[0], consensus[1],
+                    prepared.process_frame(), self.shots.best(tid)
                 )
+            else:
+                # من غير كده الـ track مش هيتقري تاني طول ما الجودة ثابتة ومش هيوصل لـ consensus
+                self.shots.miss(tid)
 
-                self.db.update_plate(vid, plate)
-                
-                if evidence_path:
-                    self.db.c.execute(
-                        "UPDATE vehicles SET evidence_path=? WHERE id=?",
-                        (evidence_path, vid)
-                    )
-                    self.db.commit()
+        self.evict_lost_tracks()
 
-                # Watchlist check
-                alert = self.watch.check(plate)
-                if alert:
-                    self.db.add_alert(
-                        vehicle_id=vid,
-                        plate=plate,
-                        watchlist_plate=alert["plate"],
-                        reason=alert["reason"],
-                        similarity=round(alert["similarity"], 3),
-                        evidence_path=evidence_path or ""
-                    )
+    def confirm_plate(self, tid, state, plate, conf, frame, plate_crop):
+        """
+        اعتماد لوحة السيارة بعد consensus: الأدلة + الـ DB + الـ watchlist + المخالفة
+        frame: الإطار بمقاس المعالجة (للأدلة)
+        """
+        vid = state["vid"]
+        state["plate_final"] = True
+        state["final_plate"] = plate
 
-                # Speed violation - تسجيل المخالفة عند اكتمال القراءة
-                if state.get("is_speeding") and state["max_speed"] > SystemConfig.SPEED_LIMIT:
-                    self.db.add_violation(
-                        vehicle_id=vid,
-                        plate=plate,
-                        speed=round(state["max_speed"], 2),
-                        speed_limit=SystemConfig.SPEED_LIMIT
-                    )
-                    self.speeding_vehicles += 1
+        evidence_path = self.save_evidence(
+            vid=vid,
+            frame=frame,
+            plate_crop=plate_crop
+        )
+
+        self.db.update_plate(vid, plate)
+        self.record_sighting(vid, plate, conf, True)
+        BUS.publish(
+            "plate",
+            task_id=self.task_id,
+            vehicle_id=vid,
+            track_id=tid,
+            plate=plate,
+            confidence=round(conf, 3),
+            consensus=True
+        )
+        
+        if evidence_path:
+            self.db.c.execute(
+                "UPDATE vehicles SET evidence_path=? WHERE id=?",
+                (evidence_path, vid)
+            )
+            self.db.commit()
+
+        # Watchlist check
+        alert = self.watch.check(plate)
+        if alert:
+            self.db.add_alert(
+                vehicle_id=vid,
+                plate=plate,
+                watchlist_plate=alert["plate"],
+                reason=alert["reason"],
+                similarity=round(alert["similarity"], 3),
+                evidence_path=evidence_path or ""
+            )
+            BUS.publish(
+                "alert",
+                task_id=self.task_id,
+                vehicle_id=vid,
+                plate=plate,
+                watchlist_plate=alert["plate"],
+                reason=alert["reason"],
+                similarity=round(alert["similarity"], 3),
+                evidence_path=evidence_path or ""
+            )
+
+        # Speed violation - تسجيل المخالفة عند اكتمال القراءة
+        if state.get("is_speeding") and state["max_speed"] > SystemConfig.SPEED_LIMIT:
+            self.db.add_violation(
+                vehicle_id=vid,
+                plate=plate,
+                speed=round(state["max_speed"], 2),
+                speed_limit=SystemConfig.SPEED_LIMIT
+            )
+            self.speeding_vehicles += 1
+            BUS.publish(
+                "violation",
+                task_id=self.task_id,
+                vehicle_id=vid,
+                plate=plate,
+                speed=round(state["max_speed"], 2),
+                speed_limit=SystemConfig.SPEED_LIMIT
+            )
+
+    def note_shot(self, state, prepared, bbox):
+        """حفظ أحسن TWO_PASS_TOP_FRAMES إطار للسيارة: (score, رقم الإطار, الصندوق)"""
+        score = VehicleQuality.score(prepared.crop(bbox), bbox, prepared.shape)
+        shots = state.setdefault("shots", [])
+        item = (score, self.frame_counter, tuple(float(c) for c in bbox))
+        if len(shots) < SystemConfig.TWO_PASS_TOP_FRAMES:
+            heapq.heappush(shots, item)
+        elif score > shots[0][0]:
+            heapq.heapreplace(shots, item)
+
+    def plan_deferred(self):
+        """
+        المرحلة التانية: [(رقم الإطار, tid, الصندوق)] مترتبة بالإطار
+        + آخر إطار لكل سيارة (عشان نقفلها أول ما نخلص)
+        """
+        jobs = []
+        last = {}
+        for tid, state in self.deferred.items():
+            for _, frame_no, bbox in state.get("shots", []):
+                jobs.append((frame_no, tid, bbox))
+                last[tid] = max(last.get(tid, 0), frame_no)
+        jobs.sort()
+        return jobs, last
+
+    def read_deferred(self, prepared, tid, bbox, frame_no):
+        """المرحلة التانية: كشف اللوحة + OCR على واحد من أحسن إطارات السيارة"""
+        state = self.deferred[tid]
+        vid = state["vid"]
+
+        with metrics.stage("plate_detect"):
+            found = self.locate_plate(prepared, {"track_id": tid, "bbox": bbox})
+        if found is None:
+            return
+        plate_crop, plate_conf = found
+        ph, pw = plate_crop.shape[:2]
+        if pw * prepared.scale < SystemConfig.OCR_MIN_W or ph * prepared.scale < SystemConfig.OCR_MIN_H:
+            return
+
+        # أحسن لقطة للأدلة (نسخة - الإطار بيتعاد استخدامه في الـ decode)
+        score = PlateQuality.score(plate_crop, plate_conf)
+        if score > state.get("best_score", -1.0):
+            state["best_score"] = score
+            state["best_shot"] = (plate_crop.copy(), prepared.process_frame().copy())
+
+        self.ocr_attempts += 1
+        state["ocr_calls"] += 1
+        metrics.OCR_CALLS.inc()
+        with metrics.stage("ocr"):
+            results = self.ocr.read(plate_crop, tid)
+
+        for text, conf in results:
+            self.ocr_valid_reads += 1
+            self.vote.add(vid, text, conf)
+            self.db.add_ocr_timeline(
+                vehicle_id=vid,
+                frame=frame_no,
+                text=text,
+                confidence=round(conf, 3)
+            )
+
+    def finish_deferred(self, tid):
+        """
+        قفل السيارة في المرحلة التانية: الـ consensus بس بيتعامل كلوحة نهائية
+        (أدلة + watchlist + مخالفة)، وإلا أحسن قراءة بتتسجل زي finalize_track
+        """
+        state = self.deferred.pop(tid, None)
+        if state is None:
+            return
+        vid = state["vid"]
+        metrics.OCR_CALLS_PER_VEHICLE.observe(state["ocr_calls"])
+
+        consensus = self.vote.consensus(vid)
+        if consensus and "best_shot" in state:
+            self.ocr_consensus += 1
+            plate_crop, frame = state["best_shot"]
+            self.confirm_plate(tid, state, consensus[0], consensus[1], frame, plate_crop)
+        else:
+            best = self.vote.best(vid)
+            if best:
+                self.record_best_guess(tid, vid, best)
+
+        self.vote.reset(vid)
+        self.ocr.cache.drop(tid)
+
+    def evict_lost_tracks(self):
+        """قفل السيارات اللي اختفت من الكادر عشان الذاكرة متكبرش على الـ streams الطويلة"""
+        step = SystemConfig.PROCESS_EVERY_N_FRAMES if self.propagator is None else SystemConfig.DETECT_EVERY_K
+        max_age = SystemConfig.TRACK_LOST_FRAMES * step
+        lost = [
+            tid for tid, state in self.states.items()
+            if self.frame_counter - state["last_seen"] > max_age
+        ]
+        for tid in lost:
+            self.finalize_track(tid)
+
+    def finalize_track(self, tid):
+        """حفظ السرعة النهائية وأفضل لوحة ثم حذف الـ track من كل الـ structures"""
+        state = self.states.pop(tid, None)
+        if state is None:
+            return
+        vid = state["vid"]
+        metrics.ACTIVE_TRACKS.dec()
+
+        if state["speeds"]:
+            avg_speed = sum(state["speeds"]) / len(state["speeds"])
+            self.db.update_speed(vid, state["max_speed"], avg_speed)
+
+        # two-pass: اللوحة بتتقري في المرحلة التانية
+        if self.deferred is not None:
+            self.deferred[tid] = state
+            self.speed.reset(tid)
+            return
+
+        metrics.OCR_CALLS_PER_VEHICLE.observe(state["ocr_calls"])
+
+        if not state["plate_final"]:
+            best = self.vote.best(vid)
+            if best:
+                self.record_best_guess(tid, vid, best)
+
+        self.speed.reset(tid)
+        self.vote.reset(vid)
+        self.shots.drop(tid)
+        self.ocr.cache.drop(tid)
+
+    def record_best_guess(self, tid, vid, best):
+        """
+        أحسن قراءة من غير consensus: اللوحة + الظهور بس
+        (مفيش watchlist alert ولا مخالفة على قراءة مش مؤكدة)
+        """
+        self.db.update_plate(vid, best[0])
+        self.record_sighting(vid, best[0], best[1], False)
+        BUS.publish(
+            "plate",
+            task_id=self.task_id,
+            vehicle_id=vid,
+            track_id=tid,
+            plate=best[0],
+            confidence=round(best[1], 3),
+            consensus=False
+        )
+
+    def finalize_all(self):
+        """قفل كل السيارات المفتوحة (نهاية الفيديو)"""
+        for tid in list(self.states):
+            self.finalize_track(tid)
 
     def get_ocr_metrics(self):
         acc = (self.ocr_consensus / self.ocr_attempts) if self.ocr_attempts else 0
@@ -199,7 +550,9 @@ class VehicleProcessor:
             "attempts": self.ocr_attempts,
             "valid_reads": self.ocr_valid_reads,
             "consensus": self.ocr_consensus,
-            "accuracy_percent": round(acc * 100, 2)
+            "accuracy_percent": round(acc * 100, 2),
+            "cache_hits": self.ocr.cache.hits,
+            "cache_hit_rate_percent": round(self.ocr.cache.hit_rate() * 100, 2)
         }
     
     def get_speed_metrics(self):
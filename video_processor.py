@@ -1,26 +1,200 @@
+import itertools
+from array import array
 import cv2
+from config import SystemConfig
 from core.vehicle_processor import VehicleProcessor
+from core import metrics
+from core.events import BUS
+from core.track_cache import TrackRecorder, TrackReplay, cache_key
+
+def seek_to(cap, msec, frame_ms):
+    """
+    seek مضبوط لإطار بوقته: seek لقبله بـ SEEK_BACK_MS وبعدين grab لقدام
+    بترجع True لو آخر grab هو الإطار اللي وقته msec (ينفع retrieve أو read للي بعده)
+    """
+    tol = frame_ms / 2
+    back = SystemConfig.SEEK_BACK_MS
+    for _ in range(2):
+        cap.set(cv2.CAP_PROP_POS_MSEC, max(0.0, msec - back))
+        while cap.grab():
+            pos = cap.get(cv2.CAP_PROP_POS_MSEC)
+            if pos >= msec - tol:
+                if abs(pos - msec) <= tol:
+                    return True
+                # الـ seek وقع بعد الإطار: نرجع أبعد مرة كمان
+                break
+        else:
+            return False
+        back *= 4
+    return False
+
 
 class VideoProcessor:
-    def __init__(self, db):
-        self.proc = VehicleProcessor(db)
+    def __init__(self, db, camera_id=None, task_id=None, models=None):
+        self.proc = VehicleProcessor(db, camera_id, task_id, models)
+        self.task_id = task_id
+        self.camera_id = camera_id
+        self.frame_times = None  # two-pass بس
 
-    def process_video(self, path):
+    def process_video(self, path, upload=None):
+        """
+        upload: UploadState لو الملف لسه بيترفع - لما القراءة توصل لآخر الموجود
+        بنستنى bytes جديدة ونفتح الملف تاني من نفس الإطار
+        """
+        # كاش الـ tracks (مش للملفات اللي لسه بتترفع)
+        if SystemConfig.DETECTION_CACHE and upload is None:
+            base = SystemConfig.DETECTION_CACHE_DIR / cache_key(path, self.camera_id)
+            if TrackReplay.exists(base):
+                self.proc.replay = TrackReplay(base)
+            else:
+                self.proc.recorder = TrackRecorder(base)
+
+        # two-pass: التتبع الأول على الفيديو كله، وبعدين OCR على أحسن إطارات كل سيارة بس
+        two_pass = SystemConfig.OFFLINE_MODE == "two_pass" and upload is None
+        if two_pass:
+            self.proc.deferred = {}
+            # وقت كل إطار (POS_MSEC) عشان المرحلة التانية تتأكد إنها وصلت للإطار الصح
+            self.frame_times = array("d")
+
+        size_at_open = upload.bytes if upload is not None else 0
         cap = cv2.VideoCapture(path)
+        self.proc.set_fps(cap.get(cv2.CAP_PROP_FPS))
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
         frame_count = 0
+        frame = None
+        last_msec = None
 
         while cap.isOpened():
-            ret, frame = cap.read()
+            # إعادة استخدام نفس الـ buffer للـ decode
+            with metrics.stage("decode"):
+                ret, frame = cap.read(frame)
             if not ret:
-                break
+                if upload is None or not upload.wait_for_more(size_at_open, SystemConfig.UPLOAD_POLL_SECONDS):
+                    break
+                size_at_open = upload.bytes
+                cap.release()
+                cap = self.reopen(path, last_msec, frame_count)
+                total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+                continue
 
-            self.proc.process(frame)
+            last_msec = cap.get(cv2.CAP_PROP_POS_MSEC)
+            if two_pass:
+                self.frame_times.append(last_msec)
+            timestamp = None
+            if SystemConfig.SPEED_USE_CONTAINER_TIMESTAMPS:
+                timestamp = last_msec / 1000.0
+
+            self.proc.process(frame, timestamp)
             frame_count += 1
 
             if frame_count % 50 == 0:
-                self.proc.db.commit()
+                metrics.timed_commit(self.proc.db)
+
+            if frame_count % SystemConfig.EVENTS_PROGRESS_EVERY == 0:
+                BUS.publish(
+                    "progress",
+                    task_id=self.task_id,
+                    frame=frame_count,
+                    total_frames=total_frames,
+                    percent=round(frame_count / total_frames * 100, 1) if total_frames > 0 else None,
+                    active_tracks=len(self.proc.states)
+                )
 
         cap.release()
-        self.proc.db.commit()
+        self.proc.finalize_all()
+        if two_pass:
+            self.read_best_frames(path)
+        metrics.timed_commit(self.proc.db)
+        if self.proc.recorder is not None:
+            self.proc.recorder.save(self.proc.frame_counter)
         return {"status": "done"}
 
+    def reopen(self, path, last_msec, frame_count):
+        """
+        فتح الملف تاني بعد ما كبر والوقوف بعد آخر إطار اتعالج بالظبط
+        (CAP_PROP_POS_FRAMES تقريبي في .ts / .mkv فبيكرر أو بيفوّت إطارات)
+        """
+        cap = cv2.VideoCapture(path)
+        if frame_count == 0:
+            return cap
+        frame_ms = 1000.0 / self.proc.speed.fps
+        if last_msec is not None and seek_to(cap, last_msec, frame_ms):
+            return cap
+
+        # مفيش timestamps نعتمد عليها: من الأول بالعدّ (أبطأ بس مضبوط)
+        cap.release()
+        cap = cv2.VideoCapture(path)
+        for _ in range(frame_count):
+            if not cap.grab():
+                break
+        return cap
+
+    def read_best_frames(self, path):
+        """
+        المرحلة التانية: seek لأحسن إطارات كل سيارة بس وكشف اللوحة + OCR عليها
+        الإطارات القريبة من بعض بتتقري لقدام (grab) بدل seek
+        الـ seek في الـ long-GOP (H.264 / .ts / .mkv) تقريبي، فكل إطار بيتأكد بوقته (POS_MSEC)
+        من المرحلة الأولى قبل ما الصندوق يتقص منه، واللي مش متأكد بيتساب
+        """
+        jobs, last = self.proc.plan_deferred()
+        times = self.frame_times
+        # من غير timestamps متزايدة مفيش seek مضمون: قراءة لقدام بالعدّ بس
+        can_seek = len(times) > 1 and all(b > a for a, b in zip(times, times[1:]))
+        frame_ms = 1000.0 / self.proc.speed.fps
+        cap = cv2.VideoCapture(path)
+        pos = 0  # رقم الإطار اللي الـ grab الجاي هيرجعه (من 0) - None لو مش معروف
+        frame = None
+        done = skipped = 0
+
+        for i, (frame_no, group) in enumerate(itertools.groupby(jobs, key=lambda j: j[0])):
+            group = list(group)
+            # frame_counter بيبدأ من 1
+            target = frame_no - 1
+            msec = times[target] if can_seek and target < len(times) else None
+
+            with metrics.stage("seek"):
+                if pos is not None and pos <= target and (not can_seek or target - pos <= SystemConfig.TWO_PASS_SEEK_GAP):
+                    while pos < target and cap.grab():
+                        pos += 1
+                    found = pos == target and cap.grab()
+                else:
+                    found = msec is not None and seek_to(cap, msec, frame_ms)
+            if found:
+                with metrics.stage("decode"):
+                    found, frame = cap.retrieve(frame)
+            if found and msec is not None and abs(cap.get(cv2.CAP_PROP_POS_MSEC) - msec) > frame_ms / 2:
+                found = False
+
+            if not found:
+                # الإطار مش متأكد منه: الصندوق ممكن يتقص من إطار تاني
+                pos = None
+                skipped += len(group)
+                for _, tid, _ in group:
+                    if last[tid] == frame_no:
+                        self.proc.finish_deferred(tid)
+                continue
+            pos = target + 1
+
+            prepared = self.proc.prep.prepare(frame, self.proc.roi, detect=False)
+            for _, tid, bbox in group:
+                self.proc.read_deferred(prepared, tid, bbox, frame_no)
+                done += 1
+                if last[tid] == frame_no:
+                    self.proc.finish_deferred(tid)
+
+            if i % SystemConfig.EVENTS_PROGRESS_EVERY == 0:
+                BUS.publish(
+                    "progress",
+                    task_id=self.task_id,
+                    phase="ocr",
+                    done=done,
+                    skipped=skipped,
+                    total=len(jobs),
+                    percent=round((done + skipped) / len(jobs) * 100, 1)
+                )
+
+        cap.release()
+        # السيارات اللي ملهاش إطارات (أو الفيديو خلص قبلها)
+        for tid in list(self.proc.deferred):
+            self.proc.finish_deferred(tid)
+        self.proc.deferred = None
@@ -1,20 +1,101 @@
-from collections import defaultdict, Counter
-import numpy as np
+from collections import defaultdict, deque
+from config import SystemConfig
+
+class _Tally:
+    """مجاميع تراكمية لسيارة واحدة - بتتحدث مع كل قراءة بدل ما تتبني من الأول"""
+    def __init__(self, window):
+        self.reads = deque(maxlen=window)
+        self.weight = defaultdict(float)   # مجموع الثقة لكل نص
+        self.count = defaultdict(int)
+        # أصوات كل حرف في مكانه، مقسومة حسب طول النص
+        self.chars = defaultdict(lambda: defaultdict(lambda: defaultdict(float)))
+
+    def _apply(self, text, conf, sign):
+        self.weight[text] += sign * conf
+        self.count[text] += sign
+        positions = self.chars[len(text)]
+        for i, ch in enumerate(text):
+            positions[i][ch] += sign * conf
+        if self.count[text] <= 0:
+            del self.weight[text]
+            del self.count[text]
+
+    def add(self, text, conf):
+        if len(self.reads) == self.reads.maxlen:
+            old_text, old_conf = self.reads[0]
+            self._apply(old_text, old_conf, -1)
+        self.reads.append((text, conf))
+        self._apply(text, conf, 1)
+
+    def ranked(self):
+        return sorted(self.weight.items(), key=lambda kv: kv[1], reverse=True)
+
+    def fused(self):
+        """دمج القراءات حرف بحرف للطول الأكثر تكراراً"""
+        lengths = defaultdict(float)
+        for text, w in self.weight.items():
+            lengths[len(text)] += w
+        if not lengths:
+            return None
+        length = max(lengths, key=lengths.get)
+        positions = self.chars[length]
+        return "".join(
+            max(positions[i].items(), key=lambda kv: kv[1])[0]
+            for i in range(length)
+        )
+
 
 class PlateVoting:
-    def __init__(self, window=10, min_votes=3):
+    def __init__(self, window=10, min_votes=3, early_margin=None):
+        """
+        early_margin: فرق الثقة الموزونة بين أول وتاني مرشح اللي يكفي لقرار مبكر
+        """
         self.window = window
         self.min_votes = min_votes
-        self.data = defaultdict(list)
+        self.early_margin = SystemConfig.OCR_EARLY_MARGIN if early_margin is None else early_margin
+        self.data = {}
 
     def add(self, vid, text, conf):
-        self.data[vid].append((text, conf))
-        self.data[vid] = self.data[vid][-self.window:]
+        tally = self.data.get(vid)
+        if tally is None:
+            tally = self.data[vid] = _Tally(self.window)
+        tally.add(text, conf)
 
     def consensus(self, vid):
-        if len(self.data[vid]) < self.min_votes:
+        tally = self.data.get(vid)
+        if tally is None or not tally.reads:
+            return None
+
+        ranked = tally.ranked()
+        best, best_w = ranked[0]
+        second_w = ranked[1][1] if len(ranked) > 1 else 0.0
+
+        # قرار مبكر لو مرشح واحد متفوق بوضوح
+        if tally.count[best] >= 2 and best_w - second_w >= self.early_margin:
+            return best, best_w / tally.count[best]
+
+        if len(tally.reads) < self.min_votes:
+            return None
+
+        # مفيش أغلبية واضحة للنص كامل: نستخدم التصويت حرف بحرف
+        total_w = sum(w for _, w in ranked)
+        if best_w < 0.5 * total_w:
+            fused = tally.fused()
+            if fused and fused in tally.weight:
+                return fused, tally.weight[fused] / tally.count[fused]
+            if fused:
+                confs = [c for t, c in tally.reads if len(t) == len(fused)]
+                return fused, sum(confs) / len(confs)
+
+        return best, best_w / tally.count[best]
+
+    def best(self, vid):
+        """أكثر قراءة وزناً حتى لو موصلتش لـ min_votes"""
+        tally = self.data.get(vid)
+        if tally is None or not tally.weight:
             return None
-        texts = [t for t,_ in self.data[vid]]
-        best = Counter(texts).most_common(1)[0][0]
-        confs = [c for t,c in self.data[vid] if t == best]
-        return best, float(np.mean(confs))
+        best, best_w = tally.ranked()[0]
+        return best, best_w / tally.count[best]
+
+    def reset(self, vid):
+        self.data.pop(vid, None)
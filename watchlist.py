@@ -5,8 +5,9 @@ class WatchlistManager:
         self.db = db
         self.th = th
 
-    def check(self, plate):
-        for p, r in self.db.get_watchlist():
+    def check(self, plate, entries=None):
+        """entries: الـ watchlist محملة مسبقاً (عشان ما نسألش الـ DB لكل لوحة في الـ batch)"""
+        for p, r in (entries if entries is not None else self.db.get_watchlist()):
             sim = SequenceMatcher(None, plate, p).ratio()
             if sim >= self.th:
                 return {"plate": p, "reason": r, "similarity": sim}